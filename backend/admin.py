@@ -0,0 +1,45 @@
+"""
+Operator-only endpoints shared by both servers, mounted under /admin.
+
+Disabled unless ADMIN_TOKEN is set; requests must then send the same value
+in the X-Admin-Token header.
+"""
+
+import os
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+import tracing
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+MAX_PROFILE_SECONDS = 60.0
+
+
+def require_admin(x_admin_token: str = Header(default="")):
+    if not ADMIN_TOKEN:
+        raise HTTPException(403, "Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(401, "Invalid admin token")
+
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+
+@router.get("/traces")
+async def get_traces(request_id: str = Query(default=None)):
+    """Recent request traces in Chrome trace format (needs TRACING_ENABLED=true)."""
+    return tracing.chrome_trace(request_id)
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def get_profile(
+    seconds: float = Query(default=5.0, gt=0, le=MAX_PROFILE_SECONDS),
+    interval_ms: float = Query(default=5.0, ge=1, le=1000)
+):
+    """Sample all threads for `seconds`; returns collapsed stacks for flamegraph tools."""
+    stacks = await tracing.profile(seconds, interval_ms / 1000)
+    if stacks is None:
+        raise HTTPException(409, "A profile is already running")
+    return stacks
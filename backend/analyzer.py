@@ -0,0 +1,208 @@
+"""
+Text analysis for BM25: one pipeline for both the index and queries.
+
+An Analyzer normalises text (Unicode NFKD, case folding, accents stripped),
+splits it into word tokens, drops stopwords and stems what is left. Stems
+are memoized per analyzer: natural-language vocabularies are small, so after
+a few documents almost every token is a dictionary hit instead of a Snowball
+run. Stemmers and stopword lists come from sumy (and nltk beneath it); when
+they aren't installed, the analyzer falls back to a built-in English
+stopword list and no stemming.
+
+Analyzers are picklable, so an AnalyzerPool can fan batches of documents
+out to worker processes, each with its own copy of the analyzer.
+"""
+
+import importlib
+import logging
+import multiprocessing
+import re
+import sys
+import time
+import types
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+# Used when sumy isn't installed
+FALLBACK_STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers herself him himself his how i if in into is it its itself just me more most my myself no nor not
+now of off on once only or other our ours ourselves out over own same she should so some such than that
+the their theirs them themselves then there these they this those through to too under until up very was
+we were what when where which while who whom why will with would you your yours yourself yourselves
+""".split())
+
+Analyze = Callable[[str], List[str]]
+
+
+def normalize(text: str) -> str:
+    """Compatibility-decomposed (NFKD), case-folded, with accents stripped."""
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def simple_analyzer(text: str) -> List[str]:
+    """Lowercased word tokens, nothing else (the original tokenizer)."""
+    return _WORD_RE.findall(text.lower())
+
+
+class Analyzer:
+    def __init__(self, language: str = "english", stopwords: bool = True, stemming: bool = True,
+                 cache_size: int = 200_000):
+        self.language = language
+        self.use_stopwords = stopwords
+        self.use_stemming = stemming
+        self.cache_size = cache_size
+        self._load()
+
+    def _load(self):
+        self._stems: Dict[str, str] = {}
+        self._stem: Optional[Callable[[str], str]] = None
+        self._stopwords: FrozenSet[str] = frozenset()
+        try:
+            from sumy.nlp.stemmers import Stemmer
+            from sumy.utils import get_stop_words
+        except ImportError:
+            if self.use_stemming:
+                logger.warning("Stemming requires sumy and nltk. Run: pip install sumy nltk")
+            if self.use_stopwords:
+                self._stopwords = FALLBACK_STOPWORDS
+            return
+        if self.use_stopwords:
+            try:
+                self._stopwords = frozenset(normalize(word) for word in get_stop_words(self.language))
+            except LookupError:
+                self._stopwords = FALLBACK_STOPWORDS
+        if self.use_stemming:
+            self._stem = Stemmer(self.language)
+
+    # Stemmers and caches are rebuilt in worker processes rather than pickled
+    def __getstate__(self):
+        return {
+            "language": self.language, "stopwords": self.use_stopwords,
+            "stemming": self.use_stemming, "cache_size": self.cache_size,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def stem(self, token: str) -> str:
+        stem = self._stems.get(token)
+        if stem is None:
+            stem = self._stem(token)
+            if len(self._stems) >= self.cache_size:
+                self._stems.clear()  # Cheaper than LRU bookkeeping on every token
+            self._stems[token] = stem
+        return stem
+
+    def __call__(self, text: str) -> List[str]:
+        tokens = _WORD_RE.findall(normalize(text))
+        if self._stopwords:
+            tokens = [t for t in tokens if t not in self._stopwords]
+        if self._stem is not None:
+            stems = self._stems
+            tokens = [stems.get(t) or self.stem(t) for t in tokens]
+        return tokens
+
+    def analyze_many(self, texts: Iterable[str]) -> List[List[str]]:
+        return [self(text) for text in texts]
+
+
+def create_analyzer(name: str, language: str = "english") -> Analyze:
+    """
+    Analyzer for ANALYZER=stemmed|standard|simple, or "module:attribute"
+    naming a custom analyzer (a callable, or a class built with no arguments).
+    """
+    if name == "simple":
+        return simple_analyzer
+    if name == "standard":
+        return Analyzer(language, stopwords=True, stemming=False)
+    if name == "stemmed":
+        return Analyzer(language, stopwords=True, stemming=True)
+    module, sep, attribute = name.partition(":")
+    if not sep:
+        raise ValueError(f"Unknown analyzer '{name}' (expected simple, standard, stemmed or module:attribute)")
+    target = getattr(importlib.import_module(module), attribute)
+    return target() if isinstance(target, type) else target
+
+
+_worker_analyze: Optional[Analyze] = None
+
+
+def _init_worker(analyze: Analyze):
+    global _worker_analyze
+    _worker_analyze = analyze
+
+
+def _analyze_batch(texts: Sequence[str]) -> List[List[str]]:
+    return [_worker_analyze(text) for text in texts]
+
+
+def _worker_context():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        # The fork server preloads the parent's __main__ by default
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+@contextmanager
+def _main_hidden():
+    """
+    Workers started meanwhile don't re-import the parent's __main__ script
+    (as __mp_main__), which for a server would redo all of its setup.
+    """
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+class AnalyzerPool:
+    """
+    Process pool whose workers each hold one copy of an analyzer (and so keep
+    their stem caches warm across calls). Workers are started from a fresh
+    interpreter (forkserver, or spawn where that is unavailable) rather than
+    forked, since forking a process that already runs threads can deadlock;
+    the analyzer reaches them pickled through the pool initializer. They only
+    import this module, so the analyzer must not live in __main__.
+    """
+
+    def __init__(self, analyze: Analyze, processes: int, batch_size: int = 500):
+        self.analyze = analyze
+        self.batch_size = batch_size
+        self._pool = ProcessPoolExecutor(
+            max_workers=processes, mp_context=_worker_context(),
+            initializer=_init_worker, initargs=(analyze,)
+        )
+        # Start every worker now: each submit to a busy pool starts one more
+        with _main_hidden():
+            started = [self._pool.submit(time.sleep, 0.01) for _ in range(processes)]
+        for future in started:
+            future.result()
+
+    def map(self, texts: Sequence[str]) -> List[List[str]]:
+        batches = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        return [tokens for batch in self._pool.map(_analyze_batch, batches) for tokens in batch]
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+def analyze_corpus(analyze: Analyze, texts: Sequence[str], pool: Optional[AnalyzerPool] = None,
+                   min_parallel: int = 2000) -> List[List[str]]:
+    """Token lists for texts; corpora of at least min_parallel texts go to the pool."""
+    if pool is None or len(texts) < min_parallel:
+        return [analyze(text) for text in texts]
+    return pool.map(texts)
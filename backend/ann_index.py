@@ -0,0 +1,396 @@
+"""
+In-process vector indexes for large corpora.
+
+Chroma's HNSW graph keeps every vector in float32 plus graph links and its
+recall/latency trade-off is fixed when a collection is created. These NumPy
+indexes replace it for search (Chroma remains the store of record for
+documents and metadata, and the float32 vectors move to full_vectors on disk):
+
+- FlatIndex: exact brute-force cosine search; one matrix-vector product
+  (one matrix product for a batch of queries).
+- IVFIndex: inverted file. Vectors are clustered with spherical k-means into
+  `nlist` lists and a query only scans the `nprobe` lists whose centroids
+  are closest, trading a little recall for roughly nlist/nprobe less work.
+
+Both store vectors as float32, float16 (half the memory) or int8 with a
+per-vector scale (a quarter of the memory). Scores are cosine similarities;
+vectors are L2-normalised on the way in.
+
+With pca_dim, vectors are also projected onto their leading principal axes
+(uncentered, which is what preserves inner products), fitted once
+`pca_sample` vectors have been added: 4096-dim embeddings kept as 256 int8
+dims take 260 bytes instead of 16KB. Reduced scores are approximate, so
+callers fetch more candidates and rescore them with the full-precision
+vectors read back from disk (see rescore).
+"""
+
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DTYPES = ("float32", "float16", "int8")
+_BLOCK_ROWS = 4096
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first."""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best])]
+
+
+def principal_axes(sample: np.ndarray, dims: int, rng: np.random.Generator,
+                   oversample: int = 10, iterations: int = 2) -> np.ndarray:
+    """
+    The top `dims` right singular vectors of sample, as rows. Randomized SVD
+    (a few passes over the sample instead of a full decomposition, which
+    takes minutes at 4096 dims).
+    """
+    width = min(dims + oversample, *sample.shape)
+    basis = sample @ rng.standard_normal((sample.shape[1], width)).astype(np.float32)
+    for _ in range(iterations):
+        basis, _ = np.linalg.qr(basis)
+        basis = sample @ (sample.T @ basis)
+    basis, _ = np.linalg.qr(basis)
+    _, _, vt = np.linalg.svd(basis.T @ sample, full_matrices=False)
+    return np.ascontiguousarray(vt[:dims], dtype=np.float32)
+
+
+def rescore(query, hits: Sequence[Tuple[str, float]], vectors: Dict[str, np.ndarray],
+            k: int) -> List[Tuple[str, float]]:
+    """The k best of hits by exact cosine similarity, given their full-precision vectors by id."""
+    ids = [id_ for id_, _ in hits if id_ in vectors]
+    if not ids:
+        return []
+    scores = normalize(np.stack([vectors[id_] for id_ in ids])) @ normalize(query)
+    return [(ids[i], float(scores[i])) for i in top_k(scores, k)]
+
+
+class FlatIndex:
+    """Exact search over quantized vectors. Thread-safe."""
+
+    def __init__(self, dtype: str = "float32", pca_dim: int = 0, pca_sample: int = 4096, seed: int = 0):
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype must be one of {DTYPES}")
+        self.dtype = dtype
+        self.pca_dim = pca_dim
+        self.pca_sample = pca_sample
+        self.input_dim: Optional[int] = None
+        self.dim: Optional[int] = None  # Stored dimensions: pca_dim once fitted
+        self.components: Optional[np.ndarray] = None  # (pca_dim, input_dim)
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.RLock()
+        self._codes: Optional[np.ndarray] = None   # (capacity, dim), grown by doubling
+        self._scales: Optional[np.ndarray] = None  # (capacity,), int8 only
+        self._ids: List[str] = []
+        self._rows = {}  # id -> row
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the stored vectors."""
+        n = len(self._ids)
+        if not n:
+            return 0
+        per_row = self._codes.itemsize * self.dim + (4 if self.dtype == "int8" else 0)
+        return n * per_row + (self.components.nbytes if self.components is not None else 0)
+
+    @property
+    def lossy(self) -> bool:
+        """Are scores approximate (quantized or reduced vectors)?"""
+        return self.dtype != "float32" or self.pca_dim > 0
+
+    # --- Quantization and dimension reduction ---
+    def _pca_pending(self) -> bool:
+        return bool(self.pca_dim) and self.components is None and self.pca_dim < (self.input_dim or 0)
+
+    def _fit_pca(self, vectors: np.ndarray):
+        """Fit the projection on a sample of the stored and new vectors, then re-encode the stored ones."""
+        stored = self._decoded()
+        data = np.concatenate([stored, vectors]) if len(stored) else vectors
+        rows = self._rng.choice(len(data), size=min(len(data), self.pca_sample), replace=False)
+        self.components = principal_axes(data[np.sort(rows)], self.pca_dim, self._rng)
+        self.dim = self.pca_dim
+        n = len(self._ids)
+        self._codes = self._scales = None
+        if n:
+            self._reserve(n)
+            codes, scales = self._encode(self._project(stored))
+            self._codes[:n] = codes
+            if scales is not None:
+                self._scales[:n] = scales
+        logger.info(f"🧭 Fitted PCA: {self.input_dim} -> {self.pca_dim} dims on {len(rows)} vectors")
+
+    def _project(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors if self.components is None else vectors @ self.components.T
+
+    def _decoded(self, rows=slice(None)) -> np.ndarray:
+        n = len(self._ids)
+        if not n:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        codes = self._codes[:n][rows].astype(np.float32)
+        if self.dtype == "int8":
+            codes *= self._scales[:n][rows, None]
+        return codes
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if self.dtype == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales = np.maximum(scales, 1e-12).astype(np.float32)
+            codes = np.round(vectors / scales[:, None]).astype(np.int8)
+            return codes, scales
+        return vectors.astype(self.dtype), None
+
+    def _scores(self, query: np.ndarray, rows=slice(None)) -> np.ndarray:
+        """Scores of rows for a (dim,) query, or for each column of a (dim, m) matrix of queries."""
+        n = len(self._ids)
+        codes = self._codes[:n][rows]
+        if self.dtype == "float32":
+            return codes @ query
+        # NumPy has no BLAS path for float16/int8 products: widen in blocks
+        scores = np.empty((len(codes),) + query.shape[1:], dtype=np.float32)
+        for start in range(0, len(codes), _BLOCK_ROWS):
+            block = codes[start:start + _BLOCK_ROWS].astype(np.float32)
+            scores[start:start + _BLOCK_ROWS] = block @ query
+        if self.dtype == "int8":
+            scales = self._scales[:n][rows]
+            scores *= scales[:, None] if query.ndim == 2 else scales
+        return scores
+
+    # --- Updates ---
+    def _reserve(self, rows: int):
+        capacity = 0 if self._codes is None else len(self._codes)
+        if rows <= capacity:
+            return
+        capacity = max(rows, 2 * capacity, 1024)
+        codes = np.zeros((capacity, self.dim), dtype=np.int8 if self.dtype == "int8" else self.dtype)
+        scales = np.zeros(capacity, dtype=np.float32)
+        n = len(self._ids)
+        if self._codes is not None:
+            codes[:n] = self._codes[:n]
+            scales[:n] = self._scales[:n]
+        self._codes, self._scales = codes, scales
+
+    def add(self, ids: Sequence[str], vectors) -> None:
+        """Add (or replace) vectors by id."""
+        if not len(ids):
+            return
+        vectors = normalize(vectors)
+        with self._lock:
+            if self.input_dim is None:
+                self.input_dim = self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.input_dim:
+                raise ValueError(f"Expected {self.input_dim}-dimensional vectors, got {vectors.shape[1]}")
+            self.remove([i for i in ids if i in self._rows])
+            if self._pca_pending() and len(self._ids) + len(ids) >= self.pca_sample:
+                self._fit_pca(vectors)
+            vectors = self._project(vectors)
+            start = len(self._ids)
+            self._reserve(start + len(ids))
+            codes, scales = self._encode(vectors)
+            self._codes[start:start + len(ids)] = codes
+            if scales is not None:
+                self._scales[start:start + len(ids)] = scales
+            for offset, id_ in enumerate(ids):
+                self._rows[id_] = start + offset
+            self._ids.extend(ids)
+            self._added(start, vectors)
+
+    def remove(self, ids: Sequence[str]) -> int:
+        """Drop vectors by id (unknown ids are ignored); returns how many."""
+        removed = 0
+        with self._lock:
+            for id_ in ids:
+                row = self._rows.pop(id_, None)
+                if row is None:
+                    continue
+                last = len(self._ids) - 1
+                if row != last:  # Move the last row into the hole
+                    moved = self._ids[last]
+                    self._codes[row] = self._codes[last]
+                    self._scales[row] = self._scales[last]
+                    self._ids[row] = moved
+                    self._rows[moved] = row
+                    self._moved(last, row)
+                self._ids.pop()
+                removed += 1
+            if removed:
+                self._removed()
+        return removed
+
+    def _added(self, start: int, vectors: np.ndarray):
+        pass
+
+    def _moved(self, src: int, dst: int):
+        pass
+
+    def _removed(self):
+        pass
+
+    # --- Search ---
+    def _candidates(self, query: np.ndarray):
+        return slice(None)
+
+    def search(self, query, k: int = 4) -> List[Tuple[str, float]]:
+        """The k most similar ids with their cosine similarities."""
+        query = normalize(query)
+        with self._lock:
+            query = self._project(query)
+            if not self._ids:
+                return []
+            rows = self._candidates(query)
+            scores = self._scores(query, rows).astype(np.float32)
+            best = top_k(scores, k)
+            if not isinstance(rows, slice):
+                return [(self._ids[rows[i]], float(scores[i])) for i in best]
+            return [(self._ids[i], float(scores[i])) for i in best]
+
+    def search_many(self, queries, k: int = 4, max_cells: int = 1 << 24) -> List[List[Tuple[str, float]]]:
+        """search for each row of queries: one matrix product per batch of at most max_cells scores."""
+        queries = normalize(queries)
+        with self._lock:
+            if not self._ids:
+                return [[] for _ in queries]
+            queries = self._project(queries)
+            results = []
+            batch = max(1, max_cells // len(self._ids))
+            for start in range(0, len(queries), batch):
+                scores = self._scores(queries[start:start + batch].T).astype(np.float32)
+                for column in scores.T:
+                    results.append([(self._ids[i], float(column[i])) for i in top_k(column, k)])
+            return results
+
+
+class IVFIndex(FlatIndex):
+    """
+    Inverted-file index. Until there are enough vectors to train on
+    (`min_train_per_list` per list) it searches exhaustively. Training runs
+    on add, and again whenever the corpus has grown `retrain_growth` times.
+    nlist=0 picks sqrt(n) lists at training time.
+    """
+
+    def __init__(self, dtype: str = "float32", nlist: int = 0, nprobe: int = 8,
+                 min_train_per_list: int = 39, retrain_growth: float = 4.0,
+                 train_sample_per_list: int = 64, iterations: int = 10, seed: int = 0,
+                 pca_dim: int = 0, pca_sample: int = 4096):
+        super().__init__(dtype, pca_dim=pca_dim, pca_sample=pca_sample, seed=seed)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_per_list = min_train_per_list
+        self.retrain_growth = retrain_growth
+        self.train_sample_per_list = train_sample_per_list
+        self.iterations = iterations
+        self.centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+        self._assign = np.zeros(0, dtype=np.int32)  # row -> list
+        self._lists: Optional[Tuple[np.ndarray, np.ndarray]] = None  # rows sorted by list, list offsets
+
+    def _target_nlist(self, n: int) -> int:
+        return self.nlist or max(1, int(np.sqrt(n)))
+
+    def _assign_vectors(self, vectors: np.ndarray) -> np.ndarray:
+        assign = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), _BLOCK_ROWS):  # Bounded temporary memory
+            block = vectors[start:start + _BLOCK_ROWS].astype(np.float32)
+            assign[start:start + _BLOCK_ROWS] = np.argmax(block @ self.centroids.T, axis=1)
+        return assign
+
+    def train(self):
+        """Cluster the stored vectors (spherical k-means on a sample) and reassign all."""
+        with self._lock:
+            n = len(self._ids)
+            nlist = min(self._target_nlist(n), n)
+            sample_rows = self._rng.choice(n, size=min(n, nlist * self.train_sample_per_list), replace=False)
+            sample = normalize(self._decoded(np.sort(sample_rows)))
+            centroids = sample[self._rng.choice(len(sample), size=nlist, replace=False)]
+            for _ in range(self.iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                order = np.argsort(labels, kind="stable")
+                counts = np.bincount(labels, minlength=nlist)
+                sums = np.zeros_like(centroids)
+                present = counts > 0
+                sums[present] = np.add.reduceat(sample[order], (np.cumsum(counts) - counts)[present])
+                empty = ~present
+                sums[empty] = sample[self._rng.choice(len(sample), size=int(empty.sum()))]
+                centroids = normalize(sums)
+            self.centroids = centroids
+            assign = np.zeros(len(self._codes), dtype=np.int32)
+            for start in range(0, n, _BLOCK_ROWS):
+                end = min(n, start + _BLOCK_ROWS)
+                assign[start:end] = self._assign_vectors(self._decoded(slice(start, end)))
+            self._assign = assign
+            self._trained_size = n
+            self._build_lists()
+            logger.info(f"🧭 Trained IVF index: {nlist} lists over {n} vectors")
+
+    def _reserve(self, rows: int):
+        super()._reserve(rows)
+        if len(self._assign) < len(self._codes):
+            assign = np.zeros(len(self._codes), dtype=np.int32)
+            assign[:len(self._assign)] = self._assign
+            self._assign = assign
+
+    def _added(self, start: int, vectors: np.ndarray):
+        if self.centroids is not None:
+            self._assign[start:start + len(vectors)] = self._assign_vectors(vectors)
+        # Training and list rebuilds happen on the write path, never in a search
+        self._maybe_train()
+        self._build_lists()
+
+    def _moved(self, src: int, dst: int):
+        self._assign[dst] = self._assign[src]
+
+    def _removed(self):
+        self._build_lists()
+
+    def _maybe_train(self):
+        n = len(self._ids)
+        if self._pca_pending():
+            return  # Cluster in the reduced space
+        if self.centroids is None:
+            if n >= self.min_train_per_list * self._target_nlist(n):
+                self.train()
+        elif n >= self.retrain_growth * self._trained_size:
+            self.train()
+
+    def _build_lists(self):
+        if self.centroids is None:
+            return
+        n = len(self._ids)
+        order = np.argsort(self._assign[:n], kind="stable")
+        offsets = np.searchsorted(self._assign[:n][order], np.arange(len(self.centroids) + 1))
+        self._lists = (order, offsets)
+
+    def _candidates(self, query: np.ndarray):
+        if self._lists is None:
+            return slice(None)
+        order, offsets = self._lists
+        probes = top_k(self.centroids @ query, self.nprobe)
+        return np.concatenate([order[offsets[p]:offsets[p + 1]] for p in probes])
+
+    def search_many(self, queries, k: int = 4) -> List[List[Tuple[str, float]]]:
+        # Each query probes its own lists, so there is no shared matrix to multiply
+        return [self.search(query, k) for query in normalize(queries)]
+
+
+def create_index(kind: str, dtype: str = "float32", nlist: int = 0, nprobe: int = 8,
+                 pca_dim: int = 0, pca_sample: int = 4096) -> FlatIndex:
+    """Index for VECTOR_INDEX=flat|ivf."""
+    if kind == "flat":
+        return FlatIndex(dtype, pca_dim=pca_dim, pca_sample=pca_sample)
+    if kind == "ivf":
+        return IVFIndex(dtype, nlist=nlist, nprobe=nprobe, pca_dim=pca_dim, pca_sample=pca_sample)
+    raise ValueError(f"Unknown vector index '{kind}' (expected flat or ivf)")
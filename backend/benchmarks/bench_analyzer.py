@@ -0,0 +1,135 @@
+"""
+BM25 analyzer benchmark: throughput and retrieval quality.
+
+Compares the analyzers of analyzer.py ("simple" lowercased words, "standard"
+with stopwords removed, "stemmed" with stopwords and Snowball stems) on a
+synthetic corpus where each document is about a few topic words and each
+question asks about them in *different inflections* ("crawled the caches"
+vs "crawling cache"), the mismatch real questions have with real pages.
+
+Reports analysis throughput in input tokens/s (cold and warm stem cache,
+and through an AnalyzerPool with --processes), plus BM25 recall@k and MRR.
+
+Usage:
+    python benchmarks/bench_analyzer.py [--docs 5000] [--queries 500] [--processes 0]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rank_bm25 import BM25Okapi
+
+from analyzer import AnalyzerPool, analyze_corpus, create_analyzer, simple_analyzer
+
+ROOTS = (
+    "crawl index cache render parse load stream train test deploy connect report filter sort search "
+    "compile rank store fetch merge split score embed compress decode encode retry schedule upload "
+    "download publish subscribe route balance monitor measure profile trace sample update delete "
+    "insert select join partition replicate snapshot restore migrate validate format convert export "
+    "import review approve reject queue batch buffer flush lock release signal handle process"
+).split()
+STOPWORDS = "the a an of to and in is was are were for on with by how what when does it that this".split()
+ANALYZERS = ["simple", "standard", "stemmed"]
+
+
+def inflect(root: str, rng: random.Random) -> str:
+    stem = root[:-1] if root.endswith("e") else root
+    return rng.choice([root, root + "s", stem + "ed", stem + "ing", stem + "er", stem + "ers"])
+
+
+def make_corpus(docs: int, queries: int, seed: int):
+    """Returns (documents, [(question, relevant document index)])."""
+    rng = random.Random(seed)
+    documents, topics = [], []
+    for _ in range(docs):
+        topic = rng.sample(ROOTS, 3)
+        words = []
+        for _ in range(rng.randint(60, 120)):
+            pick = rng.random()
+            if pick < 0.35:
+                words.append(rng.choice(STOPWORDS))
+            elif pick < 0.55:
+                words.append(inflect(rng.choice(topic), rng))
+            else:
+                words.append(inflect(rng.choice(ROOTS), rng))
+        documents.append(" ".join(words).capitalize() + ".")
+        topics.append(topic)
+
+    questions = []
+    for doc_id in rng.sample(range(docs), min(queries, docs)):
+        words = [rng.choice(STOPWORDS) for _ in range(3)] + [inflect(root, rng) for root in topics[doc_id]]
+        rng.shuffle(words)
+        questions.append((" ".join(words) + "?", doc_id))
+    return documents, questions
+
+
+def throughput(name: str, documents, tokens: int, processes: int) -> dict:
+    analyze = create_analyzer(name)
+    start = time.perf_counter()
+    analyze_corpus(analyze, documents)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analyze_corpus(analyze, documents)
+    warm = time.perf_counter() - start
+
+    result = {
+        "analyzer": name,
+        "tokens_per_s_cold": round(tokens / cold),
+        "tokens_per_s_warm": round(tokens / warm),
+    }
+    if processes:
+        pool = AnalyzerPool(analyze, processes)
+        try:
+            analyze_corpus(analyze, documents, pool, min_parallel=0)  # Warm the workers' caches
+            start = time.perf_counter()
+            analyze_corpus(analyze, documents, pool, min_parallel=0)
+            result[f"tokens_per_s_{processes}_processes"] = round(tokens / (time.perf_counter() - start))
+        finally:
+            pool.shutdown()
+    return result
+
+
+def quality(name: str, documents, questions, k: int) -> dict:
+    analyze = create_analyzer(name)
+    bm25 = BM25Okapi(analyze_corpus(analyze, documents))
+    hits, reciprocal = 0, 0.0
+    for question, relevant in questions:
+        scores = bm25.get_scores(analyze(question))
+        ranking = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+        rank = ranking.index(relevant) + 1
+        hits += rank <= k
+        reciprocal += 1 / rank
+    return {f"recall_at_{k}": round(hits / len(questions), 3), "mrr": round(reciprocal / len(questions), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--processes", type=int, default=0, help="Also time an AnalyzerPool of this size")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    documents, questions = make_corpus(args.docs, args.queries, args.seed)
+    tokens = sum(len(simple_analyzer(doc)) for doc in documents)
+
+    results = []
+    for name in ANALYZERS:
+        result = throughput(name, documents, tokens, args.processes)
+        result.update(quality(name, documents, questions, args.k))
+        results.append(result)
+        print(json.dumps(result), file=sys.stderr)
+
+    print(json.dumps({"params": vars(args), "input_tokens": tokens, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
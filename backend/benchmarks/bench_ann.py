@@ -0,0 +1,191 @@
+"""
+Vector index benchmark: recall, latency and memory at corpus scale.
+
+Builds each index over synthetic clustered embeddings (mixtures of Gaussians
+resemble real embedding spaces far better than uniform noise) and reports
+build time, vector memory, query latency and recall@k against exact float32
+search:
+
+- chroma-hnsw: Chroma's HNSW index with the given M / ef settings
+- flat-<dtype>, ivf-<dtype>: the in-process NumPy indexes (ann_index.py)
+- <index>-pca: the same, reduced to --pca-dim principal axes
+
+Quantized and reduced indexes fetch --rescore times k candidates and rescore
+them against the float32 vectors, as server.py does with the embeddings
+Chroma stores; their latency includes that step. --decay gives the corpus a
+decaying spectrum (dimension j scaled by (j + 1) ** -decay) like real
+embeddings have; at 0 every dimension carries as much variance, the worst
+case for PCA.
+
+Usage:
+    python benchmarks/bench_ann.py [--sizes 100000 1000000] [--dim 384]
+                                   [--queries 200] [--k 10]
+                                   [--indexes flat-float32 ivf-int8 ...]
+                                   [--pca-dim 96] [--rescore 4] [--decay 0]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from ann_index import create_index, normalize, rescore
+
+INDEXES = [
+    "chroma-hnsw",
+    "flat-float32", "flat-float16", "flat-int8",
+    "ivf-float32", "ivf-float16", "ivf-int8",
+    "flat-float16-pca", "flat-int8-pca", "ivf-int8-pca",
+]
+ADD_BATCH = 50_000
+
+
+def make_corpus(n: int, dim: int, seed: int, clusters: int = 1000, decay: float = 0.0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    spectrum = (np.arange(1, dim + 1, dtype=np.float32) ** -decay)
+    vectors = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, ADD_BATCH):
+        size = min(ADD_BATCH, n - start)
+        noise = rng.standard_normal((size, dim), dtype=np.float32)
+        vectors[start:start + size] = (centers[rng.integers(0, clusters, size)] + 0.6 * noise) * spectrum
+    return vectors
+
+
+class StoredVectors:
+    """The float32 originals by id, standing in for the embeddings Chroma returns."""
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    def __contains__(self, id_):
+        return True
+
+    def __getitem__(self, id_):
+        return self.vectors[int(id_)]
+
+
+def make_queries(vectors: np.ndarray, count: int, seed: int):
+    rng = np.random.default_rng(seed + 1)
+    picks = vectors[rng.integers(0, len(vectors), count)]
+    return picks + 0.3 * rng.standard_normal(picks.shape, dtype=np.float32)
+
+
+def exact_neighbors(vectors: np.ndarray, queries: np.ndarray, k: int):
+    """Ground truth: exact float32 top-k ids per query, computed block by block."""
+    queries = normalize(queries)
+    candidate_ids, candidate_scores = [], []
+    for start in range(0, len(vectors), ADD_BATCH):
+        scores = queries @ normalize(vectors[start:start + ADD_BATCH]).T
+        keep = min(k, scores.shape[1])
+        top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+        candidate_ids.append(top + start)
+        candidate_scores.append(np.take_along_axis(scores, top, axis=1))
+    ids = np.concatenate(candidate_ids, axis=1)
+    best = np.argsort(-np.concatenate(candidate_scores, axis=1), axis=1)[:, :k]
+    return [set(map(str, row)) for row in np.take_along_axis(ids, best, axis=1)]
+
+
+class ChromaHNSW:
+    def __init__(self, args):
+        import chromadb
+        from chromadb.config import Settings
+        self._dir = tempfile.TemporaryDirectory()
+        client = chromadb.PersistentClient(path=self._dir.name, settings=Settings(anonymized_telemetry=False))
+        self.collection = client.create_collection("bench", metadata={
+            "hnsw:space": "cosine", "hnsw:M": args.hnsw_m,
+            "hnsw:construction_ef": args.hnsw_construction_ef, "hnsw:search_ef": args.hnsw_search_ef,
+        })
+        self.nbytes = None  # Graph + float32 vectors; not reported by Chroma
+
+    def add(self, ids, vectors):
+        step = 5000  # Below Chroma's max batch size
+        for start in range(0, len(ids), step):
+            self.collection.add(ids=ids[start:start + step], embeddings=vectors[start:start + step].tolist())
+
+    def search(self, query, k):
+        ids = self.collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])["ids"][0]
+        return [(id_, None) for id_ in ids]
+
+
+def build(name: str, args):
+    if name == "chroma-hnsw":
+        return ChromaHNSW(args)
+    kind, dtype, *reduction = name.split("-")
+    pca_dim = args.pca_dim if reduction else 0
+    return create_index(kind, dtype, nlist=args.nlist, nprobe=args.nprobe, pca_dim=pca_dim, pca_sample=args.pca_sample)
+
+
+def run(name: str, vectors, queries, truth, args) -> dict:
+    index = build(name, args)
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), ADD_BATCH):
+        batch = vectors[offset:offset + ADD_BATCH]
+        index.add([str(i) for i in range(offset, offset + len(batch))], batch)
+    build_s = time.perf_counter() - start
+
+    rescoring = getattr(index, "lossy", False) and args.rescore > 1
+    stored = StoredVectors(vectors)
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        t = time.perf_counter()
+        if rescoring:
+            found = rescore(query, index.search(query, args.k * args.rescore), stored, args.k)
+        else:
+            found = index.search(query, args.k)
+        latencies.append(time.perf_counter() - t)
+        hits += len(expected & {id_ for id_, _ in found})
+
+    latencies.sort()
+    nbytes = index.nbytes
+    return {
+        "index": name,
+        "build_s": round(build_s, 2),
+        "vector_mb": round(nbytes / 1e6, 1) if nbytes is not None else None,
+        "bytes_per_chunk": round(nbytes / len(vectors)) if nbytes is not None else None,
+        "query_p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "query_p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 3),
+        f"recall_at_{args.k}": round(hits / (len(truth) * args.k), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--indexes", nargs="+", default=INDEXES, choices=INDEXES)
+    parser.add_argument("--pca-dim", type=int, default=96, help="Dimensions kept by the -pca indexes")
+    parser.add_argument("--pca-sample", type=int, default=4096)
+    parser.add_argument("--rescore", type=int, default=4, help="Candidates rescored per result (0 = off)")
+    parser.add_argument("--decay", type=float, default=0.0, help="Spectrum decay of the corpus")
+    parser.add_argument("--nlist", type=int, default=0, help="IVF lists (0 = sqrt(n))")
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--hnsw-m", type=int, default=16)
+    parser.add_argument("--hnsw-construction-ef", type=int, default=100)
+    parser.add_argument("--hnsw-search-ef", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    report = {"params": vars(args), "results": []}
+    for size in args.sizes:
+        vectors = make_corpus(size, args.dim, args.seed, decay=args.decay)
+        queries = make_queries(vectors, args.queries, args.seed)
+        truth = exact_neighbors(vectors, queries, args.k)
+        for name in args.indexes:
+            result = run(name, vectors, queries, truth, args)
+            result["chunks"] = size
+            report["results"].append(result)
+            print(json.dumps(result), file=sys.stderr)
+        del vectors
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
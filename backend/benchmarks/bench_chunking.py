@@ -0,0 +1,138 @@
+"""
+Chunking benchmark: throughput and retrieval quality.
+
+Compares the legacy per-element chunking (each <p>/<h*>/<article>/<section>
+kept only if 50..2000 chars) against the streaming token-aware chunker on
+synthetic pages with planted facts, then measures BM25 recall@k for
+questions about those facts.
+
+Usage:
+    python benchmarks/bench_chunking.py [--pages 200] [--seed 7]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bs4 import BeautifulSoup
+from rank_bm25 import BM25Okapi
+
+from chunking import chunk_blocks, clean_text, iter_blocks
+
+VOCAB = (
+    "system data model network service request memory cache index query "
+    "server client page content search result value process thread user "
+    "storage policy update report version access record signal metric "
+    "stream buffer domain layer engine kernel graph vector table module"
+).split()
+
+
+def make_sentence(rng: random.Random, words: int) -> str:
+    body = " ".join(rng.choice(VOCAB) for _ in range(words))
+    return body[0].upper() + body[1:] + "."
+
+
+def make_page(rng: random.Random, page_id: int) -> tuple[str, list[tuple[str, str]]]:
+    """Returns (html, [(question, answer_token)])."""
+    facts = []
+    parts = [f"<html><body><h1>Page {page_id}</h1><article>"]
+    for block_id in range(rng.randint(8, 16)):
+        kind = rng.random()
+        if kind < 0.25:
+            sentences = 1  # Tiny fragment
+            words = rng.randint(3, 7)
+        elif kind < 0.8:
+            sentences = rng.randint(2, 6)
+            words = rng.randint(10, 20)
+        else:
+            sentences = rng.randint(30, 60)  # Long article body (> 2000 chars)
+            words = rng.randint(12, 20)
+
+        body = [make_sentence(rng, words) for _ in range(sentences)]
+        if rng.random() < 0.5:
+            answer = f"zx{page_id}q{block_id}"
+            topic = f"widget{page_id}k{block_id}"
+            body.insert(rng.randrange(len(body) + 1), f"The calibration code for {topic} is {answer}.")
+            facts.append((f"What is the calibration code for {topic}?", answer))
+        parts.append(f"<p>{' '.join(body)}</p>")
+    parts.append("</article></body></html>")
+    return "".join(parts), facts
+
+
+def legacy_chunks(html: str) -> list[str]:
+    soup = BeautifulSoup(html, "html.parser")
+    chunks = []
+    for tag in soup.find_all(['p', 'h1', 'h2', 'h3', 'article', 'section']):
+        text = clean_text(tag.get_text(separator=' ', strip=True))
+        if 50 <= len(text) <= 2000:
+            chunks.append(text)
+    return chunks
+
+
+def streaming_chunks(html: str) -> list[str]:
+    soup = BeautifulSoup(html, "html.parser")
+    return list(chunk_blocks(iter_blocks(soup), target_tokens=120, overlap_tokens=20, min_tokens=10))
+
+
+def tokenize(text: str) -> list[str]:
+    return clean_text(text).lower().replace(".", " ").replace("?", " ").split()
+
+
+def evaluate(name, chunker, pages, facts, k=5) -> dict:
+    total_bytes = sum(len(html.encode("utf-8")) for html in pages)
+
+    start = time.perf_counter()
+    chunks = [c for html in pages for c in chunker(html)]
+    elapsed = time.perf_counter() - start
+
+    bm25 = BM25Okapi([tokenize(c) for c in chunks])
+    hits = 0
+    for question, answer in facts:
+        scores = bm25.get_scores(tokenize(question))
+        top = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:k]
+        if any(answer in chunks[i] for i in top):
+            hits += 1
+
+    sizes = [len(tokenize(c)) for c in chunks]
+    return {
+        "chunker": name,
+        "chunks": len(chunks),
+        "mean_chunk_tokens": round(sum(sizes) / max(len(sizes), 1), 1),
+        "chunks_under_10_tokens": sum(1 for s in sizes if s < 10),
+        "throughput_mb_s": round(total_bytes / elapsed / 1e6, 2),
+        f"recall_at_{k}": round(hits / max(len(facts), 1), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages, facts = [], []
+    for page_id in range(args.pages):
+        html, page_facts = make_page(rng, page_id)
+        pages.append(html)
+        facts.extend(page_facts)
+
+    results = {
+        "pages": args.pages,
+        "facts": len(facts),
+        "input_mb": round(sum(len(p) for p in pages) / 1e6, 2),
+        "results": [
+            evaluate("legacy", legacy_chunks, pages, facts),
+            evaluate("streaming", streaming_chunks, pages, facts),
+        ],
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
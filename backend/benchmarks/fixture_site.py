@@ -0,0 +1,134 @@
+"""
+Deterministic static site for offline crawl benchmarks.
+
+Pages are generated in memory from a seed: `sections` independent link
+graphs of `pages_per_section` articles each, so one ingest per section root
+crawls a known number of pages. Also serves robots.txt (allow all) and a
+sitemap.xml listing every page.
+
+Usage:
+    python benchmarks/fixture_site.py [--port 8100] [--sections 5] [--pages-per-section 10]
+"""
+
+import argparse
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+VOCABULARY = (
+    "index cache vector query token chunk crawler server worker embedding model "
+    "latency throughput memory snapshot retrieval ranking summary podcast source "
+    "request response pipeline storage process thread queue document section "
+    "network protocol search answer context window budget metric signal"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(VOCABULARY) for _ in range(rng.randint(8, 20))]
+    return " ".join(words).capitalize() + "."
+
+
+def _page(rng: random.Random, title: str, links: list, paragraphs: int) -> str:
+    body = "\n".join(
+        f"<p>{' '.join(_sentence(rng) for _ in range(rng.randint(3, 6)))}</p>"
+        for _ in range(paragraphs)
+    )
+    # Links live in the article: both crawlers strip <nav> before extracting links
+    related = " ".join(f'<a href="{href}">{href}</a>' for href in links)
+    return (
+        f"<!DOCTYPE html><html><head><title>{title}</title>"
+        f"<style>p {{ margin: 0; }}</style><script>var x = 1;</script></head>"
+        f"<body><nav>Home</nav><article><h1>{title}</h1>\n{body}\n<p>Related: {related}</p></article>"
+        f"<footer>Fixture site</footer></body></html>"
+    )
+
+
+def build_site(sections: int = 5, pages_per_section: int = 10,
+               paragraphs: int = 6, seed: int = 42) -> Dict[str, bytes]:
+    """Returns {path: html bytes}; section i's root is /s{i}/."""
+    rng = random.Random(seed)
+    pages: Dict[str, bytes] = {}
+    for s in range(sections):
+        paths = [f"/s{s}/"] + [f"/s{s}/page{p}.html" for p in range(1, pages_per_section)]
+        for i, path in enumerate(paths):
+            # Each page links to the next two, so a crawl from the root reaches all of them
+            links = paths[i + 1:i + 3] + [paths[0]]
+            pages[path] = _page(rng, f"Section {s} page {i}", links, paragraphs).encode()
+
+    urls = "".join(f"<url><loc>{{base}}{path}</loc></url>" for path in pages)
+    pages["/sitemap.xml"] = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+    ).encode()
+    pages["/robots.txt"] = b"User-agent: *\nAllow: /\n"
+    return pages
+
+
+class FixtureSite:
+    """Serves build_site() on 127.0.0.1 from a background thread."""
+
+    def __init__(self, port: int = 0, **site_kwargs):
+        pages = build_site(**site_kwargs)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                body = pages.get(path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                if path == "/sitemap.xml":
+                    body = body.replace(b"{base}", site.base_url.encode())
+                    content_type = "application/xml"
+                elif path == "/robots.txt":
+                    content_type = "text/plain"
+                else:
+                    content_type = "text/html; charset=utf-8"
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        site = self
+        self.pages = pages
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def section_urls(self):
+        return sorted(
+            f"{self.base_url}{path}" for path in self.pages
+            if path.count("/") == 2 and path.endswith("/")
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--sections", type=int, default=5)
+    parser.add_argument("--pages-per-section", type=int, default=10)
+    args = parser.parse_args()
+
+    with FixtureSite(args.port, sections=args.sections, pages_per_section=args.pages_per_section) as site:
+        print(f"Serving fixture site at {site.base_url}/ (sections: {', '.join(site.section_urls())})")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Chat throughput vs. uvicorn worker count.
+
+For each worker count, starts `uvicorn <app>:app --workers N` against one
+shared index store, seeds the store (server2 only) with a synthetic corpus,
+then drives /chat with a fixed number of concurrent clients and reports
+requests/s and latency percentiles as JSON.
+
+Usage:
+    python benchmarks/load_chat.py [--app server2] [--workers 1 2 4]
+                                   [--concurrency 16] [--duration 30]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+from shared_store import SharedIndexStore
+
+QUESTIONS = [
+    "What does the cache layer do?",
+    "How is the index updated?",
+    "Which process handles requests?",
+    "What is stored in the vector table?",
+    "How are metrics reported?",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def seed_store(path: str, chunks: int, seed: int = 7):
+    words = "cache index process request vector table metric layer update report stream".split()
+    rng = random.Random(seed)
+    texts = [
+        " ".join(rng.choice(words) for _ in range(60)) + f" chunk{i}."
+        for i in range(chunks)
+    ]
+    SharedIndexStore(path).append("https://bench.local/", texts, "2024-01-01T00:00:00")
+
+
+async def wait_ready(base_url: str, timeout: float = 300.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/sources")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"Server at {base_url} did not become ready")
+
+
+async def drive(base_url: str, concurrency: int, duration: float) -> dict:
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+
+    async def client_loop(client: httpx.AsyncClient, worker_id: int):
+        nonlocal errors
+        i = worker_id
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                resp = await client.post(f"{base_url}/chat", json={"question": QUESTIONS[i % len(QUESTIONS)]})
+                if resp.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            i += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+        started = time.monotonic()
+        await asyncio.gather(*(client_loop(client, n) for n in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+
+    def pct(p):
+        return round(latencies[min(int(p * len(latencies)), len(latencies) - 1)] * 1000, 1) if latencies else None
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+    }
+
+
+def run_for_workers(app: str, workers: int, args) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, "index.sqlite3")
+        if app == "server2":
+            seed_store(store_path, args.chunks)
+
+        env = dict(
+            os.environ,
+            WORKERS=str(workers),
+            SHARED_INDEX_PATH=store_path,
+            RATE_LIMIT_ENABLED="false",
+        )
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", f"{app}:app", "--host", "127.0.0.1",
+             "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+            env=env,
+        )
+        try:
+            asyncio.run(wait_ready(base_url))
+            asyncio.run(drive(base_url, args.concurrency, min(5.0, args.duration)))  # Warm-up
+            result = asyncio.run(drive(base_url, args.concurrency, args.duration))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    result["workers"] = workers
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="server2", choices=["server", "server2"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--chunks", type=int, default=2000, help="Synthetic chunks seeded for server2")
+    args = parser.parse_args()
+
+    results = [run_for_workers(args.app, n, args) for n in args.workers]
+    baseline = results[0]["throughput_rps"] or 1.0
+    for r in results:
+        r["speedup"] = round(r["throughput_rps"] / baseline, 2)
+
+    print(json.dumps({"app": args.app, "concurrency": args.concurrency, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Offline benchmark suite for server.py and server2.py.
+
+Starts a local fixture site (benchmarks/fixture_site.py) and a stub Ollama
+(benchmarks/stub_ollama.py), then for each app launches uvicorn against them
+and measures:
+
+- startup_s: process spawn until /sources answers
+- ingest_pages_per_s: pages crawled and indexed per second over all sections
+- index_build_s: total time in the index stage (server2 BM25 snapshot
+  builds, server.py embedding + Chroma writes), read from /metrics
+- chat_p50_ms / chat_p99_ms / chat_rps: /chat under fixed concurrency
+- rss_per_chunk_bytes: resident memory growth during ingest per chunk
+
+No network access or model downloads are needed (server2 generates through
+the stub via GENERATION_BACKEND=ollama), so results are comparable across
+commits on the same machine. Output is one JSON document.
+
+Usage:
+    python benchmarks/run_suite.py [--apps server server2] [--sections 5]
+                                   [--pages-per-section 10] [--concurrency 4]
+                                   [--duration 10] [--output results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fixture_site import FixtureSite
+from load_chat import drive, free_port
+from stub_ollama import StubOllama
+
+# Stage whose time counts as "index build" in each app's rag_stage_seconds histogram
+INDEX_STAGE = {"server": "embed", "server2": "index"}
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size from /proc (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def stage_seconds(metrics_text: str, stage: str) -> Optional[float]:
+    match = re.search(rf'^rag_stage_seconds_sum{{stage="{stage}"}} (\S+)$', metrics_text, re.M)
+    return round(float(match.group(1)), 4) if match else None
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def wait_ready(proc: subprocess.Popen, base_url: str, timeout: float = 300.0) -> float:
+    """Seconds until the app answers /sources."""
+    start = time.perf_counter()
+    with httpx.Client() as client:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"Server exited with code {proc.returncode}")
+            try:
+                if client.get(f"{base_url}/sources").status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.05)
+    raise RuntimeError(f"Server at {base_url} did not become ready")
+
+
+def ingest(base_url: str, section_urls, pages_per_section: int) -> dict:
+    pages = chunks = 0
+    start = time.perf_counter()
+    with httpx.Client(timeout=600.0) as client:
+        for url in section_urls:
+            resp = client.post(f"{base_url}/ingest", json={"url": url, "max_pages": pages_per_section})
+            resp.raise_for_status()
+            data = resp.json()
+            pages += data.get("pages_crawled", data.get("pages_visited", 0))
+            chunks += data["chunks_added"]
+    return {"pages": pages, "chunks": chunks, "seconds": time.perf_counter() - start}
+
+
+def run_app(app: str, site: FixtureSite, stub: StubOllama, args) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            OLLAMA_HOST=stub.base_url,
+            ALLOW_PRIVATE_NETWORKS="true",
+            RATE_LIMIT_ENABLED="false",
+            WORKERS="1",
+            SHARED_INDEX_PATH="",
+            PERSIST_DIRECTORY=os.path.join(tmp, "chroma"),
+            GENERATION_BACKEND=args.server2_generation,
+            ANONYMIZED_TELEMETRY="False",
+        )
+        env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", f"{app}:app", "--host", "127.0.0.1",
+             "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=None if args.verbose else subprocess.DEVNULL,
+        )
+        try:
+            startup = wait_ready(proc, base_url)
+            rss_before = rss_bytes(proc.pid)
+
+            crawl = ingest(base_url, site.section_urls(), args.pages_per_section)
+            rss_after = rss_bytes(proc.pid)
+
+            metrics_text = httpx.get(f"{base_url}/metrics").text
+            asyncio.run(drive(base_url, args.concurrency, min(2.0, args.duration)))  # Warm-up
+            chat = asyncio.run(drive(base_url, args.concurrency, args.duration))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    memory_per_chunk = None
+    if rss_before is not None and rss_after is not None and crawl["chunks"]:
+        memory_per_chunk = round((rss_after - rss_before) / crawl["chunks"])
+
+    return {
+        "startup_s": round(startup, 3),
+        "pages_ingested": crawl["pages"],
+        "chunks_indexed": crawl["chunks"],
+        "ingest_s": round(crawl["seconds"], 3),
+        "ingest_pages_per_s": round(crawl["pages"] / crawl["seconds"], 2),
+        "index_build_s": stage_seconds(metrics_text, INDEX_STAGE[app]),
+        "chat_requests": chat["requests"],
+        "chat_errors": chat["errors"],
+        "chat_rps": chat["throughput_rps"],
+        "chat_p50_ms": chat["p50_ms"],
+        "chat_p99_ms": chat["p99_ms"],
+        "rss_startup_bytes": rss_before,
+        "rss_per_chunk_bytes": memory_per_chunk,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", nargs="+", default=["server", "server2"], choices=["server", "server2"])
+    parser.add_argument("--sections", type=int, default=5)
+    parser.add_argument("--pages-per-section", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of /chat load per app")
+    parser.add_argument("--embed-ms", type=float, default=1.0, help="Stub latency per embedded text")
+    parser.add_argument("--generate-ms", type=float, default=50.0, help="Stub latency per generation")
+    parser.add_argument("--server2-generation", default="ollama", choices=["ollama", "transformers"],
+                        help="'transformers' loads the real local model (needs it cached)")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show server logs")
+    args = parser.parse_args()
+
+    results = {}
+    with FixtureSite(sections=args.sections, pages_per_section=args.pages_per_section) as site, \
+            StubOllama(embed_ms=args.embed_ms, generate_ms=args.generate_ms) as stub:
+        for app in args.apps:
+            results[app] = run_app(app, site, stub, args)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "verbose")},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Stub Ollama server for offline benchmarks.
+
+Implements the subset of the Ollama HTTP API both servers use:
+/api/version, /api/tags, /api/embeddings, /api/embed, /api/generate and
+/api/chat (streamed NDJSON unless "stream": false). Embeddings are
+deterministic hashed bag-of-words vectors, so retrieval still favours
+chunks that share words with the question. Generation returns a canned
+answer after a fixed, configurable latency, which keeps the LLM out of the
+numbers being compared between commits. With --prompt-ms, generation also
+takes that long per prompt word, and /api/generate returns a "context" that
+later calls can pass back, whose words (like a real KV cache) cost nothing.
+Reranking prompts ("Rate how well each passage ...") are answered with one
+"<number>: <score>" line per passage, scored by word overlap with the question.
+
+Usage:
+    python benchmarks/stub_ollama.py [--port 11500] [--embed-ms 1] [--generate-ms 50] [--prompt-ms 0]
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+EMBEDDING_DIM = 256
+ANSWER = "Based on the provided context, the pipeline caches retrieval results and streams answers."
+RATING_PREFIX = "Rate how well each passage"
+
+
+def embed(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    """L2-normalised hashed term-frequency vector."""
+    vec = [0.0] * dim
+    for token in re.findall(r"\w+", text.lower()):
+        h = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+        vec[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+def rate_passages(prompt: str) -> str:
+    """Scores 0-10 for the numbered passages of a rating prompt: share of question words they contain."""
+    question = re.search(r"^Question: (.*)$", prompt, re.MULTILINE)
+    question_words = set(re.findall(r"\w+", question.group(1).lower())) if question else set()
+    lines = []
+    for number, passage in re.findall(r"^\[(\d+)\] (.*)$", prompt, re.MULTILINE):
+        overlap = len(question_words & set(re.findall(r"\w+", passage.lower())))
+        lines.append(f"{number}: {round(10 * overlap / max(len(question_words), 1))}")
+    return "\n".join(lines)
+
+
+class StubOllama:
+    """Serves the stub API on 127.0.0.1 from a background thread."""
+
+    def __init__(self, port: int = 0, embed_ms: float = 1.0, generate_ms: float = 50.0, prompt_ms: float = 0.0):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this, delayed
+            # ACKs add ~40ms to every call on a keep-alive connection
+            disable_nagle_algorithm = True
+
+            def _json(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = self.path.rstrip("/")
+                if path == "/api/version":
+                    self._json({"version": "0.0.0-stub"})
+                elif path == "/api/tags":
+                    self._json({"models": [{"name": "llama3:latest", "model": "llama3:latest"}]})
+                else:
+                    self._json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                path = self.path.rstrip("/")
+                stub.requests += 1
+
+                if path == "/api/embeddings":
+                    time.sleep(stub.embed_ms / 1000)
+                    self._json({"embedding": embed(request.get("prompt", ""))})
+                elif path == "/api/embed":
+                    inputs = request.get("input", "")
+                    inputs = [inputs] if isinstance(inputs, str) else inputs
+                    time.sleep(stub.embed_ms * len(inputs) / 1000)
+                    self._json({"model": request.get("model"), "embeddings": [embed(t) for t in inputs]})
+                elif path in ("/api/generate", "/api/chat"):
+                    if path == "/api/chat":
+                        prompt = " ".join(m.get("content", "") for m in request.get("messages", []))
+                    else:
+                        prompt = request.get("prompt", "")
+                    prompt_words = len(prompt.split())
+                    stub.prompt_words += prompt_words
+                    time.sleep((stub.generate_ms + stub.prompt_ms * prompt_words) / 1000)
+                    self._generate(path, request, prompt_words)
+                else:
+                    self._json({"error": "not found"}, 404)
+
+            def _generate(self, path: str, request: dict, prompt_words: int):
+                model = request.get("model", "llama3")
+                if path == "/api/chat":
+                    def piece(text, done):
+                        return {"model": model, "message": {"role": "assistant", "content": text}, "done": done}
+                else:
+                    def piece(text, done):
+                        return {"model": model, "response": text, "done": done}
+
+                if request.get("stream") is False:
+                    prompt = request.get("prompt", "")
+                    final = piece(rate_passages(prompt) if prompt.startswith(RATING_PREFIX) else ANSWER, True)
+                    if path == "/api/generate":
+                        # Stand-in token ids: one per prompt and answer word
+                        context = list(request.get("context") or [])
+                        final["context"] = context + list(range(prompt_words + len(ANSWER.split())))
+                        final["prompt_eval_count"] = prompt_words
+                    self._json(final)
+                    return
+
+                lines = [piece(word + " ", False) for word in ANSWER.split()]
+                lines.append(dict(piece("", True), done_reason="stop", eval_count=len(lines)))
+                body = b"".join(json.dumps(line).encode() + b"\n" for line in lines)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.embed_ms = embed_ms
+        self.generate_ms = generate_ms
+        self.prompt_ms = prompt_ms
+        self.requests = 0
+        self.prompt_words = 0  # Prompt words evaluated (context passed back is free)
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--embed-ms", type=float, default=1.0, help="Latency per embedded text")
+    parser.add_argument("--generate-ms", type=float, default=50.0, help="Latency per generation")
+    parser.add_argument("--prompt-ms", type=float, default=0.0, help="Extra latency per prompt word")
+    args = parser.parse_args()
+
+    with StubOllama(args.port, args.embed_ms, args.generate_ms, args.prompt_ms) as stub:
+        print(f"Stub Ollama listening at {stub.base_url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+BM25 over term postings.
+
+Scores match rank_bm25's BM25Okapi exactly (same idf floor, same float64
+arithmetic in the same order), but the index is a handful of flat NumPy
+arrays instead of one Python dict per document:
+
+- vocabulary: terms, with a {term: id} dict built on load
+- postings in CSR form: offsets[term]..offsets[term + 1] index into
+  doc_ids / tfs, documents ascending within each term
+- doc_len per document
+
+A query only touches the postings of its own terms (BM25Okapi walks every
+document's dict for every query term), and the arrays can be written into a
+snapshot file and memory-mapped back without rebuilding anything.
+
+search_many scores a batch of queries together: the product of their
+term-count matrix with the postings' term x document weights, computed so
+that each term's weights are worked out once per batch and a common term,
+once it shows up again, is added as a dense row rather than by scattering
+its (long) postings for every query that uses it.
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Terms in at least this fraction of documents are expanded to dense rows when shared
+_DENSE_FRACTION = 1 / 8
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first. Equal scores stay in index
+    order, exactly like a stable sort of every score, without sorting them all.
+    """
+    indices = np.arange(len(scores))
+    if k < len(scores):
+        threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+        above = np.flatnonzero(scores > threshold)
+        ties = np.flatnonzero(scores == threshold)[:k - len(above)]
+        indices = np.concatenate([above, ties])
+    return indices[np.lexsort((indices, -scores[indices]))]
+
+
+class BM25Index:
+    def __init__(self, terms: Sequence[str], offsets: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray,
+                 doc_len: np.ndarray, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25,
+                 vocabulary: Optional[Dict[str, int]] = None):
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.k1, self.b, self.epsilon = k1, b, epsilon
+        self.vocabulary = vocabulary if vocabulary is not None else {term: i for i, term in enumerate(terms)}
+        self.corpus_size = len(doc_len)
+        self.avgdl = float(doc_len.sum()) / self.corpus_size if self.corpus_size else 0.0
+
+        # Same idf (with its floor for terms in more than half the documents) as BM25Okapi
+        df = np.diff(offsets).tolist()
+        idf = [math.log(self.corpus_size - freq + 0.5) - math.log(freq + 0.5) for freq in df]
+        idf_sum = 0.0
+        for value in idf:
+            idf_sum += value
+        eps = self.epsilon * (idf_sum / len(idf) if idf else 0.0)
+        self.idf = np.array([eps if value < 0 else value for value in idf], dtype=np.float64)
+        self._norm = self.k1 * (1 - self.b + self.b * doc_len.astype(np.float64) / (self.avgdl or 1.0))
+
+    def __len__(self) -> int:
+        return self.corpus_size
+
+    @classmethod
+    def from_corpus(cls, corpus: Sequence[Sequence[str]], **params) -> "BM25Index":
+        """Index tokenized documents."""
+        vocabulary: Dict[str, int] = {}
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        tfs: List[int] = []
+        doc_len = np.zeros(len(corpus), dtype=np.int32)
+        for doc_id, tokens in enumerate(corpus):
+            doc_len[doc_id] = len(tokens)
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+                doc_ids.append(doc_id)
+                tfs.append(count)
+
+        term_array = np.array(term_ids, dtype=np.int64)
+        order = np.argsort(term_array, kind="stable")  # Stable: documents stay ascending per term
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_array, minlength=len(vocabulary)), out=offsets[1:])
+        return cls(
+            list(vocabulary), offsets,
+            np.array(doc_ids, dtype=np.int32)[order], np.array(tfs, dtype=np.int32)[order],
+            doc_len, vocabulary=vocabulary, **params
+        )
+
+    def _weights(self, term: int) -> Tuple[np.ndarray, np.ndarray]:
+        """A term's postings: (documents, their BM25 weight for the term)."""
+        start, end = self.offsets[term], self.offsets[term + 1]
+        docs = self.doc_ids[start:end]
+        tf = self.tfs[start:end]
+        return docs, self.idf[term] * (tf * (self.k1 + 1) / (tf + self._norm[docs]))
+
+    def get_scores(self, query: Sequence[str]) -> np.ndarray:
+        """BM25 score of every document for a tokenized query."""
+        scores = np.zeros(self.corpus_size)
+        for token in query:
+            term = self.vocabulary.get(token)
+            if term is None:
+                continue
+            docs, weights = self._weights(term)
+            scores[docs] += weights
+        return scores
+
+    def get_scores_many(self, queries: Sequence[Sequence[str]]) -> np.ndarray:
+        """
+        get_scores of each of a batch of tokenized queries, one row per query
+        (identical values: every row adds the same weights in the same order).
+        """
+        scores = np.zeros((len(queries), self.corpus_size))
+        postings: Dict[int, Tuple[Optional[np.ndarray], np.ndarray]] = {}
+        dense_budget = len(queries)  # Dense rows never take more memory than the scores
+        for row, query in zip(scores, queries):
+            for token in query:
+                term = self.vocabulary.get(token)
+                if term is None:
+                    continue
+                entry = postings.get(term)
+                if entry is None:
+                    entry = postings[term] = self._weights(term)
+                elif entry[0] is not None and dense_budget and len(entry[0]) >= _DENSE_FRACTION * self.corpus_size:
+                    dense = np.zeros(self.corpus_size)
+                    dense[entry[0]] = entry[1]
+                    entry = postings[term] = (None, dense)
+                    dense_budget -= 1
+                docs, weights = entry
+                if docs is None:
+                    row += weights  # Adding 0.0 elsewhere leaves those scores exactly as they were
+                else:
+                    row[docs] += weights
+        return scores
+
+    def search(self, query: Sequence[str], k: int) -> List[Tuple[int, float]]:
+        """The k best (document, score) pairs for a tokenized query."""
+        scores = self.get_scores(query)
+        return [(int(doc), float(scores[doc])) for doc in top_k(scores, k)]
+
+    def search_many(self, queries: Sequence[Sequence[str]], k: int,
+                    max_cells: int = 1 << 22) -> List[List[Tuple[int, float]]]:
+        """search for each tokenized query, scored in batches of at most max_cells scores."""
+        batch = max(1, max_cells // max(1, self.corpus_size))
+        results = []
+        for start in range(0, len(queries), batch):
+            for scores in self.get_scores_many(queries[start:start + batch]):
+                results.append([(int(doc), float(scores[doc])) for doc in top_k(scores, k)])
+        return results
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Postings for a snapshot file (the vocabulary is stored separately)."""
+        return {"offsets": self.offsets, "doc_ids": self.doc_ids, "tfs": self.tfs, "doc_len": self.doc_len}
+
+    def params(self) -> Dict[str, float]:
+        return {"k1": self.k1, "b": self.b, "epsilon": self.epsilon}
@@ -0,0 +1,147 @@
+"""
+Inputs for bulk ingestion: sitemaps and uploaded documents.
+
+Sitemaps follow the sitemaps.org protocol: a <urlset> of pages (with
+optional <lastmod>) or a <sitemapindex> of further sitemaps, optionally
+gzipped. Uploaded files are turned into either HTML (parsed by the server's
+usual page pipeline) or plain text; PDFs are extracted with pypdf.
+"""
+
+import gzip
+import logging
+import os
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Uncompressed sitemaps are capped at 50MB by the protocol
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+
+UPLOAD_EXTENSIONS = {
+    ".pdf": "pdf",
+    ".html": "html", ".htm": "html", ".xhtml": "html",
+    ".txt": "text", ".md": "text", ".rst": "text", ".csv": "text",
+}
+UPLOAD_CONTENT_TYPES = {
+    "application/pdf": "pdf",
+    "text/html": "html", "application/xhtml+xml": "html",
+    "text/plain": "text", "text/markdown": "text",
+}
+
+
+# --- SITEMAPS ---
+@dataclass(frozen=True)
+class SitemapEntry:
+    url: str
+    lastmod: Optional[str] = None
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_sitemap(content: bytes) -> Tuple[List[SitemapEntry], List[str]]:
+    """Returns (page entries, nested sitemap URLs) of one sitemap document."""
+    if content[:2] == b"\x1f\x8b":
+        with gzip.GzipFile(fileobj=BytesIO(content)) as f:
+            content = f.read(MAX_SITEMAP_BYTES + 1)
+    if len(content) > MAX_SITEMAP_BYTES:
+        raise ValueError("Sitemap too large")
+
+    try:
+        root = ET.fromstring(content)
+    except ET.ParseError as e:
+        raise ValueError(f"Invalid sitemap XML: {e}")
+
+    pages, sitemaps = [], []
+    for node in root:
+        fields = {_local_name(child.tag): (child.text or "").strip() for child in node}
+        loc = fields.get("loc")
+        if not loc:
+            continue
+        if _local_name(node.tag) == "sitemap":
+            sitemaps.append(loc)
+        elif _local_name(node.tag) == "url":
+            pages.append(SitemapEntry(loc, fields.get("lastmod") or None))
+    return pages, sitemaps
+
+
+def collect_sitemap(fetch: Callable[[str], Optional[bytes]], sitemap_url: str,
+                    max_urls: int, max_sitemaps: int = 20) -> List[SitemapEntry]:
+    """
+    Page entries reachable from a sitemap (following sitemap indexes), up to
+    max_urls. `fetch` returns a document's bytes, or None to skip it.
+    """
+    queue, seen = [sitemap_url], set()
+    entries: List[SitemapEntry] = []
+    while queue and len(seen) < max_sitemaps and len(entries) < max_urls:
+        url = queue.pop(0)
+        if url in seen:
+            continue
+        seen.add(url)
+        content = fetch(url)
+        if content is None:
+            continue
+        try:
+            pages, nested = parse_sitemap(content)
+        except ValueError as e:
+            logger.warning(f"Skipping sitemap {url}: {e}")
+            continue
+        entries.extend(pages[:max_urls - len(entries)])
+        queue.extend(nested)
+    return entries
+
+
+# --- UPLOADS ---
+def upload_kind(filename: str, content_type: Optional[str]) -> Optional[str]:
+    """'pdf', 'html' or 'text', or None if the file type isn't supported."""
+    kind = UPLOAD_EXTENSIONS.get(os.path.splitext(filename or "")[1].lower())
+    if kind is None and content_type:
+        kind = UPLOAD_CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+    return kind
+
+
+def decode_text(data: bytes, content_type: Optional[str] = None) -> str:
+    charset = "utf-8"
+    for param in (content_type or "").split(";")[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset" and value.strip():
+            charset = value.strip().strip('"')
+    try:
+        return data.decode(charset, errors="replace")
+    except LookupError:
+        return data.decode("utf-8", errors="replace")
+
+
+def pdf_text(data: bytes) -> str:
+    """Text of every page of a PDF, pages separated by blank lines."""
+    try:
+        from pypdf import PdfReader
+        from pypdf.errors import PdfReadError
+    except ImportError:
+        raise ValueError("PDF support requires pypdf. Run: pip install pypdf")
+
+    try:
+        reader = PdfReader(BytesIO(data))
+        pages = [page.extract_text() or "" for page in reader.pages]
+    except (PdfReadError, ValueError, KeyError) as e:
+        raise ValueError(f"Could not read PDF: {e}")
+    return "\n\n".join(text.strip() for text in pages if text.strip())
+
+
+def extract_upload(filename: str, content_type: Optional[str], data: bytes) -> Tuple[str, str]:
+    """Uploaded file as ('html', markup) or ('text', text); ValueError if unsupported."""
+    kind = upload_kind(filename, content_type)
+    if kind is None:
+        raise ValueError(f"Unsupported file type: {filename}")
+    if kind == "pdf":
+        return "text", pdf_text(data)
+    return kind, decode_text(data, content_type)
+
+
+def upload_source(filename: str) -> str:
+    """Source id recorded for an uploaded file's chunks."""
+    return f"upload://{os.path.basename(filename or 'document')}"
@@ -0,0 +1,127 @@
+"""
+Streaming, token-aware chunker.
+
+Pages are read as a stream of text blocks (paragraphs, headings, list
+items...). Small blocks are merged and large ones are split on sentence
+boundaries so every chunk lands close to a target token count, with a
+configurable overlap carried from one chunk into the next. Everything is a
+generator, so only the current chunk is held in memory no matter how large
+the page is.
+"""
+
+import re
+from collections import deque
+from typing import Callable, Deque, Iterable, Iterator, List, Tuple
+
+from bs4 import BeautifulSoup, Tag
+
+# Elements whose text forms a block. Containers (article/section/...) only
+# count when they have no nested blocks, so text is never emitted twice.
+BLOCK_TAGS = [
+    'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'blockquote', 'pre',
+    'td', 'dd', 'article', 'section'
+]
+_BLOCK_TAG_SET = set(BLOCK_TAGS)
+
+_WS_RE = re.compile(r'\s+')
+_CONTROL_RE = re.compile(r'[\x00-\x1f\x7f-\x9f]')
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+(?=["\'(\[]?[A-Z0-9])')
+_TOKEN_RE = re.compile(r'\w+|[^\w\s]')
+
+
+def clean_text(text: str) -> str:
+    """Clean and normalize text"""
+    # Remove extra whitespace
+    text = _WS_RE.sub(' ', text)
+    # Remove control characters
+    text = _CONTROL_RE.sub('', text)
+    return text.strip()
+
+
+def count_tokens(text: str) -> int:
+    """Cheap token estimate: words and punctuation marks."""
+    return len(_TOKEN_RE.findall(text))
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s for s in _SENTENCE_RE.split(text) if s]
+
+
+def iter_blocks(soup: BeautifulSoup) -> Iterator[str]:
+    """Yield the cleaned text of each leaf block element in document order."""
+    for node in soup.descendants:
+        if not isinstance(node, Tag) or node.name not in _BLOCK_TAG_SET:
+            continue
+        if node.find(BLOCK_TAGS) is not None:
+            continue  # Its nested blocks are yielded on their own
+
+        text = clean_text(node.get_text(separator=' ', strip=True))
+        if text:
+            yield text
+
+
+def _split_long_sentence(sentence: str, max_tokens: int, count: Callable[[str], int]) -> Iterator[Tuple[str, int]]:
+    """Yield (piece, tokens); sentences over max_tokens are hard-split on word boundaries."""
+    tokens = count(sentence)
+    if tokens <= max_tokens:
+        yield sentence, tokens
+        return
+
+    words = sentence.split(' ')
+    piece: List[str] = []
+    piece_tokens = 0
+    for word in words:
+        word_tokens = count(word)
+        if piece and piece_tokens + word_tokens > max_tokens:
+            yield ' '.join(piece), piece_tokens
+            piece, piece_tokens = [], 0
+        piece.append(word)
+        piece_tokens += word_tokens
+    if piece:
+        yield ' '.join(piece), piece_tokens
+
+
+def chunk_blocks(
+    blocks: Iterable[str],
+    target_tokens: int = 120,
+    overlap_tokens: int = 20,
+    min_tokens: int = 10,
+    count: Callable[[str], int] = count_tokens,
+) -> Iterator[str]:
+    """
+    Group blocks into chunks of about target_tokens tokens.
+
+    Chunks break between sentences; each new chunk starts with up to
+    overlap_tokens tokens of trailing sentences from the previous one.
+    A trailing chunk smaller than min_tokens is dropped.
+    """
+    if overlap_tokens >= target_tokens:
+        raise ValueError("overlap_tokens must be smaller than target_tokens")
+
+    buffer: Deque[Tuple[str, int]] = deque()
+    buffer_tokens = 0
+    fresh = False  # Buffer holds sentences not yet emitted
+
+    for block in blocks:
+        for sentence in split_sentences(block):
+            for piece, piece_tokens in _split_long_sentence(sentence, target_tokens, count):
+                if fresh and buffer_tokens + piece_tokens > target_tokens:
+                    yield ' '.join(text for text, _ in buffer)
+
+                    # Keep the tail of the emitted chunk as overlap
+                    overlap: Deque[Tuple[str, int]] = deque()
+                    overlap_size = 0
+                    for text, tokens in reversed(buffer):
+                        if overlap_size + tokens > overlap_tokens:
+                            break
+                        overlap.appendleft((text, tokens))
+                        overlap_size += tokens
+                    buffer, buffer_tokens = overlap, overlap_size
+                    fresh = False
+
+                buffer.append((piece, piece_tokens))
+                buffer_tokens += piece_tokens
+                fresh = True
+
+    if fresh and buffer_tokens >= min_tokens:
+        yield ' '.join(text for text, _ in buffer)
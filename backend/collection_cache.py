@@ -0,0 +1,108 @@
+"""
+Named knowledge bases ("collections") and an LRU of the ones held in memory.
+
+Each collection has its own index, dedup state and stats. Only recently used
+collections stay loaded: a collection is loaded on first use, and the least
+recently used ones are evicted once more than `capacity` are loaded or after
+`idle_ttl` seconds without use, so memory follows the active working set
+rather than the total number of collections. Evicted collections reload
+from persistent storage on their next use.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar
+
+from metrics import CACHE_HITS, CACHE_MISSES, COLLECTIONS_LOADED
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLLECTION = "default"
+# Also valid Chroma collection names: 3-63 chars, alphanumeric at both ends
+COLLECTION_NAME_PATTERN = r"^[A-Za-z0-9][A-Za-z0-9_-]{1,61}[A-Za-z0-9]$"
+
+T = TypeVar("T")
+
+
+class CollectionCache(Generic[T]):
+    """
+    Thread-safe LRU of loaded collections. capacity=0 disables eviction
+    (for collections that live only in memory and could not be reloaded).
+    """
+
+    def __init__(self, capacity: int = 8, idle_ttl: float = 0.0,
+                 can_evict: Callable[[T], bool] = lambda value: True,
+                 clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.idle_ttl = idle_ttl
+        self.can_evict = can_evict
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[T, float]]" = OrderedDict()  # name -> (value, last used)
+
+    def get(self, name: str, loader: Callable[[], T]) -> T:
+        """The loaded collection, loading it (and evicting others) on a miss."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                CACHE_HITS.labels("collections").inc()
+                self._entries[name] = (entry[0], now)
+                self._entries.move_to_end(name)
+                value = entry[0]
+            else:
+                CACHE_MISSES.labels("collections").inc()
+                value = loader()
+                self._entries[name] = (value, now)
+            self._evict(now, keep=name)
+            COLLECTIONS_LOADED.set(len(self._entries))
+            return value
+
+    def peek(self, name: str) -> Optional[T]:
+        with self._lock:
+            entry = self._entries.get(name)
+            return entry[0] if entry else None
+
+    def pop(self, name: str) -> Optional[T]:
+        with self._lock:
+            entry = self._entries.pop(name, None)
+            COLLECTIONS_LOADED.set(len(self._entries))
+            return entry[0] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            COLLECTIONS_LOADED.set(0)
+
+    def items(self) -> List[Tuple[str, T]]:
+        with self._lock:
+            return [(name, value) for name, (value, _) in self._entries.items()]
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            return name in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def evict_idle(self) -> int:
+        """Drop collections idle for longer than idle_ttl; returns how many."""
+        with self._lock:
+            before = len(self._entries)
+            self._evict(self._clock())
+            COLLECTIONS_LOADED.set(len(self._entries))
+            return before - len(self._entries)
+
+    def _evict(self, now: float, keep: Optional[str] = None):
+        if not self.capacity:
+            return
+        for name, (value, last_used) in list(self._entries.items()):  # Oldest first
+            if name == keep or not self.can_evict(value):
+                continue
+            idle = self.idle_ttl and now - last_used > self.idle_ttl
+            if idle or len(self._entries) > self.capacity:
+                del self._entries[name]
+                logger.info(f"📤 Unloaded collection '{name}' ({'idle' if idle else 'LRU'})")
@@ -0,0 +1,129 @@
+"""
+Query-time context compression.
+
+Retrieved chunks are split into sentences, each sentence is scored by how
+many of the question's terms it contains (IDF-weighted over the candidate
+sentences, so rare terms count more, with a small bonus for chunks that
+ranked higher in retrieval), and the best sentences are packed greedily
+until a token budget is reached. Token counts come from the caller (the
+model's tokenizer when one is available, else the chunker's estimate).
+
+The packed context keeps the selected sentences in their original order and
+groups them per source, each group numbered [1], [2]... so the model can cite
+them and the response can map every citation number back to its source.
+"""
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from chunking import count_tokens, split_sentences
+
+_WORD_RE = re.compile(r"\w+")
+# Words too common to say anything about relevance
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how i if in is it its me my of on or that the their
+there these they this to was we what when where which who why will with you your about into than then so
+""".split())
+# "[n] " label and blank line in front of each source's sentences
+GROUP_OVERHEAD_TOKENS = 4
+
+
+@dataclass(frozen=True)
+class PackedContext:
+    text: str                # "[1] ...\n\n[2] ..." ready for the prompt
+    citations: List[str]     # citations[n - 1] is the source of passage [n]
+    tokens: int              # Context tokens as counted by the packer
+    sentences_kept: int
+    sentences_total: int
+
+
+def terms(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in STOPWORDS]
+
+
+def truncate(text: str, max_tokens: int, count: Callable[[str], int] = count_tokens) -> str:
+    """Longest word prefix of text within max_tokens."""
+    words = text.split(" ")
+    lo, hi = 0, len(words)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count(" ".join(words[:mid])) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return " ".join(words[:lo])
+
+
+def pack_context(question: str, passages: Sequence[Tuple[str, str]], budget_tokens: int,
+                 count: Callable[[str], int] = count_tokens, rank_weight: float = 0.1,
+                 relevant_only: bool = True, analyze: Callable[[str], List[str]] = terms) -> PackedContext:
+    """
+    Pack the most relevant sentences of `passages` ((text, source) pairs, best
+    retrieved first) into at most `budget_tokens` tokens. With relevant_only,
+    sentences sharing no term with the question are dropped (unless none
+    does, in which case retrieval order decides). `analyze` turns text into
+    the terms that are matched (pass the retriever's analyzer).
+    """
+    # (passage rank, position, sentence)
+    candidates = [
+        (rank, position, sentence)
+        for rank, (text, _) in enumerate(passages)
+        for position, sentence in enumerate(split_sentences(text))
+    ]
+    if not candidates:
+        return PackedContext("", [], 0, 0, 0)
+
+    sentence_terms = [set(analyze(sentence)) for _, _, sentence in candidates]
+    df = Counter(term for found in sentence_terms for term in found)
+    n = len(candidates)
+    query = set(analyze(question))
+    idf = {term: math.log(1 + n / (1 + df[term])) for term in query}
+
+    overlaps = [sum(idf[term] for term in query & found) for found in sentence_terms]
+    drop_unrelated = relevant_only and any(overlaps)
+    scored = []
+    for (rank, position, sentence), found, overlap in zip(candidates, sentence_terms, overlaps):
+        if drop_unrelated and not overlap:
+            continue
+        length_norm = 1 + math.log(1 + len(found))
+        score = overlap / length_norm + rank_weight * (len(passages) - rank) / len(passages)
+        scored.append((score, -rank, -position, rank, position, sentence))
+    scored.sort(reverse=True)
+
+    # Greedy: best sentences first, skipping any that no longer fit
+    selected: Dict[int, List[Tuple[int, str]]] = {}
+    cited = set()
+    used = 0
+    for _, _, _, rank, position, sentence in scored:
+        source = passages[rank][1]
+        tokens = count(sentence) + (0 if source in cited else GROUP_OVERHEAD_TOKENS)
+        if used + tokens > budget_tokens:
+            continue
+        selected.setdefault(rank, []).append((position, sentence))
+        cited.add(source)
+        used += tokens
+
+    if not selected:  # Even the best sentence is over budget: keep its beginning
+        _, _, _, rank, position, sentence = scored[0]
+        sentence = truncate(sentence, budget_tokens - GROUP_OVERHEAD_TOKENS, count)
+        if sentence:
+            selected[rank] = [(position, sentence)]
+            used = count(sentence) + GROUP_OVERHEAD_TOKENS
+
+    # One numbered group per source, in retrieval order
+    groups: Dict[str, List[str]] = {}
+    for rank in sorted(selected):
+        source = passages[rank][1]
+        groups.setdefault(source, []).extend(sentence for _, sentence in sorted(selected[rank]))
+    citations = list(groups)
+    text = "\n\n".join(f"[{number}] {' '.join(groups[source])}" for number, source in enumerate(citations, 1))
+    return PackedContext(
+        text=text,
+        citations=citations,
+        tokens=used,
+        sentences_kept=sum(len(kept) for kept in selected.values()),
+        sentences_total=n,
+    )
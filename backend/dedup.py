@@ -0,0 +1,223 @@
+"""
+Near-duplicate detection for ingested text.
+
+Each chunk gets an exact-content hash and a 64-bit SimHash fingerprint built
+from word shingles. Fingerprints are indexed with LSH bands (pigeonhole
+principle: two fingerprints within k bits of each other agree exactly on at
+least one of k+1 bands), so a lookup only compares against a handful of
+candidates instead of the whole corpus.
+"""
+
+import hashlib
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, TypeVar
+
+FINGERPRINT_BITS = 64
+
+_WORD_RE = re.compile(r'\w+')
+_WS_RE = re.compile(r'\s+')
+
+T = TypeVar("T")
+
+
+# --- FINGERPRINTS ---
+def _hash64(data: str) -> int:
+    return int.from_bytes(hashlib.blake2b(data.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def content_hash(text: str) -> bytes:
+    """Hash of whitespace/case-normalized text, used for exact duplicates."""
+    normalized = _WS_RE.sub(' ', text).strip().lower()
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+
+
+def simhash(tokens: List[str], shingle_size: int = 3) -> int:
+    """64-bit SimHash over word shingles (shingle counts act as weights)."""
+    if len(tokens) < shingle_size:
+        shingles = Counter([' '.join(tokens)])
+    else:
+        shingles = Counter(
+            ' '.join(tokens[i:i + shingle_size])
+            for i in range(len(tokens) - shingle_size + 1)
+        )
+
+    weights = [0] * FINGERPRINT_BITS
+    for shingle, count in shingles.items():
+        h = _hash64(shingle)
+        for bit in range(FINGERPRINT_BITS):
+            if h >> bit & 1:
+                weights[bit] += count
+            else:
+                weights[bit] -= count
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+# --- REPORT ---
+@dataclass
+class DedupReport:
+    """What a dedup pass removed."""
+    chunks_in: int = 0
+    chunks_kept: int = 0
+    exact_duplicates: int = 0
+    near_duplicates: int = 0
+    bytes_in: int = 0
+    bytes_saved: int = 0
+
+    @property
+    def chunks_dropped(self) -> int:
+        return self.exact_duplicates + self.near_duplicates
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data["chunks_dropped"] = self.chunks_dropped
+        return data
+
+
+# --- FILTER ---
+class NearDuplicateFilter:
+    """
+    Remembers every chunk it has accepted and rejects new chunks that are
+    exact or near duplicates of one of them.
+
+    threshold is the minimum SimHash similarity (1 - hamming / 64) at which
+    two chunks count as duplicates. Chunks shorter than min_tokens words are
+    only checked for exact duplicates, since SimHash is noisy on tiny inputs.
+    """
+
+    def __init__(self, threshold: float = 0.9, min_tokens: int = 8, shingle_size: int = 3):
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("threshold must be in (0, 1]")
+
+        self.threshold = threshold
+        self.min_tokens = min_tokens
+        self.shingle_size = shingle_size
+        self.max_distance = int((1.0 - threshold) * FINGERPRINT_BITS)
+
+        # Split the fingerprint into max_distance + 1 bands
+        num_bands = self.max_distance + 1
+        width, extra = divmod(FINGERPRINT_BITS, num_bands)
+        self._bands: List[Tuple[int, int]] = []  # [(shift, mask)]
+        shift = 0
+        for i in range(num_bands):
+            bits = width + (1 if i < extra else 0)
+            self._bands.append((shift, (1 << bits) - 1))
+            shift += bits
+
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything seen so far."""
+        self._exact: Set[bytes] = set()
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in self._bands]
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def _band_keys(self, fingerprint: int) -> List[int]:
+        return [(fingerprint >> shift) & mask for shift, mask in self._bands]
+
+    def _find_near(self, fingerprint: int) -> bool:
+        for band, key in zip(self._buckets, self._band_keys(fingerprint)):
+            for candidate in band.get(key, ()):
+                if hamming_distance(candidate, fingerprint) <= self.max_distance:
+                    return True
+        return False
+
+    def _check(self, text: str) -> Tuple[Optional[str], bytes, Optional[int]]:
+        """(verdict, digest, fingerprint): verdict is 'exact' or 'near' for duplicates, None otherwise."""
+        digest = content_hash(text)
+        if digest in self._exact:
+            return "exact", digest, None
+
+        tokens = _WORD_RE.findall(text.lower())
+        fingerprint = None
+        if len(tokens) >= self.min_tokens:
+            fingerprint = simhash(tokens, self.shingle_size)
+            if self._find_near(fingerprint):
+                return "near", digest, fingerprint
+        return None, digest, fingerprint
+
+    def _record(self, digest: bytes, fingerprint: Optional[int]):
+        self._exact.add(digest)
+        if fingerprint is not None:
+            for band, key in zip(self._buckets, self._band_keys(fingerprint)):
+                band.setdefault(key, []).append(fingerprint)
+
+    def _check_and_add(self, text: str) -> Optional[str]:
+        """Returns 'exact' or 'near' for duplicates, otherwise records text and returns None."""
+        verdict, digest, fingerprint = self._check(text)
+        if verdict is None:
+            self._record(digest, fingerprint)
+        return verdict
+
+    def add(self, texts: Iterable[str]):
+        """Seed the filter with already-indexed texts."""
+        with self._lock:
+            for text in texts:
+                self._check_and_add(text)
+
+    def params(self) -> Dict:
+        return {"threshold": self.threshold, "min_tokens": self.min_tokens, "shingle_size": self.shingle_size}
+
+    def export_state(self) -> Tuple[List[bytes], List[int]]:
+        """(exact digests, fingerprints) of everything seen, e.g. to store in a snapshot."""
+        with self._lock:
+            fingerprints = [fp for bucket in self._buckets[0].values() for fp in bucket]
+            return list(self._exact), fingerprints
+
+    def load_state(self, digests: Iterable[bytes], fingerprints: Iterable[int]):
+        """Replace what has been seen with exported state, without rehashing any text."""
+        with self._lock:
+            self.reset()
+            self._exact.update(digests)
+            for fingerprint in fingerprints:
+                for band, key in zip(self._buckets, self._band_keys(fingerprint)):
+                    band.setdefault(key, []).append(fingerprint)
+
+    def filter(self, items: Iterable[T], text_of: Callable[[T], str] = str,
+               record: bool = True) -> Tuple[List[T], DedupReport]:
+        """
+        Drop duplicates (of the seen corpus and of each other) from items.
+        With record=False the kept items are not remembered: call add() with
+        them once they are actually stored, so a failed write leaves no trace.
+        """
+        kept: List[T] = []
+        report = DedupReport()
+        # Duplicates within items are caught by a scratch filter when not recording
+        batch = self if record else NearDuplicateFilter(self.threshold, self.min_tokens, self.shingle_size)
+
+        with self._lock:
+            for item in items:
+                text = text_of(item)
+                size = len(text.encode("utf-8"))
+                report.chunks_in += 1
+                report.bytes_in += size
+
+                verdict = self._check_and_add(text) if record else self._check(text)[0]
+                if verdict is None and not record:
+                    verdict = batch._check_and_add(text)
+                if verdict is None:
+                    kept.append(item)
+                    continue
+
+                report.bytes_saved += size
+                if verdict == "exact":
+                    report.exact_duplicates += 1
+                else:
+                    report.near_duplicates += 1
+
+        report.chunks_kept = len(kept)
+        return kept, report
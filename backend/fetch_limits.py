@@ -0,0 +1,118 @@
+"""
+Streamed page downloads for the crawlers.
+
+Responses are streamed instead of read whole: the Content-Type header is
+checked before any of the body is read (closing the response then aborts the
+download of PDFs, videos and other binaries), and the body is decoded chunk
+by chunk as it arrives, so raw bytes are never held alongside the text.
+Each page is capped at a number of bytes (longer pages are truncated, which
+BeautifulSoup parses fine), and a CrawlBudget caps the bytes one whole crawl
+may download.
+"""
+
+import codecs
+import re
+import threading
+from typing import List, Optional
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+# How far into a page to look for <meta charset> when the header names none
+SNIFF_BYTES = 1024
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]+)""", re.I)
+_BOMS = ((codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+
+
+def is_html(content_type: Optional[str]) -> bool:
+    return (content_type or "").split(";")[0].strip().lower() in HTML_CONTENT_TYPES
+
+
+def header_charset(content_type: Optional[str]) -> Optional[str]:
+    for param in (content_type or "").split(";")[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset" and value.strip():
+            return value.strip().strip('"\'')
+    return None
+
+
+def sniff_charset(head: bytes) -> str:
+    """Charset from a byte-order mark or <meta charset>, else UTF-8."""
+    for bom, charset in _BOMS:
+        if head.startswith(bom):
+            return charset
+    match = _META_CHARSET.search(head[:SNIFF_BYTES])
+    return match.group(1).decode("ascii") if match else "utf-8"
+
+
+class CrawlBudget:
+    """Bytes one crawl may still download; shared by its concurrent fetches."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self._lock = threading.Lock()
+
+    @property
+    def exhausted(self) -> bool:
+        return self.used >= self.max_bytes
+
+    def take(self, n: int) -> int:
+        """Reserve up to n bytes; returns how many were granted."""
+        with self._lock:
+            granted = max(0, min(n, self.max_bytes - self.used))
+            self.used += granted
+            return granted
+
+
+class PageDecoder:
+    """
+    Incremental decoder for one streamed page. feed() returns False once the
+    page cap or the crawl budget is reached; the caller stops reading then.
+    """
+
+    def __init__(self, content_type: Optional[str], max_bytes: int, budget: Optional[CrawlBudget] = None):
+        self.max_bytes = max_bytes
+        self.budget = budget
+        self.received = 0
+        self.truncated = False
+        self._charset = header_charset(content_type)
+        self._decoder = None
+        self._head = b""  # Bytes held back until the charset is known
+        self._parts: List[str] = []
+
+    def _start(self, data: bytes):
+        try:
+            factory = codecs.getincrementaldecoder(self._charset or sniff_charset(data))
+        except LookupError:
+            factory = codecs.getincrementaldecoder("utf-8")
+        self._decoder = factory(errors="replace")
+        self._parts.append(self._decoder.decode(data))
+
+    def feed(self, chunk: bytes) -> bool:
+        room = self.max_bytes - self.received
+        if len(chunk) > room:
+            chunk, self.truncated = chunk[:room], True
+        if self.budget is not None and chunk:
+            granted = self.budget.take(len(chunk))
+            if granted < len(chunk):
+                chunk, self.truncated = chunk[:granted], True
+        self.received += len(chunk)
+
+        if self._decoder is not None:
+            self._parts.append(self._decoder.decode(chunk))
+        elif self._charset is not None or len(self._head) + len(chunk) >= SNIFF_BYTES:
+            self._start(self._head + chunk)
+            self._head = b""
+        else:
+            self._head += chunk
+        return not self.truncated
+
+    def text(self) -> str:
+        """Everything decoded so far (flushes the decoder)."""
+        if self._decoder is None:
+            self._start(self._head)
+            self._head = b""
+        self._parts.append(self._decoder.decode(b"", final=True))
+        text = "".join(self._parts)
+        self._parts = [text]
+        return text
@@ -0,0 +1,218 @@
+"""
+Priority-ordered crawl frontier.
+
+Instead of breadth-first over every same-site link, the crawlers pop the
+most promising URL from a heap. A URL's score rises with the number of
+pages linking to it and with being listed in the site's sitemap (more so
+if recently modified), and falls with link depth, path depth outside the
+seed's section, query strings and low-value paths (login, tag archives,
+feeds...). URLs are canonicalised (no fragments or tracking parameters,
+sorted query) so variants of one page are fetched once.
+
+Scores change as more links are found; the heap is updated lazily (a new
+entry is pushed and stale ones are skipped on pop).
+"""
+
+import heapq
+import itertools
+import math
+import re
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+
+from bulk_ingest import SitemapEntry, collect_sitemap
+
+# Never worth fetching for text
+SKIP_EXTENSIONS = {
+    ".pdf", ".zip", ".gz", ".tar", ".tgz", ".rar", ".7z", ".exe", ".dmg", ".iso",
+    ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".bmp",
+    ".mp3", ".mp4", ".avi", ".mov", ".webm", ".wav", ".ogg",
+    ".css", ".js", ".json", ".xml", ".rss", ".atom", ".woff", ".woff2", ".ttf",
+}
+TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|ref|ref_src|sessionid|sid|phpsessid)$", re.I)
+LOW_VALUE_PATHS = re.compile(
+    r"/(login|log-in|signin|sign-in|signup|sign-up|register|logout|account|cart|checkout|"
+    r"tag|tags|category|categories|author|authors|archive|archives|feed|rss|search|print|share|"
+    r"wp-admin|wp-login\.php|page/\d+|comment|comments|replytocom|calendar)(/|$)",
+    re.I
+)
+CONTENT_PATHS = re.compile(r"/(docs?|documentation|guides?|tutorials?|blog|articles?|posts?|learn|help|manual|faq)(/|$)", re.I)
+
+
+def canonicalize(url: str) -> str:
+    """Normalized URL: lowercase scheme/host, no fragment, no tracking params, sorted query."""
+    parsed = urlparse(url)
+    query = sorted((k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True) if not TRACKING_PARAMS.match(k))
+    return urlunparse((
+        parsed.scheme.lower(), parsed.netloc.lower(), parsed.path or "/", "", urlencode(query), ""
+    ))
+
+
+def is_crawlable(url: str) -> bool:
+    path = urlparse(url).path.lower()
+    dot = path.rfind(".")
+    return dot <= path.rfind("/") or path[dot:] not in SKIP_EXTENSIONS
+
+
+def _segments(path: str) -> List[str]:
+    return [s for s in path.split("/") if s]
+
+
+def _days_since(lastmod: Optional[str], now: datetime) -> Optional[float]:
+    if not lastmod:
+        return None
+    try:
+        when = datetime.fromisoformat(lastmod.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return (now - when).total_seconds() / 86400
+
+
+class CrawlFrontier:
+    def __init__(self, seed_url: str, now: Optional[datetime] = None):
+        self.seed = canonicalize(seed_url)
+        parsed = urlparse(self.seed)
+        self.domain = parsed.netloc
+        self._seed_segments = _segments(parsed.path)
+        self._now = now or datetime.now(timezone.utc)
+        self._heap: List[Tuple[float, int, str]] = []
+        self._counter = itertools.count()
+        self._depth: Dict[str, int] = {}
+        self._inlinks: Dict[str, int] = {}
+        self._sitemap: Dict[str, Optional[str]] = {}  # url -> lastmod
+        self._score: Dict[str, float] = {}
+        self._queued = set()
+        self._popped = set()
+        self.push(self.seed, depth=0)
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def score(self, url: str) -> float:
+        if url == self.seed:
+            return math.inf  # The page the user asked for always comes first
+        path = urlparse(url).path
+        segments = _segments(path)
+        score = -1.0 * self._depth.get(url, 0)
+
+        # Stay in the section the seed points at
+        if segments[:len(self._seed_segments)] == self._seed_segments:
+            score += 1.0
+            score -= 0.25 * max(0, len(segments) - len(self._seed_segments) - 1)
+        else:
+            score -= 1.0 + 0.25 * len(segments)
+
+        if urlparse(url).query:
+            score -= 1.5
+        if LOW_VALUE_PATHS.search(path):
+            score -= 4.0
+        if CONTENT_PATHS.search(path):
+            score += 0.5
+
+        score += 0.75 * math.log2(1 + self._inlinks.get(url, 0))
+
+        if url in self._sitemap:
+            score += 1.5
+            age = _days_since(self._sitemap[url], self._now)
+            if age is not None:
+                score += 1.0 if age <= 30 else 0.5 if age <= 365 else 0.0
+        return score
+
+    def _accept(self, url: str) -> Optional[str]:
+        url = canonicalize(url)
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or parsed.netloc != self.domain:
+            return None
+        if url in self._popped or not is_crawlable(url):
+            return None
+        return url
+
+    def _update(self, url: str):
+        score = self.score(url)
+        self._queued.add(url)
+        if self._score.get(url) != score:
+            self._score[url] = score
+            heapq.heappush(self._heap, (-score, next(self._counter), url))
+
+    def push(self, url: str, depth: int, linked_from: Optional[str] = None) -> bool:
+        """Queue a discovered link (or count another inlink); False if rejected."""
+        url = self._accept(url)
+        if url is None:
+            return False
+        if linked_from is not None and canonicalize(linked_from) != url:
+            self._inlinks[url] = self._inlinks.get(url, 0) + 1
+        self._depth[url] = min(depth, self._depth.get(url, depth))
+        self._update(url)
+        return True
+
+    def push_links(self, page_url: str, hrefs: Iterable[str]):
+        """Queue every link of a fetched page (relative hrefs resolved against it)."""
+        depth = self._depth.get(canonicalize(page_url), 0) + 1
+        for href in set(hrefs):
+            try:
+                self.push(urljoin(page_url, href), depth, linked_from=page_url)
+            except ValueError:
+                continue  # Malformed URL
+
+    def add_sitemap(self, entries: Iterable[SitemapEntry]) -> int:
+        """Queue sitemap pages (at depth 1); returns how many were accepted."""
+        added = 0
+        for entry in entries:
+            url = self._accept(entry.url)
+            if url is None:
+                continue
+            self._sitemap[url] = entry.lastmod
+            self._depth[url] = min(1, self._depth.get(url, 1))
+            self._update(url)
+            added += 1
+        return added
+
+    def pop(self) -> Optional[str]:
+        """Best queued URL, or None when empty."""
+        while self._heap:
+            neg_score, _, url = heapq.heappop(self._heap)
+            if url in self._popped or self._score.get(url) != -neg_score:
+                continue  # Already crawled, or superseded by a re-scored entry
+            self._popped.add(url)
+            self._queued.discard(url)
+            return url
+        return None
+
+    def pop_many(self, n: int) -> List[str]:
+        urls = []
+        while len(urls) < n:
+            url = self.pop()
+            if url is None:
+                break
+            urls.append(url)
+        return urls
+
+
+def discover_sitemaps(base_url: str, fetch: Callable[[str], Optional[bytes]]) -> List[str]:
+    """Sitemaps announced in robots.txt, else the conventional /sitemap.xml."""
+    parsed = urlparse(base_url)
+    origin = f"{parsed.scheme}://{parsed.netloc}"
+    robots = fetch(f"{origin}/robots.txt")
+    sitemaps = []
+    if robots:
+        for line in robots.decode("utf-8", errors="replace").splitlines():
+            key, _, value = line.partition(":")
+            if key.strip().lower() == "sitemap" and value.strip():
+                sitemaps.append(value.strip())
+    return sitemaps or [f"{origin}/sitemap.xml"]
+
+
+def sitemap_entries(base_url: str, fetch: Callable[[str], Optional[bytes]], max_urls: int) -> List[SitemapEntry]:
+    """Pages listed in the site's sitemaps (blocking; fetch returns None on failure)."""
+    entries: List[SitemapEntry] = []
+    for sitemap_url in discover_sitemaps(base_url, fetch):
+        if len(entries) >= max_urls:
+            break
+        entries.extend(collect_sitemap(fetch, sitemap_url, max_urls - len(entries)))
+    return entries
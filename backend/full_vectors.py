@@ -0,0 +1,117 @@
+"""
+Full-precision embeddings kept on disk for rescoring.
+
+With VECTOR_INDEX=flat|ivf the in-process index (ann_index) is what gets
+searched, holding vectors as float16/int8 and optionally PCA-reduced. The
+float32 originals are only read back to rescore a few candidates per query,
+so they live in a SQLite file rather than in memory, and not in Chroma
+either: Chroma loads every vector of a collection into its in-memory HNSW
+index, which would keep a full float32 copy resident next to the reduced
+one. Collections whose vectors live here give Chroma a one-dimensional
+placeholder embedding instead.
+
+Rows are float32 blobs keyed by (collection, chunk id).
+"""
+
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+WRITER_TIMEOUT = 600.0
+# Chroma requires an embedding per record; this is all its HNSW index holds for them
+PLACEHOLDER_EMBEDDING = [1.0]
+_MAX_PARAMS = 500  # Ids per IN (...) query, well under SQLite's parameter limit
+
+
+class FullVectorStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; executor threads each get their own."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=WRITER_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS vectors (
+                    collection TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (collection, id)
+                ) WITHOUT ROWID"""
+            )
+            self._local.conn = conn
+        return conn
+
+    def put(self, collection: str, ids: Sequence[str], vectors) -> None:
+        """Store (or replace) vectors by id."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO vectors (collection, id, vector) VALUES (?, ?, ?)",
+                [(collection, id_, vector.tobytes()) for id_, vector in zip(ids, vectors)]
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, collection: str, ids: Sequence[str]) -> Dict[str, np.ndarray]:
+        """{id: vector} for the ids that are stored."""
+        conn = self._connect()
+        vectors = {}
+        for start in range(0, len(ids), _MAX_PARAMS):
+            batch = list(ids[start:start + _MAX_PARAMS])
+            rows = conn.execute(
+                f"SELECT id, vector FROM vectors WHERE collection = ? AND id IN ({','.join('?' * len(batch))})",
+                [collection, *batch]
+            ).fetchall()
+            vectors.update((id_, np.frombuffer(blob, dtype=np.float32)) for id_, blob in rows)
+        return vectors
+
+    def pages(self, collection: str, page_size: int = 5000) -> Iterator[Tuple[List[str], np.ndarray]]:
+        """Every stored (ids, vectors) of a collection, page_size rows at a time."""
+        conn = self._connect()
+        last = ""
+        while True:
+            rows = conn.execute(
+                "SELECT id, vector FROM vectors WHERE collection = ? AND id > ? ORDER BY id LIMIT ?",
+                (collection, last, page_size)
+            ).fetchall()
+            if not rows:
+                return
+            yield [id_ for id_, _ in rows], np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows])
+            last = rows[-1][0]
+
+    def delete(self, collection: str, ids: Sequence[str]) -> None:
+        conn = self._connect()
+        for start in range(0, len(ids), _MAX_PARAMS):
+            batch = list(ids[start:start + _MAX_PARAMS])
+            conn.execute(
+                f"DELETE FROM vectors WHERE collection = ? AND id IN ({','.join('?' * len(batch))})",
+                [collection, *batch]
+            )
+
+    def drop(self, collection: str) -> None:
+        """Remove every vector of a collection."""
+        self._connect().execute("DELETE FROM vectors WHERE collection = ?", (collection,))
+
+    def rename(self, collection: str, new_name: str) -> None:
+        """Move a collection's vectors to new_name, replacing any stored there, in one transaction."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM vectors WHERE collection = ?", (new_name,))
+            conn.execute("UPDATE vectors SET collection = ? WHERE collection = ?", (new_name, collection))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
@@ -0,0 +1,88 @@
+"""
+Event-loop lag monitoring.
+
+Every request of a worker shares one event loop thread, so a blocking call
+made on it (a synchronous Chroma query, HTML parsing, a DNS lookup) stalls
+all of them at once. LoopLagMonitor wakes up every `interval` seconds and
+records how late it woke as rag_event_loop_lag_seconds: how long the loop was
+busy with something else.
+
+A stall only shows up in that histogram once it is over, and by then the
+blocking code has returned. A watchdog thread therefore checks the
+heartbeat too, and when the loop has been stuck for more than `threshold`
+seconds it captures the loop thread's stack right then, counts the stall in
+rag_event_loop_blocked_total and reports it, so the warning names the
+blocking call itself.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Callable, Optional
+
+from metrics import EVENT_LOOP_BLOCKED, EVENT_LOOP_LAG
+
+logger = logging.getLogger(__name__)
+
+
+def log_blocked(seconds: float, stack: str):
+    logger.warning(f"⚠️ Event loop blocked for {seconds:.2f}s so far, in:\n{stack}")
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25,
+                 on_block: Callable[[float, str], None] = log_blocked):
+        self.interval = interval
+        self.threshold = threshold
+        self.on_block = on_block
+        self.max_lag = 0.0
+        self._last_beat = time.monotonic()
+        self._reported_beat: Optional[float] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start monitoring the running loop (call from a coroutine on it)."""
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._watchdog is not None:
+            self._watchdog.join()
+
+    async def _heartbeat(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self._last_beat = time.monotonic()
+            lag = max(0.0, self._last_beat - started - self.interval)
+            self.max_lag = max(self.max_lag, lag)
+            EVENT_LOOP_LAG.observe(lag)
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            last_beat = self._last_beat
+            stalled = time.monotonic() - last_beat - self.interval
+            # Report each stall once, while it is still going on
+            if stalled < self.threshold or self._reported_beat == last_beat:
+                continue
+            self._reported_beat = last_beat
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            EVENT_LOOP_BLOCKED.inc()
+            self.on_block(stalled, stack)
@@ -0,0 +1,128 @@
+"""
+Prometheus metrics shared by both servers.
+
+prometheus-client is optional: without it every metric below is a no-op and
+/metrics answers 503. Stage timers cost a few microseconds; gauges for
+queue depth are computed at scrape time, so the hot path never pays for them.
+With PROMETHEUS_MULTIPROC_DIR set (uvicorn --workers), samples from all
+worker processes are aggregated on scrape.
+"""
+
+import os
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Tuple
+
+from tracing import span
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+    )
+    from prometheus_client import multiprocess
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+
+class _NoopMetric:
+    """Stands in for any metric when prometheus-client is missing."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def time(self):
+        return nullcontext()
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def dec(self, amount: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def observe(self, value: float):
+        pass
+
+    def set_function(self, f: Callable[[], float]):
+        pass
+
+
+if PROMETHEUS_AVAILABLE:
+    # Buckets from 1ms (retrieval) up to 2 minutes (crawls, podcast generation)
+    _BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+    STAGE_LATENCY = Histogram(
+        "rag_stage_seconds", "Time spent per pipeline stage", ["stage"], buckets=_BUCKETS
+    )
+    CACHE_HITS = Counter("rag_cache_hits_total", "Cache hits", ["cache"])
+    CACHE_MISSES = Counter("rag_cache_misses_total", "Cache misses", ["cache"])
+    PAGES_FETCHED = Counter("rag_pages_fetched_total", "Crawled pages by outcome", ["outcome"])
+    CRAWL_BYTES = Counter("rag_crawl_bytes_total", "Page body bytes downloaded by crawls")
+    RATE_LIMIT_REJECTIONS = Counter(
+        "rag_rate_limit_rejections_total", "Requests rejected by the rate limiter", ["endpoint"]
+    )
+    CORPUS_CHUNKS = Gauge("rag_corpus_chunks", "Chunks in the index", multiprocess_mode="max")
+    CORPUS_SOURCES = Gauge("rag_corpus_sources", "Sources in the index", multiprocess_mode="max")
+    COLLECTIONS_LOADED = Gauge("rag_collections_loaded", "Collections held in memory", multiprocess_mode="livesum")
+    EXECUTOR_QUEUE_DEPTH = Gauge(
+        "rag_executor_queue_depth", "Work items waiting for an executor thread", ["executor"],
+        multiprocess_mode="livesum"
+    )
+    EXECUTOR_WAIT = Histogram(
+        "rag_executor_wait_seconds", "Time work items waited for an executor thread", ["lane"], buckets=_BUCKETS
+    )
+    EXECUTOR_REJECTIONS = Counter(
+        "rag_executor_rejections_total", "Requests turned away because a lane's queue was full", ["lane"]
+    )
+    CHAT_SESSIONS = Gauge("rag_chat_sessions", "Chat sessions held in memory", multiprocess_mode="livesum")
+    COALESCED_REQUESTS = Counter(
+        "rag_coalesced_requests_total", "Requests answered by joining an identical request in flight", ["endpoint"]
+    )
+    EVENT_LOOP_LAG = Histogram(
+        "rag_event_loop_lag_seconds", "How late the event loop ran a scheduled wakeup", buckets=_BUCKETS
+    )
+    EVENT_LOOP_BLOCKED = Counter(
+        "rag_event_loop_blocked_total", "Times the event loop was blocked longer than LOOP_LAG_THRESHOLD"
+    )
+    RERANK_BUDGET_EXCEEDED = Counter(
+        "rag_rerank_budget_exceeded_total", "Reranks that ran out of latency budget before scoring every candidate"
+    )
+else:
+    STAGE_LATENCY = CACHE_HITS = CACHE_MISSES = PAGES_FETCHED = CRAWL_BYTES = RATE_LIMIT_REJECTIONS = _NoopMetric()
+    CORPUS_CHUNKS = CORPUS_SOURCES = COLLECTIONS_LOADED = EXECUTOR_QUEUE_DEPTH = _NoopMetric()
+    EXECUTOR_WAIT = EXECUTOR_REJECTIONS = COALESCED_REQUESTS = CHAT_SESSIONS = RERANK_BUDGET_EXCEEDED = _NoopMetric()
+    EVENT_LOOP_LAG = EVENT_LOOP_BLOCKED = _NoopMetric()
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Records the duration of one pipeline stage (and a span when the request is traced)."""
+    with STAGE_LATENCY.labels(stage).time(), span(stage):
+        yield
+
+
+def timed(stage: str, fn: Callable, *args, **kwargs):
+    """Call fn under a stage timer; for use inside executors so queue wait is excluded."""
+    with stage_timer(stage):
+        return fn(*args, **kwargs)
+
+
+def track_executor_queue(name: str, executor):
+    """Report a ThreadPoolExecutor's (or a scheduling.Lane's) backlog at scrape time."""
+    depth = getattr(executor, "queue_depth", None) or (lambda: executor._work_queue.qsize())
+    EXECUTOR_QUEUE_DEPTH.labels(name).set_function(depth)
+
+
+def observe_executor_wait(lane: str, seconds: float):
+    EXECUTOR_WAIT.labels(lane).observe(seconds)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Returns (body, content_type) for a /metrics response."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
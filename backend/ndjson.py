@@ -0,0 +1,111 @@
+"""
+Newline-delimited JSON streaming for exports.
+
+Exports are NDJSON, one JSON object per line, so clients can process a
+million chunks as they arrive. Responses are produced batch by batch: each
+batch is built and encoded in an executor thread (keeping the event loop
+free) and sent before the next one is made, so an export holds one batch of
+records in memory however large the corpus is.
+
+Query files for batch retrieval use the same format: one query per line,
+either plain text or a JSON object with "query" (or "question") and an
+optional "id". They are read with caps on the body, each line and each
+query, so a client can't make the server buffer an unbounded line.
+"""
+
+import asyncio
+import json
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Iterable, Iterator, List, Optional, Tuple
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+MAX_LINE_BYTES = 16 * 1024  # A JSON line with an id and a long query fits easily
+
+
+class BodyTooLarge(ValueError):
+    """The query file, or one of its lines, is over its size cap (413)."""
+
+
+class QueryTooLong(ValueError):
+    """A query is over the per-query length limit (422)."""
+
+
+def encode_lines(records: Iterable[Any]) -> bytes:
+    return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+
+
+def _next_encoded(batches: Iterator[Iterable[Any]]) -> Optional[bytes]:
+    batch = next(batches, None)
+    return None if batch is None else encode_lines(batch)
+
+
+async def stream_ndjson(batches: Iterable[Iterable[Any]], executor: Executor) -> AsyncIterator[bytes]:
+    """NDJSON for each batch of records; batches are produced lazily, in executor."""
+    loop = asyncio.get_running_loop()
+    batches = iter(batches)
+    while True:
+        encoded = await loop.run_in_executor(executor, _next_encoded, batches)
+        if encoded is None:
+            return
+        yield encoded
+
+
+def parse_query(line: str, number: int) -> Optional[Tuple[Any, str]]:
+    """(id, query) of one line of a query file (ids default to line numbers); None for blank lines."""
+    line = line.strip()
+    if not line:
+        return None
+    if not line.startswith("{"):
+        return number, line
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Line {number}: invalid JSON ({e.msg})")
+    query = record.get("query", record.get("question"))
+    if not isinstance(query, str) or not query.strip():
+        raise ValueError(f'Line {number}: expected a "query" string')
+    return record.get("id", number), query.strip()
+
+
+async def read_queries(body: AsyncIterator[bytes], max_queries: int, max_query_chars: int,
+                       max_body_bytes: int, max_line_bytes: int = MAX_LINE_BYTES) -> List[Tuple[Any, str]]:
+    """
+    (id, query) pairs of a query file, read from a request body as it
+    arrives. Raises BodyTooLarge past max_body_bytes or max_line_bytes,
+    QueryTooLong for queries over max_query_chars, and ValueError for
+    malformed lines or more than max_queries.
+    """
+    queries: List[Tuple[Any, str]] = []
+    number = 0
+    received = 0
+    pending = bytearray()  # The unfinished line, appended to rather than re-joined per chunk
+
+    def add(line: bytes):
+        nonlocal number
+        number += 1
+        if len(line) > max_line_bytes:
+            raise BodyTooLarge(f"Line {number} is longer than {max_line_bytes} bytes")
+        query = parse_query(line.decode("utf-8", errors="replace"), number)
+        if query is not None:
+            if len(query[1]) > max_query_chars:
+                raise QueryTooLong(f"Line {number}: queries must be 1 to {max_query_chars} characters")
+            if len(queries) >= max_queries:
+                raise ValueError(f"At most {max_queries} queries per request")
+            queries.append(query)
+
+    async for chunk in body:
+        received += len(chunk)
+        if received > max_body_bytes:
+            raise BodyTooLarge(f"Query files are limited to {max_body_bytes} bytes")
+        start = 0
+        while (end := chunk.find(b"\n", start)) >= 0:
+            pending += chunk[start:end]
+            add(bytes(pending))
+            pending.clear()
+            start = end + 1
+        pending += chunk[start:]
+        if len(pending) > max_line_bytes:
+            raise BodyTooLarge(f"Line {number + 1} is longer than {max_line_bytes} bytes")
+    if pending:
+        add(bytes(pending))
+    return queries
@@ -0,0 +1,257 @@
+"""
+One pooled HTTP client for all Ollama traffic.
+
+LangChain's community Ollama integrations open a fresh connection for every
+embedding and chat call, and the health check used to open another one per
+request. OllamaClient keeps a keep-alive connection pool for the process
+lifetime (a sync pool for executor-side embedding/generation, an async pool
+for health checks), caches health for `health_ttl` seconds with a background
+refresher, and guards everything with a circuit breaker so requests fail
+fast while Ollama is down instead of waiting out timeouts.
+
+ChatOllama and OllamaEmbeddings are drop-in LangChain models backed by it.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Ollama while the breaker is open."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Ollama circuit open; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; open ->
+    half_open after `reset_timeout`, where one trial call decides whether to
+    close again or re-open. Thread-safe (executor threads report outcomes).
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 15.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def allow(self) -> bool:
+        """May a call go through now? In half_open only one trial at a time."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("✅ Ollama circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is None:
+                if self._failures >= self.failure_threshold:
+                    logger.warning(f"⚡ Ollama circuit opened after {self._failures} failures")
+                    self._opened_at = self._clock()
+            elif self._state() == "half_open":
+                self._opened_at = self._clock()  # Trial failed: stay open for another period
+
+
+class OllamaClient:
+    def __init__(self, base_url: str, timeout: float = 120.0, health_ttl: float = 5.0,
+                 max_connections: int = 16, breaker: Optional[CircuitBreaker] = None):
+        self.base_url = base_url
+        self.health_ttl = health_ttl
+        self.breaker = breaker or CircuitBreaker()
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.http = httpx.Client(base_url=base_url, timeout=timeout, limits=limits)
+        self.async_http = httpx.AsyncClient(base_url=base_url, timeout=2.0, limits=limits)
+        self.max_connections = max_connections
+        self._fanout: Optional[ThreadPoolExecutor] = None
+        self._fanout_lock = threading.Lock()
+        self._healthy: Optional[bool] = None
+        self._checked_at = float("-inf")
+        self._health_lock: Optional[asyncio.Lock] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+    # --- Blocking API calls (run in executors) ---
+    def _post(self, path: str, payload: Dict) -> Dict:
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.breaker.retry_after())
+        try:
+            response = self.http.post(path, json=payload)
+            if response.status_code >= 500:
+                response.raise_for_status()
+        except httpx.HTTPError:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        response.raise_for_status()
+        return response.json()
+
+    def embed(self, model: str, text: str) -> List[float]:
+        return self._post("/api/embeddings", {"model": model, "prompt": text})["embedding"]
+
+    def embed_many(self, model: str, texts: Sequence[str]) -> List[List[float]]:
+        """
+        Embeddings of several texts, requested concurrently over the pool.
+        Same endpoint as embed: /api/embed would batch them in one call, but
+        it normalizes its vectors, which then no longer match stored ones.
+        """
+        if len(texts) <= 1:
+            return [self.embed(model, text) for text in texts]
+        with self._fanout_lock:
+            if self._fanout is None:
+                self._fanout = ThreadPoolExecutor(max_workers=self.max_connections, thread_name_prefix="ollama-embed")
+        return list(self._fanout.map(lambda text: self.embed(model, text), texts))
+
+    def chat(self, model: str, messages: List[Dict], options: Optional[Dict] = None,
+             keep_alive: Optional[str] = None) -> str:
+        payload = {"model": model, "messages": messages, "stream": False, "options": options or {}}
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        return self._post("/api/chat", payload)["message"]["content"]
+
+    def generate(self, model: str, prompt: str, options: Optional[Dict] = None,
+                 keep_alive: Optional[str] = None) -> str:
+        return self.generate_with_context(model, prompt, options=options, keep_alive=keep_alive)[0]
+
+    def generate_with_context(self, model: str, prompt: str, context: Optional[List[int]] = None,
+                              options: Optional[Dict] = None,
+                              keep_alive: Optional[str] = None) -> Tuple[str, Optional[List[int]]]:
+        """
+        Generate as a continuation of an earlier response's context (Ollama
+        reuses its KV cache for those tokens, so only the new prompt is
+        evaluated). Returns (response, context to continue from next time).
+        keep_alive keeps the model, and with it the cache, loaded between calls.
+        """
+        payload = {"model": model, "prompt": prompt, "stream": False, "options": options or {}}
+        if context:
+            payload["context"] = context
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        data = self._post("/api/generate", payload)
+        return data["response"], data.get("context")
+
+    # --- Health ---
+    async def check_health(self) -> bool:
+        """Probe Ollama now and update the cache and the breaker."""
+        try:
+            healthy = (await self.async_http.get("/api/version")).status_code == 200
+        except httpx.HTTPError:
+            healthy = False
+        if healthy:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        self._healthy = healthy
+        self._checked_at = time.monotonic()
+        return healthy
+
+    async def is_healthy(self) -> bool:
+        """Cached health; probes at most once per TTL however many requests ask."""
+        if time.monotonic() - self._checked_at < self.health_ttl:
+            return bool(self._healthy)
+        if self._health_lock is None:
+            self._health_lock = asyncio.Lock()
+        async with self._health_lock:
+            if time.monotonic() - self._checked_at < self.health_ttl:
+                return bool(self._healthy)
+            return await self.check_health()
+
+    def start_health_refresh(self):
+        """Keep the cached status fresh from a background task."""
+        async def refresh():
+            while True:
+                await self.check_health()
+                await asyncio.sleep(self.health_ttl / 2)
+
+        self._refresher = asyncio.get_running_loop().create_task(refresh())
+
+    async def aclose(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+        await self.async_http.aclose()
+        if self._fanout is not None:
+            self._fanout.shutdown(wait=False)
+        self.http.close()
+
+
+class OllamaEmbeddings(Embeddings):
+    def __init__(self, client: OllamaClient, model: str):
+        self.client = client
+        self.model = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.client.embed_many(self.model, texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.client.embed(self.model, text)
+
+
+_ROLES = {"human": "user", "ai": "assistant", "system": "system"}
+
+
+class ChatOllama(BaseChatModel):
+    client: Any
+    model: str = "llama3"
+    keep_alive: Optional[str] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "ollama-pooled"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        content = self.client.chat(
+            self.model,
+            [{"role": _ROLES.get(m.type, "user"), "content": m.content} for m in messages],
+            {"stop": stop} if stop else None,
+            keep_alive=self.keep_alive
+        )
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
@@ -0,0 +1,274 @@
+"""
+Sliding-window-counter rate limiting with pluggable storage.
+
+Each key keeps two counters: the current fixed window and the previous one.
+The request rate is estimated as
+
+    previous * (1 - elapsed_fraction_of_current_window) + current
+
+which costs O(1) per check regardless of traffic. Backends only need an
+atomic "increment and read both counters" operation, so the same limiter
+works in-process, on a SQLite file shared by several uvicorn workers, or on
+anything that speaks the Redis INCR/EXPIRE subset.
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+# --- BACKENDS ---
+class RateLimitBackend(ABC):
+    """Storage for per-key window counters."""
+
+    @abstractmethod
+    def increment(self, key: str, window_index: int, window: int, now: float) -> Tuple[int, int]:
+        """Add one hit to the current window; return (previous_count, current_count)."""
+
+    @abstractmethod
+    def decrement(self, key: str, window_index: int, window: int):
+        """Undo a hit that was rejected."""
+
+
+class InMemoryBackend(RateLimitBackend):
+    """
+    Per-process counters kept in LRU order.
+
+    Keys idle for longer than two of their windows are evicted as new hits
+    come in, and max_keys bounds memory even under a flood of unique clients.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> [window_index, current, previous, expires_at]
+        self._entries: "OrderedDict[str, List]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self, now: float):
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            if oldest[3] > now and len(self._entries) <= self.max_keys:
+                break
+            self._entries.popitem(last=False)
+
+    def increment(self, key, window_index, window, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = [window_index, 0, 0, 0.0]
+                self._entries[key] = entry
+            else:
+                self._entries.move_to_end(key)
+
+            if entry[0] != window_index:
+                # Roll the window; anything older than one window counts as zero
+                entry[2] = entry[1] if entry[0] == window_index - 1 else 0
+                entry[1] = 0
+                entry[0] = window_index
+
+            entry[1] += 1
+            entry[3] = now + 2 * window
+            self._evict(now)
+            return entry[2], entry[1]
+
+    def decrement(self, key, window_index, window):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == window_index and entry[1] > 0:
+                entry[1] -= 1
+
+
+class SQLiteBackend(RateLimitBackend):
+    """
+    Counters in a SQLite file, shared by every process that opens it.
+
+    Rows expire after two windows and are swept every sweep_every hits.
+    """
+
+    def __init__(self, path: str, sweep_every: int = 1000):
+        self.path = path
+        self.sweep_every = sweep_every
+        self._hits = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS rate_limits (
+                key TEXT NOT NULL,
+                window_index INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (key, window_index)
+            )"""
+        )
+
+    def increment(self, key, window_index, window, now):
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                cur.execute(
+                    """INSERT INTO rate_limits (key, window_index, count, expires_at)
+                       VALUES (?, ?, 1, ?)
+                       ON CONFLICT(key, window_index) DO UPDATE SET count = count + 1""",
+                    (key, window_index, now + 2 * window)
+                )
+                cur.execute(
+                    "SELECT window_index, count FROM rate_limits WHERE key = ? AND window_index IN (?, ?)",
+                    (key, window_index - 1, window_index)
+                )
+                counts = dict(cur.fetchall())
+
+                self._hits += 1
+                if self._hits % self.sweep_every == 0:
+                    cur.execute("DELETE FROM rate_limits WHERE expires_at < ?", (now,))
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+            return counts.get(window_index - 1, 0), counts.get(window_index, 0)
+
+    def decrement(self, key, window_index, window):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE rate_limits SET count = count - 1 WHERE key = ? AND window_index = ? AND count > 0",
+                (key, window_index)
+            )
+
+
+class InMemoryRedis:
+    """
+    Minimal stand-in for a Redis client (INCR/DECR/MGET/EXPIRE/DELETE).
+
+    Useful for tests and single-process development; a real redis.Redis
+    client can be passed to RedisBackend in its place.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, int] = {}
+        self._expiry: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _expire_key(self, key: str):
+        deadline = self._expiry.get(key)
+        if deadline is not None and deadline <= time.time():
+            self._data.pop(key, None)
+            self._expiry.pop(key, None)
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            self._expire_key(key)
+            self._data[key] = self._data.get(key, 0) + amount
+            return self._data[key]
+
+    def decr(self, key: str, amount: int = 1) -> int:
+        return self.incr(key, -amount)
+
+    def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        with self._lock:
+            result = []
+            for key in keys:
+                self._expire_key(key)
+                value = self._data.get(key)
+                result.append(None if value is None else str(value).encode())
+            return result
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._expiry[key] = time.time() + seconds
+            return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            removed = 0
+            for key in keys:
+                removed += self._data.pop(key, None) is not None
+                self._expiry.pop(key, None)
+            return removed
+
+    def dbsize(self) -> int:
+        with self._lock:
+            for key in list(self._expiry):
+                self._expire_key(key)
+            return len(self._data)
+
+
+class RedisBackend(RateLimitBackend):
+    """Counters in Redis (or InMemoryRedis); keys expire on their own after two windows."""
+
+    def __init__(self, client, prefix: str = "rl"):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, key: str, window_index: int) -> str:
+        return f"{self.prefix}:{key}:{window_index}"
+
+    def increment(self, key, window_index, window, now):
+        current_key = self._key(key, window_index)
+        current = self.client.incr(current_key)
+        if current == 1:
+            self.client.expire(current_key, 2 * window)
+        previous = self.client.mget([self._key(key, window_index - 1)])[0]
+        return int(previous or 0), int(current)
+
+    def decrement(self, key, window_index, window):
+        self.client.decr(self._key(key, window_index))
+
+
+def create_backend(name: str, sqlite_path: str = "./rate_limits.sqlite3", redis_url: str = "") -> RateLimitBackend:
+    """Build a backend by name: memory, sqlite, redis or fakeredis."""
+    if name == "memory":
+        return InMemoryBackend()
+    if name == "sqlite":
+        return SQLiteBackend(sqlite_path)
+    if name == "fakeredis":
+        return RedisBackend(InMemoryRedis())
+    if name == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("Redis rate limit backend requires: pip install redis")
+        return RedisBackend(redis.Redis.from_url(redis_url))
+    raise ValueError(f"Unknown rate limit backend: {name}")
+
+
+# --- LIMITER ---
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+
+    def hit(self, key: str, max_requests: int, window: int, now: Optional[float] = None) -> Tuple[bool, int]:
+        """
+        Record a request for key. Returns (allowed, retry_after_seconds).
+        Rejected requests are not counted against the client.
+        """
+        if now is None:
+            now = time.time()
+
+        window_index = int(now // window)
+        elapsed = (now - window_index * window) / window
+        previous, current = self.backend.increment(key, window_index, window, now)
+
+        estimated = previous * (1.0 - elapsed) + current
+        if estimated <= max_requests:
+            return True, 0
+
+        self.backend.decrement(key, window_index, window)
+
+        # Time until the previous window's weight has decayed enough
+        if previous:
+            needed = (previous + current - max_requests) / previous
+            retry_after = max(needed - elapsed, 0.0) * window
+        else:
+            retry_after = (1.0 - elapsed) * window
+        return False, max(1, math.ceil(retry_after))
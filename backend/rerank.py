@@ -0,0 +1,195 @@
+"""
+Second-stage reranking of retrieved chunks under a latency budget.
+
+Retrieval fetches a generous candidate set with the cheap first-stage scorer
+(BM25 or vector similarity); a slower, more accurate scorer then reorders it
+and the top k are kept. Scorers look at the question and a passage together:
+
+- "ollama": the LLM rates a batch of passages per call (works with the stub
+  Ollama server too);
+- "cross-encoder": a sentence-transformers CrossEncoder, if installed.
+
+RerankStage bounds the cost. Candidates are scored best-first in batches,
+and once the budget is spent the rest keep their first-stage order below the
+scored ones, so a slow scorer degrades to plain retrieval rather than slow
+answers. A batch already running when the deadline passes is abandoned, not
+interrupted: its scores still land in the (question, chunk) score cache for
+the next request. One still queued is cancelled, and while the pool has more
+than `workers` batches outstanding new ones are not submitted at all (they
+count as over budget), so abandoned work can't pile up behind a slow scorer.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from metrics import CACHE_HITS, CACHE_MISSES, RERANK_BUDGET_EXCEEDED
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+# Scores for a batch of passages; None where the scorer gave no usable score
+Scorer = Callable[[str, Sequence[str]], List[Optional[float]]]
+
+RATING_PROMPT = (
+    "Rate how well each passage answers the question, from 0 (irrelevant) to 10 (answers it fully).\n"
+    "Reply with one line per passage in the form <number>: <score>, and nothing else.\n\n"
+    "Question: {question}\n\n"
+    "{passages}"
+)
+_RATING_RE = re.compile(r"^\W*(\d+)\W+(\d+(?:\.\d+)?)", re.MULTILINE)
+
+
+class OllamaReranker:
+    """LLM relevance ratings, one generate call per batch of passages."""
+
+    def __init__(self, client, model: str, max_passage_words: int = 150, keep_alive: Optional[str] = None):
+        self.client = client
+        self.model = model
+        self.max_passage_words = max_passage_words
+        self.keep_alive = keep_alive
+
+    def __call__(self, question: str, texts: Sequence[str]) -> List[Optional[float]]:
+        passages = "\n".join(
+            f"[{i}] {' '.join(text.split()[:self.max_passage_words])}" for i, text in enumerate(texts, 1)
+        )
+        reply = self.client.generate(
+            self.model, RATING_PROMPT.format(question=question, passages=passages),
+            {"temperature": 0, "num_predict": 8 * len(texts)}, keep_alive=self.keep_alive
+        )
+        scores: List[Optional[float]] = [None] * len(texts)
+        for number, score in _RATING_RE.findall(reply):
+            if 1 <= int(number) <= len(texts):
+                scores[int(number) - 1] = float(score)
+        return scores
+
+
+class CrossEncoderReranker:
+    """A sentence-transformers cross-encoder (pip install sentence-transformers)."""
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", batch_size: int = 16):
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(model_name)
+        self.batch_size = batch_size
+
+    def __call__(self, question: str, texts: Sequence[str]) -> List[Optional[float]]:
+        scores = self.model.predict([(question, text) for text in texts], batch_size=self.batch_size)
+        return [float(score) for score in scores]
+
+
+class RerankStage:
+    def __init__(self, scorer: Scorer, budget_ms: float = 300.0, batch_size: int = 8,
+                 cache_size: int = 10_000, workers: int = 2):
+        self.scorer = scorer
+        self.budget = budget_ms / 1000
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, bytes], Optional[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.workers = workers
+        self._outstanding = 0  # Batches submitted and not yet finished or cancelled
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rerank")
+
+    @staticmethod
+    def _key(question: str, text: str) -> Tuple[str, bytes]:
+        return " ".join(question.split()).casefold(), hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def _cached(self, key: Tuple[str, bytes]) -> Tuple[bool, Optional[float]]:
+        with self._lock:
+            if key not in self._cache:
+                return False, None
+            self._cache.move_to_end(key)
+            return True, self._cache[key]
+
+    def _store(self, keys: Sequence[Tuple[str, bytes]], scores: Sequence[Optional[float]]):
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _score_batch(self, question: str, texts: Sequence[str], keys: Sequence[Tuple[str, bytes]]):
+        scores = self.scorer(question, texts)
+        self._store(keys, scores)
+        return scores
+
+    def _submit(self, question: str, texts: Sequence[str], keys: Sequence[Tuple[str, bytes]]) -> Optional[Future]:
+        """Future for a batch's scores, or None while too many batches are outstanding."""
+        with self._lock:
+            if self._outstanding > self.workers:
+                return None
+            self._outstanding += 1
+        future = self._pool.submit(self._score_batch, question, texts, keys)
+        future.add_done_callback(self._batch_done)
+        return future
+
+    def _batch_done(self, future: Future):
+        with self._lock:
+            self._outstanding -= 1
+
+    def rerank(self, question: str, candidates: Sequence[T], text_of: Callable[[T], str], k: int) -> List[T]:
+        """Top k of candidates (in first-stage order) after rescoring as many as the budget allows."""
+        deadline = time.monotonic() + self.budget
+        keys = [self._key(question, text_of(c)) for c in candidates]
+        scores: Dict[int, float] = {}
+        pending: List[int] = []
+        for i, key in enumerate(keys):
+            found, score = self._cached(key)
+            if found:
+                CACHE_HITS.labels("rerank").inc()
+                if score is not None:
+                    scores[i] = score
+            else:
+                CACHE_MISSES.labels("rerank").inc()
+                pending.append(i)
+
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            remaining = deadline - time.monotonic()
+            future = None
+            try:
+                if remaining <= 0:
+                    raise TimeoutError
+                future = self._submit(question, [text_of(candidates[i]) for i in batch], [keys[i] for i in batch])
+                if future is None:
+                    raise TimeoutError
+                batch_scores = future.result(timeout=remaining)
+            except TimeoutError:
+                if future is not None:
+                    future.cancel()  # Only succeeds while it is still queued
+                RERANK_BUDGET_EXCEEDED.inc()
+                logger.debug(f"Rerank budget spent after {len(scores)}/{len(candidates)} candidates")
+                break
+            except Exception as e:
+                logger.warning(f"Reranking failed, keeping retrieval order: {e}")
+                break
+            scores.update((i, score) for i, score in zip(batch, batch_scores) if score is not None)
+
+        # Rescored candidates first (stable for ties), then the rest in first-stage order
+        ranked = sorted(scores, key=lambda i: (-scores[i], i))
+        ranked.extend(i for i in range(len(candidates)) if i not in scores)
+        return [candidates[i] for i in ranked[:k]]
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def create_scorer(name: str, model: str = "", ollama_client=None, keep_alive: Optional[str] = None) -> Optional[Scorer]:
+    """Scorer for RERANKER=none|ollama|cross-encoder; None when reranking is off or unavailable."""
+    if name == "none":
+        return None
+    if name == "ollama":
+        return OllamaReranker(ollama_client, model, keep_alive=keep_alive)
+    if name == "cross-encoder":
+        try:
+            return CrossEncoderReranker(model) if model else CrossEncoderReranker()
+        except ImportError:
+            logger.warning("Cross-encoder reranking requires sentence-transformers. Run: pip install sentence-transformers")
+            return None
+    raise ValueError(f"Unknown reranker '{name}' (expected none, ollama or cross-encoder)")
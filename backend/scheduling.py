@@ -0,0 +1,187 @@
+"""
+Priority lanes over one pool of worker threads.
+
+Work is submitted to a named lane instead of straight to the pool. Whenever a
+thread is free it takes the oldest item of the highest-priority lane that has
+work waiting and is below its worker quota, so:
+
+- interactive work (chat) never waits behind queued batch work (crawls,
+  parsing, briefing and podcast generation), it only waits for a thread;
+- a batch lane capped below the pool size can never occupy every thread.
+
+Lanes are concurrent.futures Executors, so they drop into
+loop.run_in_executor unchanged. Admission control is separate from submit:
+a request asks admit(lane) once, up front, and is turned away while the lane
+already has max_queue items waiting; work of requests already admitted is
+never rejected halfway through.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+# Weight of the newest run in each lane's moving average of run time
+_EWMA_ALPHA = 0.2
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects affinity masks and container cpusets)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def default_workers(io_bound: bool) -> int:
+    """
+    Threads for a worker pool on this machine: ThreadPoolExecutor's default
+    for work that mostly waits on I/O (Ollama, Chroma, crawls), one per CPU
+    for CPU-bound work such as in-process inference, but at least 2 so an
+    interactive lane always has a thread next to a batch lane.
+    """
+    cpus = available_cpus()
+    return min(32, cpus + 4) if io_bound else max(2, cpus)
+
+
+class Lane(Executor):
+    def __init__(self, scheduler: "PriorityExecutor", name: str, priority: int, max_workers: int, max_queue: int):
+        self.scheduler = scheduler
+        self.name = name
+        self.priority = priority
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.running = 0
+        self.avg_run_seconds = 0.0
+        self._queue: Deque[Tuple[Future, Callable, tuple, dict, float]] = deque()
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        return self.scheduler._submit(self, fn, args, kwargs)
+
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def shutdown(self, wait: bool = True, **kwargs):
+        """Lanes share the scheduler's threads; shut down the scheduler instead."""
+
+
+class PriorityExecutor:
+    """
+    max_workers threads shared by lanes. Lower priority numbers run first;
+    on_wait(lane, seconds) is called with how long each item queued.
+    """
+
+    def __init__(self, max_workers: int, on_wait: Optional[Callable[[str, float], None]] = None,
+                 thread_name_prefix: str = "worker"):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self.on_wait = on_wait
+        self.thread_name_prefix = thread_name_prefix
+        self._lanes: Dict[str, Lane] = {}
+        self._by_priority: List[Lane] = []
+        self._threads: List[threading.Thread] = []
+        self._idle = 0
+        self._shutdown = False
+        self._cond = threading.Condition()
+
+    def add_lane(self, name: str, priority: int, max_workers: Optional[int] = None, max_queue: int = 0) -> Lane:
+        """max_workers caps the threads the lane may use at once; max_queue (0 = unbounded) is for admit()."""
+        lane = Lane(self, name, priority, min(max_workers or self.max_workers, self.max_workers), max_queue)
+        with self._cond:
+            self._lanes[name] = lane
+            self._by_priority = sorted(self._lanes.values(), key=lambda lane: lane.priority)
+        return lane
+
+    def lane(self, name: str) -> Lane:
+        return self._lanes[name]
+
+    def admit(self, name: str) -> Tuple[bool, int]:
+        """
+        Whether a new request for a lane should be accepted; returns
+        (allowed, retry_after seconds) estimated from the lane's backlog.
+        """
+        lane = self._lanes[name]
+        with self._cond:
+            depth = len(lane._queue)
+            if not lane.max_queue or depth < lane.max_queue:
+                return True, 0
+            retry_after = depth * lane.avg_run_seconds / lane.max_workers
+        return False, max(1, math.ceil(retry_after))
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._cond:
+            return {
+                lane.name: {
+                    "queued": len(lane._queue),
+                    "running": lane.running,
+                    "max_workers": lane.max_workers,
+                    "max_queue": lane.max_queue,
+                    "avg_run_seconds": round(lane.avg_run_seconds, 4),
+                }
+                for lane in self._by_priority
+            }
+
+    def _submit(self, lane: Lane, fn, args, kwargs) -> Future:
+        future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            lane._queue.append((future, fn, args, kwargs, time.perf_counter()))
+            # Threads start on demand, like ThreadPoolExecutor's
+            if self._idle == 0 and len(self._threads) < self.max_workers:
+                thread = threading.Thread(
+                    target=self._work, name=f"{self.thread_name_prefix}_{len(self._threads)}", daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        return future
+
+    def _next(self) -> Optional[Lane]:
+        for lane in self._by_priority:
+            if lane._queue and lane.running < lane.max_workers:
+                return lane
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                lane = self._next()
+                while lane is None:
+                    if self._shutdown and not any(lane._queue for lane in self._by_priority):
+                        return
+                    self._idle += 1
+                    self._cond.wait()
+                    self._idle -= 1
+                    lane = self._next()
+                future, fn, args, kwargs, queued_at = lane._queue.popleft()
+                lane.running += 1
+
+            started = time.perf_counter()
+            try:
+                if future.set_running_or_notify_cancel():
+                    if self.on_wait is not None:
+                        self.on_wait(lane.name, started - queued_at)
+                    try:
+                        future.set_result(fn(*args, **kwargs))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self._cond:
+                    lane.running -= 1
+                    elapsed = time.perf_counter() - started
+                    lane.avg_run_seconds += _EWMA_ALPHA * (elapsed - lane.avg_run_seconds)
+                    # A quota slot opened up: another thread may now take this lane's work
+                    self._cond.notify_all()
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work; queued items still run."""
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for thread in list(self._threads):
+                thread.join()
@@ -1,12 +1,20 @@
 # FILE: backend/server.py
 import os
+import sys
+import json
 import logging
+import re
 import asyncio
+import itertools
 import socket
+import tempfile
+import threading
+import uuid
+from datetime import datetime
 from io import BytesIO
 from ipaddress import ip_address, ip_network
-from typing import Optional, List, Set
-from contextlib import asynccontextmanager
+from typing import Dict, Iterator, Optional, List, Sequence, Set, Tuple
+from contextlib import asynccontextmanager, contextmanager
 
 # Suppress python-dotenv parse warnings
 logging.getLogger("dotenv").setLevel(logging.ERROR)
@@ -15,41 +23,205 @@ load_dotenv()
 
 import uvicorn
 import httpx
-from fastapi import FastAPI, HTTPException, Request
+import numpy as np
+from fastapi import Depends, FastAPI, File, Form, HTTPException, Query, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, HttpUrl, Field, validator
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 from urllib.robotparser import RobotFileParser
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
 # Ollama imports
-from langchain_community.chat_models import ChatOllama
-from langchain_community.embeddings import OllamaEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
-from langchain.chains import create_retrieval_chain
+import chromadb
+from chromadb.api import ServerAPI
+from chromadb.api.client import Client as ChromaClient
+from chromadb.config import Settings as ChromaSettings, System
+from chromadb.telemetry.product import ProductTelemetryClient
 from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.docstore.document import Document
 import edge_tts
 
+from dedup import NearDuplicateFilter, DedupReport
+from sessions import ChatSession, SessionStore
+from shared_store import SharedIndexStore
+from snapshot_file import SnapshotFile, iter_batches, string_sections, write_snapshot
+from ann_index import FlatIndex, create_index, rescore
+from full_vectors import PLACEHOLDER_EMBEDDING, FullVectorStore
+from bulk_ingest import collect_sitemap, extract_upload, upload_source
+from frontier import CrawlFrontier, sitemap_entries
+from fetch_limits import CrawlBudget, PageDecoder, is_html
+from chunking import count_tokens
+from context_packing import pack_context
+from analyzer import create_analyzer
+from scheduling import PriorityExecutor, default_workers
+from singleflight import SingleFlight, normalize_text
+from collection_cache import COLLECTION_NAME_PATTERN, DEFAULT_COLLECTION, CollectionCache
+from loop_monitor import LoopLagMonitor
+from ndjson import NDJSON_MEDIA_TYPE, BodyTooLarge, QueryTooLong, read_queries, stream_ndjson
+from ollama_client import ChatOllama, CircuitBreaker, CircuitOpenError, OllamaClient, OllamaEmbeddings
+from rerank import RerankStage, create_scorer
+from tracing import bind, request_id_middleware, traced
+from admin import require_admin, router as admin_router
+from metrics import (
+    CORPUS_CHUNKS, CRAWL_BYTES, PAGES_FETCHED, PROMETHEUS_AVAILABLE, RATE_LIMIT_REJECTIONS,
+    observe_executor_wait, render_metrics, stage_timer, timed, track_executor_queue
+)
+
 # --- CONFIGURATION ---
 class Config:
     PERSIST_DIRECTORY = os.getenv("PERSIST_DIRECTORY", "./notebook_db")
     MODEL_NAME = os.getenv("MODEL_NAME", "llama3")
     OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+    OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "120"))
+    OLLAMA_HEALTH_TTL = float(os.getenv("OLLAMA_HEALTH_TTL", "5"))
+    OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "16"))
+    OLLAMA_FAILURE_THRESHOLD = int(os.getenv("OLLAMA_FAILURE_THRESHOLD", "3"))
+    OLLAMA_RESET_TIMEOUT = float(os.getenv("OLLAMA_RESET_TIMEOUT", "15"))
+    # How long Ollama keeps the model (and its cached prompt prefix) loaded after a call
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
     MAX_PAGES_PER_CRAWL = int(os.getenv("MAX_PAGES_PER_CRAWL", "10"))
     CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1500"))
     CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
     REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "30"))
     CRAWL_TIMEOUT = float(os.getenv("CRAWL_TIMEOUT", "5"))
+    SITEMAP_ENABLED = os.getenv("SITEMAP_ENABLED", "true").lower() == "true"
+    SITEMAP_MAX_URLS = int(os.getenv("SITEMAP_MAX_URLS", "1000"))
+    # Bodies are streamed: longer pages are truncated, and a crawl stops
+    # fetching once it has downloaded CRAWL_MAX_TOTAL_BYTES
+    CRAWL_MAX_PAGE_BYTES = int(os.getenv("CRAWL_MAX_PAGE_BYTES", str(2 * 1024 * 1024)))
+    CRAWL_MAX_TOTAL_BYTES = int(os.getenv("CRAWL_MAX_TOTAL_BYTES", str(20 * 1024 * 1024)))
     MAX_VECTORSTORE_FETCH = int(os.getenv("MAX_VECTORSTORE_FETCH", "1000"))
     
+    # Bulk ingest: sources per request and how many are crawled/parsed at once
+    BULK_MAX_URLS = int(os.getenv("BULK_MAX_URLS", "200"))
+    BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", "20"))
+    BULK_MAX_UPLOAD_BYTES = int(os.getenv("BULK_MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+    BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "4"))
+    
+    # Threading: blocking work (Chroma, embeddings, Ollama calls, parsing)
+    # runs on MAX_WORKERS threads shared by two lanes. Interactive work (chat,
+    # sources) always goes first; batch work (crawls, ingestion, briefings,
+    # podcasts, deletes, snapshots) uses at most BATCH_WORKERS threads.
+    # MAX_WORKERS=0 sizes the pool for this machine.
+    MAX_WORKERS = int(os.getenv("MAX_WORKERS", "0")) or default_workers(io_bound=True)
+    BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(max(1, MAX_WORKERS - 1))))
+    
+    # Event-loop monitoring: the loop is checked every LOOP_LAG_INTERVAL
+    # seconds (0 = off); stalls longer than LOOP_LAG_THRESHOLD seconds are
+    # logged with the blocking stack and counted
+    LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))
+    LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD", "0.25"))
+    
+    # Near-duplicate chunk detection
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+    
+    # Collections: named knowledge bases, each its own Chroma collection. At
+    # most MAX_LOADED_COLLECTIONS stay open; idle ones are closed after
+    # COLLECTION_IDLE_TTL seconds. CHROMA_MEMORY_LIMIT_BYTES additionally lets
+    # Chroma (>= 0.4.23) unload vector segments of idle collections.
+    MAX_LOADED_COLLECTIONS = int(os.getenv("MAX_LOADED_COLLECTIONS", "8"))
+    COLLECTION_IDLE_TTL = float(os.getenv("COLLECTION_IDLE_TTL", "1800"))
+    CHROMA_MEMORY_LIMIT_BYTES = int(os.getenv("CHROMA_MEMORY_LIMIT_BYTES", "0"))
+    
+    # Vector search. "chroma" uses Chroma's HNSW index; its HNSW_* parameters
+    # apply to collections created from now on (Chroma fixes them at creation).
+    # "flat" (exact) or "ivf" (approximate) keep an in-process NumPy index of
+    # every loaded collection, stored as VECTOR_DTYPE (float32|float16|int8).
+    # VECTOR_PCA_DIM > 0 also reduces them to that many principal axes, fitted
+    # on the first VECTOR_PCA_SAMPLE vectors. Collections created with an
+    # in-process index keep their float32 embeddings on disk (full_vectors.py)
+    # instead of in Chroma's HNSW index, which holds them all in memory.
+    # Searches of reduced or quantized vectors fetch VECTOR_RESCORE times k
+    # candidates and rescore them with those (0 or 1: no rescoring).
+    VECTOR_INDEX = os.getenv("VECTOR_INDEX", "chroma")
+    VECTOR_DTYPE = os.getenv("VECTOR_DTYPE", "float32")
+    VECTOR_PCA_DIM = int(os.getenv("VECTOR_PCA_DIM", "0"))
+    VECTOR_PCA_SAMPLE = int(os.getenv("VECTOR_PCA_SAMPLE", "4096"))
+    VECTOR_RESCORE = int(os.getenv("VECTOR_RESCORE", "4"))
+    IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # 0 = sqrt(chunks)
+    IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+    HNSW_SPACE = os.getenv("HNSW_SPACE", "l2")
+    HNSW_M = int(os.getenv("HNSW_M", "16"))
+    HNSW_CONSTRUCTION_EF = int(os.getenv("HNSW_CONSTRUCTION_EF", "100"))
+    HNSW_SEARCH_EF = int(os.getenv("HNSW_SEARCH_EF", "10"))
+    RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "4"))
+    
+    # Reranking: retrieval fetches RERANK_CANDIDATES chunks and RERANKER
+    # ("ollama", "cross-encoder" or "none") rescores them best-first,
+    # RERANK_BATCH_SIZE per call, for at most RERANK_BUDGET_MS; the top RETRIEVAL_K
+    # are kept. Scores are cached per (question, chunk), up to
+    # RERANK_CACHE_SIZE of them. RERANK_MODEL defaults to MODEL_NAME for
+    # "ollama" and to ms-marco-MiniLM-L-6-v2 for "cross-encoder".
+    RERANKER = os.getenv("RERANKER", "none")
+    RERANK_MODEL = os.getenv("RERANK_MODEL", "")
+    RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+    RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "300"))
+    RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "8"))
+    RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "10000"))
+    
+    # Context packing: /chat prompts carry only the question's most relevant
+    # sentences of the retrieved chunks, up to CONTEXT_TOKEN_BUDGET tokens
+    # (estimated; Ollama exposes no tokenizer)
+    CONTEXT_COMPRESSION = os.getenv("CONTEXT_COMPRESSION", "true").lower() == "true"
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1024"))
+    
+    # Exports: GET /export/chunks streams a collection's chunks and POST
+    # /export/retrieval the top-k chunks of every query in the request body,
+    # both as NDJSON of about EXPORT_BATCH_SIZE records per batch. At most
+    # EXPORT_MAX_QUERIES queries of up to MAX_QUERY_CHARS characters, in a
+    # body of at most EXPORT_MAX_BODY_BYTES, per request.
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    EXPORT_MAX_QUERIES = int(os.getenv("EXPORT_MAX_QUERIES", "10000"))
+    EXPORT_MAX_BODY_BYTES = int(os.getenv("EXPORT_MAX_BODY_BYTES", str(8 * 1024 * 1024)))
+    
+    # Batch retrieval: POST /retrieve/batch answers up to BATCH_MAX_QUERIES
+    # queries per request with their top-k chunks (no generation).
+    BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "1000"))
+    
+    # Chat sessions: send "session_id": "new" to /chat to start one and the
+    # returned id to continue it. A session keeps its last SESSION_MAX_TURNS
+    # turns (SESSION_HISTORY_TOKENS of them go into the prompt) and reuses its
+    # packed context while follow-ups stay on topic (SESSION_TOPIC_OVERLAP of
+    # their terms already asked about); the prompt then starts with the same
+    # passages as the last turn, so Ollama reuses its cached prefix. At most
+    # MAX_SESSIONS sessions are kept, each for SESSION_TTL idle seconds.
+    MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "1000"))
+    SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))
+    SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "6"))
+    SESSION_HISTORY_TOKENS = int(os.getenv("SESSION_HISTORY_TOKENS", "512"))
+    SESSION_TOPIC_OVERLAP = float(os.getenv("SESSION_TOPIC_OVERLAP", "0.5"))
+    
+    # Snapshots: GET/POST /admin/snapshot export/import a collection (chunks,
+    # metadata and embeddings) as one binary file, so replicas skip
+    # re-embedding. Files listed in SNAPSHOT_IMPORT (comma-separated) are
+    # imported at startup into collections still empty.
+    SNAPSHOT_IMPORT = os.getenv("SNAPSHOT_IMPORT", "")
+    SNAPSHOT_BATCH_SIZE = 5000  # Below Chroma's max batch size
+    
+    # Multi-worker serving: workers coordinate index writes through a shared
+    # version store and reopen the vectorstore when another worker changed it
+    WORKERS = int(os.getenv("WORKERS", "1"))
+    SHARED_INDEX_PATH = os.getenv(
+        "SHARED_INDEX_PATH",
+        "./notebook_index.sqlite3" if WORKERS > 1 else ""
+    )
+    
+    # Rate limiting (disable only for local load testing)
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    
     # Security settings
+    # Only for benchmarks against a local fixture site; never enable in production
+    ALLOW_PRIVATE_NETWORKS = os.getenv("ALLOW_PRIVATE_NETWORKS", "false").lower() == "true"
     BLOCKED_NETWORKS = [
         '127.0.0.0/8',      # Loopback
         '10.0.0.0/8',       # Private
@@ -68,6 +240,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# --- OLLAMA CLIENT ---
+# Shared for the app lifetime: pooled connections, cached health, circuit breaker
+ollama = OllamaClient(
+    Config.OLLAMA_HOST,
+    timeout=Config.OLLAMA_TIMEOUT,
+    health_ttl=Config.OLLAMA_HEALTH_TTL,
+    max_connections=Config.OLLAMA_MAX_CONNECTIONS,
+    breaker=CircuitBreaker(Config.OLLAMA_FAILURE_THRESHOLD, Config.OLLAMA_RESET_TIMEOUT)
+)
+
+# --- RERANKER ---
+rerank_scorer = create_scorer(
+    Config.RERANKER, Config.RERANK_MODEL or (Config.MODEL_NAME if Config.RERANKER == "ollama" else ""),
+    ollama_client=ollama, keep_alive=Config.OLLAMA_KEEP_ALIVE
+)
+reranker = RerankStage(
+    rerank_scorer, Config.RERANK_BUDGET_MS, Config.RERANK_BATCH_SIZE, Config.RERANK_CACHE_SIZE
+) if rerank_scorer is not None else None
+
+# --- EXECUTORS ---
+# Nothing blocking runs on the event loop. Interactive calls take the shared
+# threads ahead of batch work, which never occupies more than BATCH_WORKERS
+scheduler = PriorityExecutor(Config.MAX_WORKERS, on_wait=observe_executor_wait, thread_name_prefix="rag")
+executor = scheduler.add_lane("interactive", priority=0)
+batch_executor = scheduler.add_lane("batch", priority=1, max_workers=Config.BATCH_WORKERS)
+track_executor_queue("interactive", executor)
+track_executor_queue("batch", batch_executor)
+
+loop_monitor = LoopLagMonitor(Config.LOOP_LAG_INTERVAL, Config.LOOP_LAG_THRESHOLD)
+
 # --- SECURITY UTILITIES ---
 class SecurityValidator:
     @staticmethod
@@ -91,6 +293,8 @@ class SecurityValidator:
                 return False, "Cannot resolve hostname"
             
             # Check if IP is in blocked ranges
+            if Config.ALLOW_PRIVATE_NETWORKS:
+                return True, "OK"
             for network_str in Config.BLOCKED_NETWORKS:
                 network = ip_network(network_str)
                 if ip in network:
@@ -118,71 +322,123 @@ class SecurityValidator:
             return True  # Allow if robots.txt is unavailable
 
 # --- CRAWLER ---
+# Loading the CA bundle takes tens of milliseconds: do it once, not on the event loop for every crawl
+CRAWL_SSL_CONTEXT = httpx.create_ssl_context()
+
+def page_text(soup: BeautifulSoup) -> str:
+    """Main text of a page (drops scripts, navigation and other chrome in place)."""
+    for element in soup(["script", "style", "nav", "footer", "iframe", "noscript", "header"]):
+        element.decompose()
+    return soup.get_text(separator=' ', strip=True)
+
+def parse_page(html: str) -> tuple[str, List[str]]:
+    """A crawled page's main text and link targets (blocking)."""
+    soup = BeautifulSoup(html, "html.parser")
+    links = [link["href"] for link in soup.find_all("a", href=True)]
+    return page_text(soup), links
+
+def fetch_raw(url: str) -> Optional[bytes]:
+    """A sitemap or robots.txt document, or None if it's blocked or unavailable (blocking)."""
+    is_safe, msg = SecurityValidator.is_safe_url(url)
+    if not is_safe:
+        logger.warning(f"Blocked: {url}: {msg}")
+        return None
+    try:
+        response = httpx.get(url, timeout=Config.CRAWL_TIMEOUT, headers={"User-Agent": Config.USER_AGENT},
+                             follow_redirects=True)
+        response.raise_for_status()
+        return response.content
+    except httpx.HTTPError as e:
+        logger.warning(f"Could not fetch {url}: {e}")
+        return None
+
+def upload_document(filename: str, content_type: Optional[str], data: bytes) -> Document:
+    """An uploaded PDF/HTML/text file as one Document (blocking)."""
+    kind, content = extract_upload(filename, content_type, data)
+    text = page_text(BeautifulSoup(content, "html.parser")) if kind == "html" else content.strip()
+    return Document(page_content=text, metadata={"source": upload_source(filename), "length": len(text)})
+
 class AsyncWebCrawler:
     def __init__(self, max_pages: int = Config.MAX_PAGES_PER_CRAWL):
         self.max_pages = max_pages
         self.visited: Set[str] = set()
         self.documents: List[Document] = []
         self.headers = {"User-Agent": Config.USER_AGENT}
+        self.budget = CrawlBudget(Config.CRAWL_MAX_TOTAL_BYTES)
     
+    @traced("crawl_website")
     async def crawl(self, base_url: str) -> List[Document]:
         """Crawl website asynchronously."""
-        # Security check
-        is_safe, msg = SecurityValidator.is_safe_url(base_url)
+        loop = asyncio.get_running_loop()
+        
+        # Security check (resolves the host)
+        is_safe, msg = await loop.run_in_executor(batch_executor, SecurityValidator.is_safe_url, base_url)
         if not is_safe:
             raise ValueError(f"URL blocked: {msg}")
         
         # Check robots.txt
-        if not SecurityValidator.check_robots_txt(base_url):
+        if not await loop.run_in_executor(batch_executor, SecurityValidator.check_robots_txt, base_url):
             raise ValueError("Crawling disallowed by robots.txt")
         
-        domain = urlparse(base_url).netloc
-        queue = [base_url]
+        # Best-first frontier, seeded from the sitemap when the budget allows more than the seed page
+        frontier = CrawlFrontier(base_url)
+        if Config.SITEMAP_ENABLED and self.max_pages > 1:
+            entries = await loop.run_in_executor(
+                batch_executor, bind(sitemap_entries, base_url, fetch_raw, Config.SITEMAP_MAX_URLS)
+            )
+            listed = frontier.add_sitemap(entries)
+            if listed:
+                logger.info(f"🗺️ Sitemap lists {listed} pages")
         
         logger.info(f"🕷️ Starting async crawl: {base_url}")
         
-        async with httpx.AsyncClient(timeout=Config.CRAWL_TIMEOUT, headers=self.headers) as client:
-            while queue and len(self.visited) < self.max_pages:
-                # Process multiple URLs concurrently
-                batch = queue[:5]  # Process 5 at a time
-                queue = queue[5:]
+        async with httpx.AsyncClient(timeout=Config.CRAWL_TIMEOUT, headers=self.headers, verify=CRAWL_SSL_CONTEXT) as client:
+            while frontier and len(self.visited) < self.max_pages and not self.budget.exhausted:
+                # Process up to 5 of the best URLs concurrently, never past the page budget
+                batch = frontier.pop_many(min(5, self.max_pages - len(self.visited)))
                 
-                tasks = [self._fetch_page(client, url, domain) for url in batch]
+                tasks = [self._fetch_page(client, url) for url in batch]
                 results = await asyncio.gather(*tasks, return_exceptions=True)
                 
-                for result in results:
+                for url, result in zip(batch, results):
                     if isinstance(result, Exception):
                         logger.error(f"Crawl error: {result}")
                     elif result:
-                        new_urls = result
-                        queue.extend([u for u in new_urls if u not in self.visited])
+                        frontier.push_links(url, result)
         
+        if self.budget.exhausted:
+            logger.warning(f"Crawl stopped at its {Config.CRAWL_MAX_TOTAL_BYTES} byte limit")
         logger.info(f"✅ Crawl finished. Found {len(self.documents)} pages.")
         return self.documents
     
-    async def _fetch_page(self, client: httpx.AsyncClient, url: str, domain: str) -> Optional[List[str]]:
-        """Fetch and parse a single page."""
-        if url in self.visited:
+    async def _fetch_page(self, client: httpx.AsyncClient, url: str) -> Optional[List[str]]:
+        """Fetch and parse a single page; returns its link targets."""
+        if url in self.visited or self.budget.exhausted:
             return None
         
         try:
             logger.info(f"Fetching: {url}")
-            response = await client.get(url, follow_redirects=True)
-            
-            # Check content type
-            content_type = response.headers.get("Content-Type", "")
-            if "text/html" not in content_type:
-                logger.warning(f"Skipping non-HTML: {url}")
-                return None
-            
-            soup = BeautifulSoup(response.content, "html.parser")
-            
-            # Remove unwanted elements
-            for element in soup(["script", "style", "nav", "footer", "iframe", "noscript", "header"]):
-                element.decompose()
+            with stage_timer("crawl_fetch"):
+                async with client.stream("GET", url, follow_redirects=True) as response:
+                    # Check content type before reading the body; leaving the block aborts the download
+                    content_type = response.headers.get("Content-Type", "")
+                    if not is_html(content_type):
+                        logger.warning(f"Skipping non-HTML: {url}")
+                        PAGES_FETCHED.labels("skipped").inc()
+                        return None
+                    
+                    decoder = PageDecoder(content_type, Config.CRAWL_MAX_PAGE_BYTES, self.budget)
+                    async for chunk in response.aiter_bytes():
+                        if not decoder.feed(chunk):
+                            break
+            CRAWL_BYTES.inc(decoder.received)
+            if decoder.truncated:
+                logger.warning(f"Truncated at {decoder.received} bytes: {url}")
+            PAGES_FETCHED.labels("ok").inc()
             
-            # Extract main content
-            text = soup.get_text(separator=' ', strip=True)
+            text, links = await asyncio.get_running_loop().run_in_executor(
+                batch_executor, bind(timed, "parse", parse_page, decoder.text())
+            )
             
             # Only save if content is substantial
             if len(text) > 200:
@@ -194,13 +450,7 @@ class AsyncWebCrawler:
                 )
                 self.visited.add(url)
                 
-                # Extract links for further crawling
-                links = []
-                for link in soup.find_all("a", href=True):
-                    full_url = urljoin(url, link["href"])
-                    if urlparse(full_url).netloc == domain and full_url not in self.visited:
-                        links.append(full_url)
-                
+                # Links for further crawling (the frontier filters and scores them)
                 return links
             else:
                 logger.warning(f"Page too short: {url}")
@@ -208,98 +458,474 @@ class AsyncWebCrawler:
                 
         except Exception as e:
             logger.error(f"Failed to fetch {url}: {e}")
+            PAGES_FETCHED.labels("error").inc()
             return None
 
 # --- RAG SERVICE ---
+SNAPSHOT_KIND = "notebook-chroma"
+FULL_VECTORS_FILE = "full_vectors.sqlite3"  # In PERSIST_DIRECTORY
+
+# Stopwords dropped and words stemmed, so "prices" follows up on "pricing"
+topic_analyzer = create_analyzer("stemmed")
+
+# Index versions are unique across reopened collections, so a stale one never matches
+_index_versions = itertools.count(1)
+
+class CollectionIndex:
+    """
+    One collection's vectorstore, dedup state and optional in-process ANN
+    index. With full_vectors, the float32 embeddings live there (on disk) and
+    Chroma only holds placeholders, so the ANN index is the only one in memory.
+    """
+    def __init__(self, name: str, vectorstore: Chroma, ann: Optional[FlatIndex] = None,
+                 full_vectors: Optional[FullVectorStore] = None):
+        self.name = name
+        self.vectorstore = vectorstore
+        self.version = next(_index_versions)  # Changes with every write
+        self.dedup: Optional[NearDuplicateFilter] = None
+        self.dedup_lock = threading.Lock()
+        self.ann = ann
+        self.full_vectors = full_vectors
+        if ann is not None:
+            self._load_ann()
+    
+    def _load_ann(self, page_size: int = 5000):
+        """Fill the ANN index from the stored embeddings."""
+        loaded = 0
+        if self.full_vectors is not None:
+            for ids, vectors in self.full_vectors.pages(self.name, page_size):
+                self.ann.add(ids, vectors)
+                loaded += len(ids)
+        else:
+            while True:
+                data = self.vectorstore._collection.get(include=["embeddings"], limit=page_size, offset=loaded)
+                if not data["ids"]:
+                    break
+                self.ann.add(data["ids"], data["embeddings"])
+                loaded += len(data["ids"])
+        if loaded:
+            logger.info(f"🧭 Loaded {loaded} vectors of '{self.name}' into the {type(self.ann).__name__}")
+    
+    def embeddings_of(self, ids: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Stored float32 embeddings by id."""
+        if self.full_vectors is not None:
+            return self.full_vectors.get(self.name, ids)
+        data = self.vectorstore._collection.get(ids=list(ids), include=["embeddings"])
+        return {id_: np.asarray(vector, dtype=np.float32) for id_, vector in zip(data["ids"], data["embeddings"])}
+    
+    def add_embedded(self, ids: Sequence[str], embeddings, documents: Sequence[str],
+                     metadatas: Sequence[Optional[dict]]):
+        """Store chunks whose embeddings are already computed."""
+        ids = list(ids)
+        if self.full_vectors is not None:
+            # Full vectors first: a chunk Chroma returns always has one
+            self.full_vectors.put(self.name, ids, embeddings)
+            chroma_embeddings = [PLACEHOLDER_EMBEDDING] * len(ids)
+        else:
+            chroma_embeddings = np.asarray(embeddings, dtype=np.float32).tolist()
+        self.vectorstore._collection.add(
+            ids=ids, embeddings=chroma_embeddings, documents=list(documents), metadatas=list(metadatas)
+        )
+        self.version = next(_index_versions)
+        if self.ann is not None:
+            self.ann.add(ids, embeddings)
+    
+    def add_documents(self, splits: List[Document]) -> List[str]:
+        if self.full_vectors is not None:
+            if not splits:
+                return []
+            ids = [str(uuid.uuid4()) for _ in splits]
+            texts = [doc.page_content for doc in splits]
+            embeddings = self.vectorstore.embeddings.embed_documents(texts)
+            self.add_embedded(ids, embeddings, texts, [doc.metadata or None for doc in splits])
+            return ids
+        
+        ids = self.vectorstore.add_documents(splits)
+        self.version = next(_index_versions)
+        if self.ann is not None and ids:
+            # Reuse the stored embeddings rather than embedding twice
+            data = self.vectorstore._collection.get(ids=ids, include=["embeddings"])
+            self.ann.add(data["ids"], data["embeddings"])
+        return ids
+    
+    def delete(self, ids: List[str]):
+        self.vectorstore.delete(ids=ids)
+        self.version = next(_index_versions)
+        if self.full_vectors is not None:
+            self.full_vectors.delete(self.name, ids)
+        if self.ann is not None:
+            self.ann.remove(ids)
+    
+    def drop(self):
+        """Delete the collection and its stored vectors."""
+        self.vectorstore.delete_collection()
+        if self.full_vectors is not None:
+            self.full_vectors.drop(self.name)
+    
+    def search(self, question: str, k: int) -> List[Tuple[Document, float]]:
+        """
+        The k nearest chunks with scores, higher is closer: cosine similarity
+        in an ANN index, negated distance in Chroma's.
+        """
+        if self.ann is None:
+            return [(doc, -distance) for doc, distance in self.vectorstore.similarity_search_with_score(question, k=k)]
+        
+        return self._ann_search([self.vectorstore.embeddings.embed_query(question)], k)[0]
+    
+    def search_many(self, questions: Sequence[str], k: int) -> List[List[Tuple[Document, float]]]:
+        """search for each of many questions: embedded concurrently, then one batched query."""
+        if not questions:
+            return []
+        embeddings = self.vectorstore.embeddings.embed_documents(list(questions))
+        if self.ann is not None:
+            return self._ann_search(embeddings, k)
+        
+        data = self.vectorstore._collection.query(
+            query_embeddings=embeddings, n_results=k, include=["documents", "metadatas", "distances"]
+        )
+        return [
+            [(Document(page_content=text, metadata=meta or {}), -distance) for text, meta, distance in zip(*row)]
+            for row in zip(data["documents"], data["metadatas"], data["distances"])
+        ]
+    
+    def _ann_search(self, embeddings: List[List[float]], k: int) -> List[List[Tuple[Document, float]]]:
+        """
+        ANN hits with their documents, fetched from Chroma in one call. When the
+        index's scores are approximate, VECTOR_RESCORE times k candidates are
+        rescored exactly with their stored float32 embeddings.
+        """
+        rescoring = self.ann.lossy and Config.VECTOR_RESCORE > 1
+        hits = self.ann.search_many(embeddings, k * Config.VECTOR_RESCORE if rescoring else k)
+        ids = list(dict.fromkeys(id_ for row in hits for id_, _ in row))
+        if not ids:
+            return [[] for _ in hits]
+        if rescoring:
+            vectors = self.embeddings_of(ids)
+            hits = [rescore(query, row, vectors, k) for query, row in zip(embeddings, hits)]
+            ids = list(dict.fromkeys(id_ for row in hits for id_, _ in row))
+        data = self.vectorstore._collection.get(ids=ids, include=["documents", "metadatas"])
+        docs = {
+            id_: Document(page_content=text, metadata=meta or {})
+            for id_, text, meta in zip(data["ids"], data["documents"], data["metadatas"])
+        }
+        return [[(docs[id_], score) for id_, score in row if id_ in docs] for row in hits]
+    
+    def similarity_search(self, question: str, k: int) -> List[Document]:
+        return [doc for doc, _ in self.search(question, k)]
+    
+    def chunk_batches(self, source: Optional[str], page_size: int) -> Iterator[List[dict]]:
+        """
+        Stored chunks (only source's, if given) as export records, a page at a
+        time. Pages are read as they are needed, so writes made meanwhile may
+        or may not show up.
+        """
+        where = {"source": source} if source else None
+        offset = 0
+        while True:
+            data = self.vectorstore.get(where=where, limit=page_size, offset=offset, include=["documents", "metadatas"])
+            if not data["ids"]:
+                return
+            yield [
+                {"id": id_, "source": (meta or {}).get("source", "Unknown"), "text": text}
+                for id_, text, meta in zip(data["ids"], data["documents"], data["metadatas"])
+            ]
+            offset += len(data["ids"])
+    
+    def retrieval_records(self, queries: Sequence[tuple], k: int, include_text: bool) -> List[dict]:
+        """Top-k results of each (id, query) as export records, all queries searched in one batch."""
+        records = []
+        for (query_id, query), hits in zip(queries, self.search_many([query for _, query in queries], k)):
+            results = []
+            for rank, (doc, score) in enumerate(hits, 1):
+                result = {"rank": rank, "source": doc.metadata.get("source", "Unknown"), "score": float(score)}
+                if include_text:
+                    result["text"] = doc.page_content
+                results.append(result)
+            records.append({"id": query_id, "query": query, "results": results})
+        return records
+    
+    def retrieval_batches(self, queries: Sequence[tuple], k: int, include_text: bool,
+                          size: int) -> Iterator[List[dict]]:
+        """retrieval_records of size queries at a time."""
+        for start in range(0, len(queries), size):
+            yield self.retrieval_records(queries[start:start + size], k, include_text)
+
 class RAGService:
     def __init__(self):
-        self.vectorstore: Optional[Chroma] = None
+        self.client: Optional[chromadb.ClientAPI] = None
+        self.full_vectors: Optional[FullVectorStore] = None  # Opened with the client
         self.llm: Optional[ChatOllama] = None
         self.embeddings: Optional[OllamaEmbeddings] = None
+        self.collections: CollectionCache[CollectionIndex] = CollectionCache(
+            capacity=Config.MAX_LOADED_COLLECTIONS,
+            idle_ttl=Config.COLLECTION_IDLE_TTL
+        )
+        self.store: Optional[SharedIndexStore] = (
+            SharedIndexStore(Config.SHARED_INDEX_PATH) if Config.SHARED_INDEX_PATH else None
+        )
+        self.version = 0
+        self._client_lock = threading.Lock()  # Serializes opening and reopening the client
+    
+    @property
+    def vectorstore(self) -> Optional[Chroma]:
+        """The default collection's vectorstore, if loaded."""
+        index = self.collections.peek(DEFAULT_COLLECTION)
+        return index.vectorstore if index else None
     
     def initialize(self):
-        """Initialize embeddings and vectorstore."""
-        if self.vectorstore is None:
-            self.embeddings = OllamaEmbeddings(model=Config.MODEL_NAME)
-            self.vectorstore = Chroma(
-                persist_directory=Config.PERSIST_DIRECTORY,
-                embedding_function=self.embeddings
-            )
+        """Open the Chroma client, reopening it if another worker changed the index."""
+        if self.client is not None and (self.store is None or self.store.version() == self.version):
+            return
+        
+        with self._client_lock:
+            version = self.store.version() if self.store is not None else self.version
+            if self.client is not None and version == self.version:
+                return  # Another thread reopened it meanwhile
+            
+            if self.client is None:
+                self.embeddings = OllamaEmbeddings(ollama, Config.MODEL_NAME)
+                self.full_vectors = FullVectorStore(os.path.join(Config.PERSIST_DIRECTORY, FULL_VECTORS_FILE))
+            else:
+                logger.info(f"🔄 Index changed (v{self.version} -> v{version}), reopening")
+            # Swapped in only once it is open: requests still reading through the
+            # previous client's collections keep using them until they finish
+            self.client = self._open_client()
+            self.collections.clear()
+            self.version = version
             logger.info("✅ RAG Service initialized")
     
+    def _open_client(self) -> chromadb.ClientAPI:
+        """
+        A client on its own Chroma system, which loads the index from disk.
+        
+        Chroma shares one system (and its in-memory index) per path between
+        clients; it is replaced here rather than cleared, so no other thread can
+        find the path without a system or start a second one for it.
+        """
+        settings = ChromaSettings(
+            anonymized_telemetry=False, allow_reset=True,
+            is_persistent=True, persist_directory=Config.PERSIST_DIRECTORY
+        )
+        if Config.CHROMA_MEMORY_LIMIT_BYTES and "chroma_memory_limit_bytes" in ChromaSettings.__fields__:
+            # Chroma >= 0.4.23 can also unload idle collections' vector segments
+            settings.chroma_segment_cache_policy = "LRU"
+            settings.chroma_memory_limit_bytes = Config.CHROMA_MEMORY_LIMIT_BYTES
+        system = System(settings)
+        system.instance(ProductTelemetryClient)
+        system.instance(ServerAPI)
+        system.start()
+        return ChromaClient.from_system(system)
+    
+    def collection(self, name: str = DEFAULT_COLLECTION) -> CollectionIndex:
+        """A collection's index, opened on first use and unloaded again when idle."""
+        self.initialize()
+        return self.collections.get(name, lambda: self._open_collection(name))
+    
+    def _open_collection(self, name: str) -> CollectionIndex:
+        # Before collections, everything lived in LangChain's default collection
+        chroma_name = "langchain" if name == DEFAULT_COLLECTION else name
+        try:
+            existing = self.client.get_collection(chroma_name)
+            metadata = None  # Existing collections keep the HNSW settings they were built with
+            external = (existing.metadata or {}).get("vectors") == "external"
+        except ValueError:
+            # Collections created for an in-process index keep their vectors out of Chroma
+            external = Config.VECTOR_INDEX != "chroma"
+            metadata = {
+                "hnsw:space": Config.HNSW_SPACE,
+                "hnsw:M": Config.HNSW_M,
+                "hnsw:construction_ef": Config.HNSW_CONSTRUCTION_EF,
+                "hnsw:search_ef": Config.HNSW_SEARCH_EF,
+                **({"vectors": "external"} if external else {}),
+            }
+        vectorstore = Chroma(
+            client=self.client,
+            collection_name=chroma_name,
+            embedding_function=self.embeddings,
+            collection_metadata=metadata
+        )
+        ann = None
+        if Config.VECTOR_INDEX != "chroma" or external:
+            kind = Config.VECTOR_INDEX
+            if kind == "chroma":
+                logger.warning(f"Collection '{name}' keeps its vectors outside Chroma; searching it with a flat index")
+                kind = "flat"
+            ann = create_index(
+                kind, Config.VECTOR_DTYPE, Config.IVF_NLIST, Config.IVF_NPROBE,
+                pca_dim=Config.VECTOR_PCA_DIM, pca_sample=Config.VECTOR_PCA_SAMPLE
+            )
+        return CollectionIndex(name, vectorstore, ann, self.full_vectors if external else None)
+    
     def get_llm(self) -> ChatOllama:
         """Get or create LLM instance."""
         if self.llm is None:
-            self.llm = ChatOllama(model=Config.MODEL_NAME)
+            self.llm = ChatOllama(client=ollama, model=Config.MODEL_NAME, keep_alive=Config.OLLAMA_KEEP_ALIVE)
         return self.llm
     
-    async def add_documents(self, documents: List[Document]) -> int:
-        """Add documents to vectorstore with chunking."""
-        self.initialize()
+    def _get_dedup_filter(self, index: CollectionIndex) -> NearDuplicateFilter:
+        """Get a collection's dedup filter, seeding it from its stored chunks on first use."""
+        with index.dedup_lock:
+            if index.dedup is None:
+                dedup = NearDuplicateFilter(threshold=Config.DEDUP_THRESHOLD)
+                try:
+                    for batch in index.chunk_batches(None, Config.MAX_VECTORSTORE_FETCH):
+                        dedup.add(record["text"] for record in batch)
+                except Exception as e:
+                    logger.warning(f"Could not seed dedup filter: {e}")
+                index.dedup = dedup
+            return index.dedup
+    
+    def _deduplicate(self, index: CollectionIndex, splits: List[Document]) -> tuple[List[Document], DedupReport]:
+        """Drop chunks that duplicate stored content or each other (kept ones are remembered once stored)."""
+        return self._get_dedup_filter(index).filter(splits, text_of=lambda d: d.page_content, record=False)
+    
+    @contextmanager
+    def _exclusive_write(self):
+        """Serialize index writes across workers and publish a new version."""
+        if self.store is None:
+            yield
+            return
+        
+        with self.store.transaction() as txn:
+            self.initialize()  # Pick up other workers' writes before changing the index
+            yield
+        self.version = txn.version
+    
+    def _index_splits(self, splits: List[Document], collection: str) -> tuple[int, Optional[DedupReport]]:
+        """Dedup and embed chunks (blocking)."""
+        with self._exclusive_write():
+            index = self.collection(collection)
+            report = None
+            if Config.DEDUP_ENABLED:
+                splits, report = timed("dedup", self._deduplicate, index, splits)
+                logger.info(
+                    f"🧹 Dedup dropped {report.chunks_dropped}/{report.chunks_in} chunks "
+                    f"({report.bytes_saved} bytes)"
+                )
+            
+            if splits:
+                logger.info(f"⏳ Embedding {len(splits)} chunks...")
+                timed("embed", index.add_documents, splits)
+                logger.info(f"✅ Embedded {len(splits)} chunks into '{collection}'")
+                if Config.DEDUP_ENABLED:
+                    # Only now that they are stored: a failed write leaves them ingestible
+                    self._get_dedup_filter(index).add(d.page_content for d in splits)
+            
+            self.update_corpus_gauge()
+            return len(splits), report
+    
+    @traced("RAGService.add_documents")
+    async def add_documents(self, documents: List[Document],
+                            collection: str = DEFAULT_COLLECTION) -> tuple[int, Optional[DedupReport]]:
+        """Add documents to a collection with chunking and dedup."""
         
         splitter = RecursiveCharacterTextSplitter(
             chunk_size=Config.CHUNK_SIZE,
             chunk_overlap=Config.CHUNK_OVERLAP
         )
-        splits = splitter.split_documents(documents)
-        
-        logger.info(f"⏳ Embedding {len(splits)} chunks...")
-        
-        # Run blocking operation in executor
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, self.vectorstore.add_documents, splits)
         
-        logger.info(f"✅ Embedded {len(splits)} chunks")
-        return len(splits)
+        # Run blocking operations in executor
+        loop = asyncio.get_running_loop()
+        splits = await loop.run_in_executor(batch_executor, bind(timed, "chunk", splitter.split_documents, documents))
+        return await loop.run_in_executor(batch_executor, bind(self._index_splits, splits, collection))
     
-    async def query(self, question: str, k: int = 4) -> dict:
-        """Query the RAG system."""
-        self.initialize()
-        
-        prompt = ChatPromptTemplate.from_template("""
-        Answer the question based ONLY on the context below.
-        If you cannot find the answer in the context, say so.
-        Include relevant source citations in your answer.
+    async def index_version(self, collection: str = DEFAULT_COLLECTION) -> int:
+        """The collection's current index version (changes with every write, in any worker)."""
+        loop = asyncio.get_running_loop()
+        index = await loop.run_in_executor(executor, self.collection, collection)
+        return index.version
+    
+    def retrieve(self, index: CollectionIndex, question: str, k: int) -> List[Document]:
+        """Top-k chunks for a question, reranked if a reranker is configured (blocking)."""
+        if reranker is None:
+            return timed("retrieval", index.similarity_search, question, k)
+        candidates = timed("retrieval", index.similarity_search, question, max(k, Config.RERANK_CANDIDATES))
+        return timed("rerank", reranker.rerank, question, candidates, lambda doc: doc.page_content, k)
+    
+    @traced("RAGService.query")
+    async def query(self, question: str, k: Optional[int] = None, collection: str = DEFAULT_COLLECTION,
+                    session: Optional[ChatSession] = None) -> dict:
+        """Query the RAG system, as the next turn of session if given (hold session.lock)."""
+        # Run in executor; opening the collection, retrieval and generation are timed separately
+        loop = asyncio.get_running_loop()
+        index = await loop.run_in_executor(executor, self.collection, collection)
         
-        <context>
-        {context}
-        </context>
+        if session is None:
+            prompt = ChatPromptTemplate.from_template("""
+            Answer the question based ONLY on the context below.
+            If you cannot find the answer in the context, say so.
+            Cite the passages you used by their [number].
+            
+            <context>
+            {context}
+            </context>
+            
+            Question: {input}
+            """)
+        else:
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", "Answer questions based ONLY on the context below. "
+                           "If you cannot find the answer in the context, say so. "
+                           "Cite the passages you used by their [number].\n\n"
+                           "<context>\n{context}\n</context>"),
+                MessagesPlaceholder("history"),
+                ("human", "{input}"),
+            ])
         
-        Question: {input}
-        """)
+        chain = create_stuff_documents_chain(self.get_llm(), prompt)
         
-        retriever = self.vectorstore.as_retriever(search_kwargs={"k": k})
-        chain = create_retrieval_chain(
-            retriever,
-            create_stuff_documents_chain(self.get_llm(), prompt)
+        question_terms = frozenset(topic_analyzer(question))
+        reused = session is not None and session.same_topic(
+            question_terms, index.version, Config.SESSION_TOPIC_OVERLAP
         )
+        if reused:
+            # The same passages word for word: the prompt prefix stays cached in Ollama
+            packed = session.reuse_retrieval(question_terms)
+        else:
+            docs = await loop.run_in_executor(
+                executor, bind(self.retrieve, index, question, k or Config.RETRIEVAL_K)
+            )
+            passages = [(doc.page_content, doc.metadata.get("source", "Unknown")) for doc in docs]
+            budget = Config.CONTEXT_TOKEN_BUDGET if Config.CONTEXT_COMPRESSION else sys.maxsize
+            packed = await loop.run_in_executor(
+                executor, bind(timed, "context_packing", pack_context, question, passages, budget,
+                           relevant_only=Config.CONTEXT_COMPRESSION)
+            )
+            if session is not None:
+                session.remember_retrieval(question_terms, index.version, packed)
         
-        # Run in executor
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: chain.invoke({"input": question})
+        context = [Document(page_content=packed.text)] if packed.text else []
+        inputs = {"input": question, "context": context}
+        if session is not None:
+            inputs["history"] = [
+                message
+                for turn in session.history(Config.SESSION_HISTORY_TOKENS, count_tokens)
+                for message in (HumanMessage(content=turn.question), AIMessage(content=turn.answer))
+            ]
+        answer = await loop.run_in_executor(
+            executor,
+            bind(timed, "generation", chain.invoke, inputs)
         )
         
-        # Extract unique sources
-        sources = set()
-        for doc in response.get("context", []):
-            sources.add(doc.metadata.get("source", "Unknown"))
-        
-        return {
-            "answer": response["answer"],
-            "citations": list(sources)
+        # citations[n - 1] is the source of passage [n]
+        result = {
+            "answer": answer,
+            "citations": packed.citations,
+            "context_tokens": packed.tokens
         }
+        if session is not None:
+            session.add_turn(question, answer)
+            result.update(session_id=session.id, retrieval_reused=reused)
+        return result
     
-    async def generate_briefing(self) -> str:
+    @traced("RAGService.generate_briefing")
+    async def generate_briefing(self, collection: str = DEFAULT_COLLECTION) -> str:
         """Generate a briefing document."""
-        self.initialize()
-        
-        retriever = self.vectorstore.as_retriever(search_kwargs={"k": 5})
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
+        index = await loop.run_in_executor(batch_executor, self.collection, collection)
         docs = await loop.run_in_executor(
-            None,
-            lambda: retriever.invoke("Overview of the content")
+            batch_executor,
+            bind(timed, "retrieval", index.similarity_search, "Overview of the content", 5)
         )
         
         if not docs:
@@ -317,17 +943,21 @@ class RAGService:
         """
         
         response = await loop.run_in_executor(
-            None,
-            lambda: self.get_llm().invoke(prompt)
+            batch_executor,
+            bind(timed, "generation", self.get_llm().invoke, prompt)
         )
         
         return response.content
     
-    async def generate_podcast_script(self) -> str:
+    @traced("RAGService.generate_podcast_script")
+    async def generate_podcast_script(self, collection: str = DEFAULT_COLLECTION) -> str:
         """Generate a podcast script."""
-        self.initialize()
-        
-        docs = self.vectorstore.similarity_search("Main concepts overview", k=10)
+        loop = asyncio.get_running_loop()
+        index = await loop.run_in_executor(batch_executor, self.collection, collection)
+        docs = await loop.run_in_executor(
+            batch_executor,
+            bind(timed, "retrieval", index.similarity_search, "Main concepts overview", 10)
+        )
         if not docs:
             raise ValueError("Not enough content for podcast")
         
@@ -346,20 +976,38 @@ class RAGService:
         {context[:5000]}
         """
         
-        loop = asyncio.get_event_loop()
         response = await loop.run_in_executor(
-            None,
-            lambda: self.get_llm().invoke(prompt)
+            batch_executor,
+            bind(timed, "generation", self.get_llm().invoke, prompt)
         )
         
         return response.content
     
-    def get_sources(self) -> List[str]:
-        """Get all unique sources."""
+    def update_corpus_gauge(self):
+        """Refresh the corpus size gauge (all loaded collections) after the index changed."""
+        try:
+            CORPUS_CHUNKS.set(sum(index.vectorstore._collection.count() for _, index in self.collections.items()))
+        except Exception as e:
+            logger.debug(f"Could not count chunks: {e}")
+    
+    def list_collections(self) -> List[dict]:
+        """All collections with their chunk counts."""
         self.initialize()
+        return [
+            {
+                "name": DEFAULT_COLLECTION if c.name == "langchain" else c.name,
+                "total_chunks": c.count(),
+                "loaded": (DEFAULT_COLLECTION if c.name == "langchain" else c.name) in self.collections
+            }
+            for c in sorted(self.client.list_collections(), key=lambda c: c.name)
+        ]
+    
+    def get_sources(self, collection: str = DEFAULT_COLLECTION) -> List[str]:
+        """Get all unique sources."""
+        index = self.collection(collection)
         
         try:
-            data = self.vectorstore.get(
+            data = index.vectorstore.get(
                 limit=Config.MAX_VECTORSTORE_FETCH,
                 include=["metadatas"]
             )
@@ -375,40 +1023,139 @@ class RAGService:
             logger.error(f"Error fetching sources: {e}")
             return []
     
-    def delete_source(self, source_url: str) -> int:
+    def delete_source(self, source_url: str, collection: str = DEFAULT_COLLECTION) -> int:
         """Delete all chunks from a specific source."""
-        self.initialize()
+        with self._exclusive_write():
+            index = self.collection(collection)
+            data = index.vectorstore.get(where={"source": source_url})
+            if data and data.get('ids'):
+                index.delete(data['ids'])
+                index.dedup = None  # Reseeded from the remaining chunks on next ingest
+                self.update_corpus_gauge()
+                return len(data['ids'])
+            return 0
+    
+    def export_snapshot(self, collection: str, path: str) -> tuple[int, int]:
+        """Write a collection with its stored embeddings to a snapshot file; returns (chunks, bytes)."""
+        index = self.collection(collection)
+        ids, texts, metadatas, vectors = [], [], [], []
+        while True:
+            data = index.vectorstore._collection.get(
+                include=["documents", "metadatas"], limit=Config.SNAPSHOT_BATCH_SIZE, offset=len(ids)
+            )
+            if not data["ids"]:
+                break
+            embedded = index.embeddings_of(data["ids"])
+            ids.extend(data["ids"])
+            texts.extend(data["documents"])
+            metadatas.extend(json.dumps(meta or {}) for meta in data["metadatas"])
+            vectors.append(np.stack([embedded[id_] for id_ in data["ids"]]))
+        
+        embeddings = np.concatenate(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        meta = {
+            "collection": collection,
+            "chunks": len(ids),
+            "embedding_model": Config.MODEL_NAME,
+            "dim": int(embeddings.shape[1]),
+            "created": datetime.now().isoformat(),
+        }
+        size = write_snapshot(path, SNAPSHOT_KIND, meta, {
+            **string_sections("id", ids),
+            **string_sections("text", texts),
+            **string_sections("metadata", metadatas),
+            "embeddings": embeddings,
+        })
+        logger.info(f"📤 Exported '{collection}': {len(ids)} chunks, {size} bytes")
+        return len(ids), size
+    
+    def import_snapshot(
+        self, path: str, collection: Optional[str] = None, only_if_empty: bool = False, mapped: bool = True
+    ) -> dict:
+        """
+        Replace a collection (the snapshot's own unless one is given) with a
+        snapshot file's chunks and embeddings, without calling the embedding model.
+        mapped=False reads the file into memory so it can be deleted afterwards.
+        """
+        snap = SnapshotFile(path, mapped=mapped)
+        if snap.kind != SNAPSHOT_KIND:
+            raise ValueError(f"Not a {SNAPSHOT_KIND} snapshot (got '{snap.kind}')")
+        if snap.meta.get("embedding_model") != Config.MODEL_NAME:
+            raise ValueError(
+                f"Snapshot embeddings come from '{snap.meta.get('embedding_model')}', not '{Config.MODEL_NAME}'"
+            )
+        name = collection or snap.meta.get("collection") or DEFAULT_COLLECTION
+        if not re.match(COLLECTION_NAME_PATTERN, name):
+            raise ValueError(f"Invalid collection name in snapshot: {name}")
+        
+        ids, texts = snap.strings("id"), snap.strings("text")
+        metadatas = [json.loads(meta) or None for meta in snap.strings("metadata")]
+        embeddings = snap.array("embeddings")  # Memory-mapped unless mapped=False; read batch by batch
+        
+        with self._exclusive_write():
+            index = self.collection(name)
+            if only_if_empty and index.vectorstore._collection.count():
+                logger.info(f"Collection '{name}' already has content, not importing {path}")
+                return {"collection": name, "imported": False, "total_chunks": index.vectorstore._collection.count()}
+            
+            # Load into a staging collection; the live one stays intact (and
+            # readable) until the import is complete, then the two are swapped
+            staging = self._open_collection(f"import-{uuid.uuid4().hex}")
+            try:
+                for batch in iter_batches(len(ids), Config.SNAPSHOT_BATCH_SIZE):
+                    staging.add_embedded(ids[batch], embeddings[batch], texts[batch], metadatas[batch])
+            except BaseException:
+                staging.drop()
+                raise
+            self._swap_in(name, index, staging)
         
-        data = self.vectorstore.get(where={"source": source_url})
-        if data and data.get('ids'):
-            self.vectorstore.delete(ids=data['ids'])
-            return len(data['ids'])
-        return 0
-    
-    def clear_all(self):
-        """Clear the entire database."""
-        import shutil
-        if os.path.exists(Config.PERSIST_DIRECTORY):
-            shutil.rmtree(Config.PERSIST_DIRECTORY)
-        self.vectorstore = None
-        self.llm = None
-        logger.info("🗑️ Database cleared")
+        self.update_corpus_gauge()
+        logger.info(f"📥 Imported snapshot into '{name}': {len(ids)} chunks")
+        return {"collection": name, "imported": True, "total_chunks": len(ids)}
+    
+    def _swap_in(self, name: str, live: CollectionIndex, staging: CollectionIndex):
+        """Replace a collection's content with a fully loaded staging collection's (hold _exclusive_write)."""
+        chroma_name = live.vectorstore._collection.name
+        live.vectorstore._collection.modify(name=f"replaced-{uuid.uuid4().hex}")
+        staging.vectorstore._collection.modify(name=chroma_name)
+        live.drop()
+        if staging.full_vectors is not None:
+            staging.full_vectors.rename(staging.name, name)
+        staging.name = name
+        self.collections.pop(name)
+        self.collections.get(name, lambda: staging)
+    
+    def clear(self, collection: str = DEFAULT_COLLECTION):
+        """Clear a collection."""
+        with self._exclusive_write():
+            self.collection(collection).drop()
+            self.collections.pop(collection)
+        self.update_corpus_gauge()
+        logger.info(f"🗑️ Collection '{collection}' cleared")
 
 # --- HEALTH CHECK ---
 async def check_ollama_health() -> bool:
-    """Check if Ollama is reachable."""
-    try:
-        async with httpx.AsyncClient(timeout=2.0) as client:
-            response = await client.get(f"{Config.OLLAMA_HOST}/api/version")
-            return response.status_code == 200
-    except Exception:
-        return False
+    """Check if Ollama is reachable (cached for OLLAMA_HEALTH_TTL seconds)."""
+    return await ollama.is_healthy()
 
-async def ensure_ollama_ready(retries: int = 6, base_delay: float = 1.0):
-    """Wait for Ollama to become available."""
+def ollama_unavailable(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"Ollama at {Config.OLLAMA_HOST} is unavailable. Start with 'ollama serve'",
+        headers={"Retry-After": str(max(1, round(retry_after)))}
+    )
+
+async def ensure_ollama_ready():
+    """Fail fast with 503 while Ollama is down instead of waiting in the request."""
+    if ollama.breaker.state == "open":
+        raise ollama_unavailable(ollama.breaker.retry_after())
+    if not await check_ollama_health():
+        raise ollama_unavailable(Config.OLLAMA_HEALTH_TTL)
+
+async def wait_for_ollama(retries: int = 6, base_delay: float = 1.0):
+    """Wait for Ollama to become available (startup only)."""
     delay = base_delay
     for attempt in range(1, retries + 1):
-        if await check_ollama_health():
+        if await ollama.check_health():
             logger.info("✅ Ollama is ready")
             return
         
@@ -416,28 +1163,62 @@ async def ensure_ollama_ready(retries: int = 6, base_delay: float = 1.0):
         await asyncio.sleep(delay)
         delay = min(delay * 2, 10)
     
-    raise HTTPException(
-        status_code=503,
-        detail=f"Ollama at {Config.OLLAMA_HOST} is unavailable. Start with 'ollama serve'"
-    )
+    raise ollama_unavailable(Config.OLLAMA_HEALTH_TTL)
 
 # --- API MODELS ---
 class IngestRequest(BaseModel):
     url: HttpUrl
     max_pages: int = Field(default=5, ge=1, le=50, description="Max pages to crawl")
+    collection: str = Field(default=DEFAULT_COLLECTION, pattern=COLLECTION_NAME_PATTERN)
+
+MAX_QUERY_CHARS = 1000  # Questions and retrieval queries
 
 class ChatRequest(BaseModel):
-    question: str = Field(..., min_length=1, max_length=1000)
+    question: str = Field(..., min_length=1, max_length=MAX_QUERY_CHARS)
+    collection: str = Field(default=DEFAULT_COLLECTION, pattern=COLLECTION_NAME_PATTERN)
+    # "new" starts a session; omit for a one-off question
+    session_id: Optional[str] = Field(default=None, max_length=64)
+
+class BatchRetrieveRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=Config.BATCH_MAX_QUERIES)
+    k: int = Field(default=Config.RETRIEVAL_K, ge=1, le=100, description="Results per query")
+    include_text: bool = Field(default=False, description="Include each result's chunk text")
+    collection: str = Field(default=DEFAULT_COLLECTION, pattern=COLLECTION_NAME_PATTERN)
+    
+    @validator("queries", each_item=True)
+    def validate_queries(cls, v):
+        v = v.strip()
+        if not v or len(v) > MAX_QUERY_CHARS:
+            raise ValueError(f"Queries must be 1 to {MAX_QUERY_CHARS} characters")
+        return v
+
+class BulkIngestRequest(BaseModel):
+    urls: List[HttpUrl] = Field(default_factory=list, max_length=Config.BULK_MAX_URLS)
+    sitemap_url: Optional[HttpUrl] = None
+    max_pages: int = Field(default=1, ge=1, le=50, description="Max pages to crawl from each URL")
+    collection: str = Field(default=DEFAULT_COLLECTION, pattern=COLLECTION_NAME_PATTERN)
 
 class DeleteSourceRequest(BaseModel):
-    source_url: HttpUrl
+    # A crawled page URL, or upload://<filename> for uploaded documents
+    source_url: str = Field(..., min_length=1, max_length=2048)
+    collection: str = Field(default=DEFAULT_COLLECTION, pattern=COLLECTION_NAME_PATTERN)
+
+def collection_query() -> str:
+    return Query(DEFAULT_COLLECTION, pattern=COLLECTION_NAME_PATTERN, description="Collection to use")
 
 class ErrorResponse(BaseModel):
     error: str
     detail: Optional[str] = None
 
 # --- FASTAPI APP ---
-limiter = Limiter(key_func=get_remote_address)
+limiter = Limiter(key_func=get_remote_address, enabled=Config.RATE_LIMIT_ENABLED)
+
+# Concurrent identical requests share one computation
+chat_flights = SingleFlight("chat")
+briefing_flights = SingleFlight("briefing")
+podcast_flights = SingleFlight("podcast")
+
+sessions = SessionStore(Config.MAX_SESSIONS, Config.SESSION_TTL, Config.SESSION_MAX_TURNS)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -448,9 +1229,24 @@ async def lifespan(app: FastAPI):
     logger.info(f"💾 Database: {Config.PERSIST_DIRECTORY}")
     
     try:
-        await ensure_ollama_ready()
-        app.state.rag_service = RAGService()
-        app.state.rag_service.initialize()
+        await wait_for_ollama()
+        ollama.start_health_refresh()
+        # Opening Chroma and importing snapshots block, so they run off the event loop
+        loop = asyncio.get_running_loop()
+        rag_service = app.state.rag_service = await loop.run_in_executor(batch_executor, RAGService)
+        await loop.run_in_executor(batch_executor, bind(rag_service.collection, DEFAULT_COLLECTION))
+        for path in filter(None, (p.strip() for p in Config.SNAPSHOT_IMPORT.split(","))):
+            try:
+                await loop.run_in_executor(
+                    batch_executor, bind(timed, "snapshot_load", rag_service.import_snapshot, path, only_if_empty=True)
+                )
+            except (OSError, ValueError) as e:
+                logger.error(f"❌ Could not import snapshot {path}: {e}")
+        await loop.run_in_executor(batch_executor, rag_service.update_corpus_gauge)
+        
+        if Config.LOOP_LAG_INTERVAL > 0:
+            loop_monitor.start()
+        logger.info(f"🧵 {Config.MAX_WORKERS} worker threads, at most {Config.BATCH_WORKERS} for batch work")
     except Exception as e:
         logger.error(f"❌ Startup failed: {e}")
         raise
@@ -458,6 +1254,10 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown
+    if Config.LOOP_LAG_INTERVAL > 0:
+        await loop_monitor.stop()
+    scheduler.shutdown(wait=False)
+    await ollama.aclose()
     logger.info("👋 Shutting down")
 
 app = FastAPI(
@@ -467,15 +1267,23 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    """Count rejections, then answer with slowapi's 429 response."""
+    RATE_LIMIT_REJECTIONS.labels(request.url.path).inc()
+    return _rate_limit_exceeded_handler(request, exc)
+
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
+app.middleware("http")(request_id_middleware)
+app.include_router(admin_router)
 
 # --- ENDPOINTS ---
 
@@ -486,9 +1294,18 @@ async def health_check():
     return {
         "status": "healthy" if ollama_status else "degraded",
         "ollama": ollama_status,
+        "ollama_circuit": ollama.breaker.state,
         "database": os.path.exists(Config.PERSIST_DIRECTORY)
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics."""
+    if not PROMETHEUS_AVAILABLE:
+        raise HTTPException(503, "prometheus-client is not installed")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.post("/ingest", response_model=dict)
 @limiter.limit("10/hour")
 async def ingest_website(request: Request, req: IngestRequest):
@@ -505,21 +1322,135 @@ async def ingest_website(request: Request, req: IngestRequest):
         
         # Add to vectorstore
         rag_service: RAGService = request.app.state.rag_service
-        chunks_added = await rag_service.add_documents(documents)
+        chunks_added, dedup_report = await rag_service.add_documents(documents, req.collection)
         
         return {
             "status": "success",
             "pages_crawled": len(documents),
             "chunks_added": chunks_added,
+            "collection": req.collection,
+            "dedup": dedup_report.to_dict() if dedup_report else None,
             "message": f"Successfully ingested {len(documents)} pages"
         }
         
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise ollama_unavailable(e.retry_after)
     except ValueError as e:
         raise HTTPException(400, str(e))
     except Exception as e:
         logger.error(f"Ingest error: {e}")
         raise HTTPException(500, f"Ingestion failed: {str(e)}")
 
+async def ingest_documents(rag_service: RAGService, documents: List[Document], failed: List[dict],
+                           collection: str) -> dict:
+    """Commit documents from many sources as one index update."""
+    if not documents:
+        raise HTTPException(400, {"message": "No content found in any source", "sources_failed": failed})
+    
+    chunks_added, dedup_report = await rag_service.add_documents(documents, collection)
+    logger.info(f"📦 Bulk ingest: {len(documents)} documents, {chunks_added} chunks into '{collection}'")
+    return {
+        "status": "success",
+        "documents_ingested": len(documents),
+        "sources_failed": failed,
+        "chunks_added": chunks_added,
+        "collection": collection,
+        "dedup": dedup_report.to_dict() if dedup_report else None
+    }
+
+@app.post("/ingest/bulk", response_model=dict)
+@limiter.limit("10/hour")
+async def ingest_bulk(request: Request, req: BulkIngestRequest):
+    """Ingest a list of URLs and/or a sitemap's pages, crawled concurrently, as one index update."""
+    if not req.urls and not req.sitemap_url:
+        raise HTTPException(400, "Provide urls and/or sitemap_url")
+    try:
+        await ensure_ollama_ready()
+        
+        targets = [(str(url), req.max_pages) for url in req.urls]
+        if req.sitemap_url:
+            loop = asyncio.get_running_loop()
+            entries = await loop.run_in_executor(batch_executor, bind(
+                collect_sitemap, fetch_raw, str(req.sitemap_url), Config.BULK_MAX_URLS - len(targets)
+            ))
+            listed = {url for url, _ in targets}
+            targets.extend((entry.url, 1) for entry in entries if entry.url not in listed)
+        
+        semaphore = asyncio.Semaphore(Config.BULK_CONCURRENCY)
+        
+        async def crawl(url: str, max_pages: int) -> List[Document]:
+            async with semaphore:
+                return await AsyncWebCrawler(max_pages=max_pages).crawl(url)
+        
+        results = await asyncio.gather(*(crawl(url, pages) for url, pages in targets), return_exceptions=True)
+        
+        documents, failed = [], []
+        for (url, _), result in zip(targets, results):
+            if isinstance(result, Exception):
+                failed.append({"source": url, "error": str(result)})
+            elif not result:
+                failed.append({"source": url, "error": "No content found"})
+            else:
+                documents.extend(result)
+        
+        return await ingest_documents(request.app.state.rag_service, documents, failed, req.collection)
+    
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise ollama_unavailable(e.retry_after)
+    except Exception as e:
+        logger.error(f"Bulk ingest error: {e}")
+        raise HTTPException(500, f"Ingestion failed: {str(e)}")
+
+@app.post("/ingest/upload", response_model=dict)
+@limiter.limit("10/hour")
+async def ingest_upload(
+    request: Request,
+    files: List[UploadFile] = File(..., description="PDF, HTML or text files"),
+    collection: str = Form(DEFAULT_COLLECTION, pattern=COLLECTION_NAME_PATTERN)
+):
+    """Ingest uploaded PDF/HTML/text documents as one index update."""
+    if len(files) > Config.BULK_MAX_FILES:
+        raise HTTPException(400, f"At most {Config.BULK_MAX_FILES} files per request")
+    try:
+        await ensure_ollama_ready()
+        
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(Config.BULK_CONCURRENCY)
+        
+        async def parse(upload: UploadFile) -> Document:
+            data = await upload.read(Config.BULK_MAX_UPLOAD_BYTES + 1)
+            if len(data) > Config.BULK_MAX_UPLOAD_BYTES:
+                raise ValueError(f"Larger than {Config.BULK_MAX_UPLOAD_BYTES} bytes")
+            async with semaphore:
+                return await loop.run_in_executor(
+                    batch_executor, bind(timed, "parse", upload_document, upload.filename, upload.content_type, data)
+                )
+        
+        results = await asyncio.gather(*(parse(upload) for upload in files), return_exceptions=True)
+        
+        documents, failed = [], []
+        for upload, result in zip(files, results):
+            if isinstance(result, Exception):
+                failed.append({"source": upload.filename, "error": str(result)})
+            elif not result.page_content:
+                failed.append({"source": upload.filename, "error": "No text found"})
+            else:
+                documents.append(result)
+        
+        return await ingest_documents(request.app.state.rag_service, documents, failed, collection)
+    
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise ollama_unavailable(e.retry_after)
+    except Exception as e:
+        logger.error(f"Upload ingest error: {e}")
+        raise HTTPException(500, f"Ingestion failed: {str(e)}")
+
 @app.post("/chat", response_model=dict)
 @limiter.limit("30/minute")
 async def chat_endpoint(request: Request, req: ChatRequest):
@@ -528,43 +1459,91 @@ async def chat_endpoint(request: Request, req: ChatRequest):
         await ensure_ollama_ready()
         
         rag_service: RAGService = request.app.state.rag_service
-        result = await rag_service.query(req.question)
+        if req.session_id is not None:
+            session = sessions.get_or_create(req.session_id, req.collection)
+            async with session.lock:
+                return await rag_service.query(req.question, collection=req.collection, session=session)
+        
+        # Identical questions about the same index version share one answer
+        key = (req.collection, await rag_service.index_version(req.collection), normalize_text(req.question))
+        result = await chat_flights.do(key, lambda: rag_service.query(req.question, collection=req.collection))
         
         return result
         
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise ollama_unavailable(e.retry_after)
     except Exception as e:
         logger.error(f"Chat error: {e}")
         raise HTTPException(500, f"Query failed: {str(e)}")
 
+@app.delete("/chat/sessions/{session_id}", response_model=dict)
+async def end_session(session_id: str):
+    """Forget a chat session."""
+    if not sessions.delete(session_id):
+        raise HTTPException(404, "Unknown or expired session")
+    return {"status": "success", "session_id": session_id}
+
+@app.post("/retrieve/batch", response_model=dict)
+@limiter.limit("10/minute")
+async def retrieve_batch(request: Request, req: BatchRetrieveRequest):
+    """
+    Top-k chunks for many queries at once, for offline evaluation: retrieval
+    only (no reranking or generation), with the queries embedded
+    concurrently and searched in one batched vector query. Results are in
+    query order: {id, query, results: [{rank, source, score}]}, id being the
+    query's position.
+    """
+    try:
+        await ensure_ollama_ready()
+        
+        rag_service: RAGService = request.app.state.rag_service
+        loop = asyncio.get_running_loop()
+        index = await loop.run_in_executor(executor, bind(rag_service.collection, req.collection))
+        results = await loop.run_in_executor(batch_executor, bind(
+            timed, "batch_retrieval", index.retrieval_records, list(enumerate(req.queries)), req.k, req.include_text
+        ))
+        return {"collection": req.collection, "k": req.k, "results": results}
+        
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise ollama_unavailable(e.retry_after)
+    except Exception as e:
+        logger.error(f"Batch retrieval error: {e}")
+        raise HTTPException(500, f"Retrieval failed: {str(e)}")
+
 @app.post("/briefing", response_model=dict)
 @limiter.limit("5/hour")
-async def generate_briefing(request: Request):
+async def generate_briefing(request: Request, collection: str = collection_query()):
     """Generate a briefing document from ingested content."""
     try:
         await ensure_ollama_ready()
         
         rag_service: RAGService = request.app.state.rag_service
-        content = await rag_service.generate_briefing()
+        content = await briefing_flights.do(
+            (collection, await rag_service.index_version(collection)), lambda: rag_service.generate_briefing(collection)
+        )
         
         return {"content": content}
         
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise ollama_unavailable(e.retry_after)
     except Exception as e:
         logger.error(f"Briefing error: {e}")
         raise HTTPException(500, f"Briefing generation failed: {str(e)}")
 
-@app.get("/podcast")
-@limiter.limit("3/hour")
-async def generate_podcast(request: Request):
-    """Generate a podcast from ingested content."""
-    try:
-        await ensure_ollama_ready()
-        
-        rag_service: RAGService = request.app.state.rag_service
-        script = await rag_service.generate_podcast_script()
-        
-        # Generate audio
-        audio_buffer = BytesIO()
-        
+async def record_podcast(rag_service: RAGService, collection: str) -> bytes:
+    """Generate a podcast script and speak it with Edge TTS (MP3)."""
+    script = await rag_service.generate_podcast_script(collection)
+    
+    # Generate audio
+    audio_buffer = BytesIO()
+    
+    with stage_timer("tts"):
         for line in script.split('\n'):
             line = line.strip()
             if line.startswith("Host A:"):
@@ -574,7 +1553,7 @@ async def generate_podcast(request: Request):
                     async for chunk in comm.stream():
                         if chunk["type"] == "audio":
                             audio_buffer.write(chunk["data"])
-                        
+                    
             elif line.startswith("Host B:"):
                 text = line.replace("Host B:", "").strip()
                 if text:
@@ -582,37 +1561,121 @@ async def generate_podcast(request: Request):
                     async for chunk in comm.stream():
                         if chunk["type"] == "audio":
                             audio_buffer.write(chunk["data"])
+    
+    return audio_buffer.getvalue()
+
+@app.get("/podcast")
+@limiter.limit("3/hour")
+async def generate_podcast(request: Request, collection: str = collection_query()):
+    """Generate a podcast from ingested content."""
+    try:
+        await ensure_ollama_ready()
         
-        audio_buffer.seek(0)
+        rag_service: RAGService = request.app.state.rag_service
+        # Concurrent podcasts of the same index version share one script and TTS run
+        audio = await podcast_flights.do(
+            (collection, await rag_service.index_version(collection)), lambda: record_podcast(rag_service, collection)
+        )
         
         return StreamingResponse(
-            audio_buffer,
+            BytesIO(audio),
             media_type="audio/mpeg",
             headers={"Content-Disposition": "attachment; filename=podcast.mp3"}
         )
         
+    except HTTPException:
+        raise
+    except CircuitOpenError as e:
+        raise ollama_unavailable(e.retry_after)
     except Exception as e:
         logger.error(f"Podcast error: {e}")
         raise HTTPException(500, f"Podcast generation failed: {str(e)}")
 
 @app.get("/sources", response_model=dict)
-async def list_sources(request: Request):
+async def list_sources(request: Request, collection: str = collection_query()):
     """List all ingested sources."""
     try:
         rag_service: RAGService = request.app.state.rag_service
-        sources = rag_service.get_sources()
+        loop = asyncio.get_running_loop()
+        sources = await loop.run_in_executor(executor, rag_service.get_sources, collection)
         return {"sources": sources, "count": len(sources)}
     except Exception as e:
         logger.error(f"List sources error: {e}")
         return {"sources": [], "count": 0}
 
+@app.get("/collections", response_model=dict)
+async def list_collections(request: Request):
+    """List collections (knowledge bases) and which are loaded in memory."""
+    rag_service: RAGService = request.app.state.rag_service
+    loop = asyncio.get_running_loop()
+    return {
+        "collections": await loop.run_in_executor(executor, rag_service.list_collections),
+        "loaded": len(rag_service.collections),
+        "max_loaded": Config.MAX_LOADED_COLLECTIONS
+    }
+
+@app.get("/export/chunks")
+@limiter.limit("10/minute")
+async def export_chunks(
+    request: Request,
+    collection: str = collection_query(),
+    source: Optional[str] = Query(None, description="Only this source's chunks")
+):
+    """Stream a collection's chunks as NDJSON: {id, source, text} per line."""
+    rag_service: RAGService = request.app.state.rag_service
+    loop = asyncio.get_running_loop()
+    index = await loop.run_in_executor(executor, rag_service.collection, collection)
+    if source is not None:
+        found = await loop.run_in_executor(executor, bind(index.vectorstore.get, where={"source": source}, limit=1))
+        if not found["ids"]:
+            raise HTTPException(404, "Source not found")
+    
+    return StreamingResponse(
+        stream_ndjson(index.chunk_batches(source, Config.EXPORT_BATCH_SIZE), batch_executor),
+        media_type=NDJSON_MEDIA_TYPE
+    )
+
+@app.post("/export/retrieval")
+@limiter.limit("10/minute")
+async def export_retrieval(
+    request: Request,
+    collection: str = collection_query(),
+    k: int = Query(Config.RETRIEVAL_K, ge=1, le=100, description="Results per query"),
+    include_text: bool = Query(False, description="Include each result's chunk text")
+):
+    """
+    Top-k chunks for every query in the request body (one per line: text, or
+    JSON with "query" and optional "id"), streamed as NDJSON:
+    {id, query, results: [{rank, source, score}]} per query.
+    """
+    try:
+        await ensure_ollama_ready()
+        queries = await read_queries(
+            request.stream(), Config.EXPORT_MAX_QUERIES, MAX_QUERY_CHARS, Config.EXPORT_MAX_BODY_BYTES
+        )
+    except BodyTooLarge as e:
+        raise HTTPException(413, str(e))
+    except QueryTooLong as e:
+        raise HTTPException(422, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    
+    rag_service: RAGService = request.app.state.rag_service
+    loop = asyncio.get_running_loop()
+    index = await loop.run_in_executor(executor, rag_service.collection, collection)
+    batches = index.retrieval_batches(queries, k, include_text, max(1, Config.EXPORT_BATCH_SIZE // k))
+    return StreamingResponse(stream_ndjson(batches, batch_executor), media_type=NDJSON_MEDIA_TYPE)
+
 @app.post("/delete_source", response_model=dict)
 @limiter.limit("20/hour")
 async def delete_source(request: Request, req: DeleteSourceRequest):
     """Delete a specific source from the knowledge base."""
     try:
         rag_service: RAGService = request.app.state.rag_service
-        deleted_count = rag_service.delete_source(str(req.source_url))
+        loop = asyncio.get_running_loop()
+        deleted_count = await loop.run_in_executor(
+            batch_executor, rag_service.delete_source, str(req.source_url), req.collection
+        )
         
         if deleted_count == 0:
             raise HTTPException(404, "Source not found")
@@ -631,27 +1694,71 @@ async def delete_source(request: Request, req: DeleteSourceRequest):
 
 @app.post("/clear", response_model=dict)
 @limiter.limit("5/hour")
-async def clear_database(request: Request):
-    """Clear the entire knowledge base."""
+async def clear_database(request: Request, collection: str = collection_query()):
+    """Clear a collection of the knowledge base."""
     try:
         rag_service: RAGService = request.app.state.rag_service
-        rag_service.clear_all()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(batch_executor, rag_service.clear, collection)
         
-        # Reinitialize
-        request.app.state.rag_service = RAGService()
-        request.app.state.rag_service.initialize()
-        
-        return {"status": "success", "message": "Database cleared"}
+        return {"status": "success", "message": f"Collection '{collection}' cleared"}
         
     except Exception as e:
         logger.error(f"Clear error: {e}")
         raise HTTPException(500, f"Clear failed: {str(e)}")
 
+@app.get("/admin/snapshot", dependencies=[Depends(require_admin)])
+async def export_snapshot(request: Request, collection: str = collection_query()):
+    """Download a collection with its embeddings as a binary snapshot file."""
+    rag_service: RAGService = request.app.state.rag_service
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".ragsnap") as f:
+        path = f.name
+    
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(batch_executor, bind(timed, "snapshot_write", rag_service.export_snapshot, collection, path))
+    except Exception:
+        os.remove(path)
+        raise
+    return FileResponse(
+        path,
+        media_type="application/octet-stream",
+        filename=f"{collection}.ragsnap",
+        background=BackgroundTask(os.remove, path)
+    )
+
+@app.post("/admin/snapshot", dependencies=[Depends(require_admin)])
+async def import_snapshot(
+    request: Request,
+    file: UploadFile = File(...),
+    collection: Optional[str] = Query(None, pattern=COLLECTION_NAME_PATTERN, description="Defaults to the snapshot's")
+):
+    """Replace a collection with an uploaded snapshot file."""
+    rag_service: RAGService = request.app.state.rag_service
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".ragsnap") as f:
+        path = f.name
+    try:
+        loop = asyncio.get_running_loop()
+        with open(path, "wb") as out:
+            while chunk := await file.read(1024 * 1024):
+                await loop.run_in_executor(batch_executor, out.write, chunk)
+        # Read into memory rather than mapped: a mapped file can't be removed on Windows
+        return await loop.run_in_executor(
+            batch_executor,
+            bind(timed, "snapshot_load", rag_service.import_snapshot, path, collection, mapped=False)
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    finally:
+        os.remove(path)
+
 # --- MAIN ---
 if __name__ == "__main__":
     logger.info(f"Starting server; Ollama host: {Config.OLLAMA_HOST}")
     uvicorn.run(
-        app,
+        # Multiple workers need an import string so each process loads the app
+        "server:app" if Config.WORKERS > 1 else app,
         host=os.getenv("HOST", "127.0.0.1"),
-        port=int(os.getenv("PORT", "8000"))
+        port=int(os.getenv("PORT", "8000")),
+        workers=Config.WORKERS
     )
\ No newline at end of file
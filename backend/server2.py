@@ -12,20 +12,54 @@ import asyncio
 import os
 import logging
 import re
+import sys
 import tempfile
-from concurrent.futures import ThreadPoolExecutor
-from typing import List, Dict, Set, Tuple
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Iterable, Iterator, List, Dict, Mapping, Optional, Sequence, Set, Tuple
 from datetime import datetime
-from urllib.parse import urljoin, urlparse
+from ipaddress import ip_address
+from urllib.parse import urlparse
 
 import uvicorn
 import requests
-from fastapi import FastAPI, HTTPException, Request
+import numpy as np
+from fastapi import Depends, FastAPI, File, Form, HTTPException, Query, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field, validator
 from bs4 import BeautifulSoup
 
+from bulk_ingest import collect_sitemap, extract_upload, upload_source
+from analyzer import AnalyzerPool, analyze_corpus, create_analyzer
+from bm25_index import BM25Index
+from chunking import chunk_blocks, count_tokens, iter_blocks
+from context_packing import pack_context
+from frontier import CrawlFrontier, sitemap_entries
+from fetch_limits import CrawlBudget, PageDecoder, is_html
+from dedup import DedupReport, NearDuplicateFilter
+from admin import require_admin, router as admin_router
+from tracing import bind, request_id_middleware, traced
+from metrics import (
+    CORPUS_CHUNKS, CORPUS_SOURCES, CRAWL_BYTES, EXECUTOR_REJECTIONS, PAGES_FETCHED, PROMETHEUS_AVAILABLE,
+    RATE_LIMIT_REJECTIONS, observe_executor_wait, render_metrics, stage_timer, timed, track_executor_queue
+)
+from loop_monitor import LoopLagMonitor
+from ndjson import NDJSON_MEDIA_TYPE, BodyTooLarge, QueryTooLong, read_queries, stream_ndjson
+from ollama_client import OllamaClient
+from rerank import RerankStage, create_scorer
+from ratelimit import RateLimiter, create_backend
+from scheduling import PriorityExecutor, default_workers
+from singleflight import SingleFlight, normalize_text
+from sessions import ChatSession, SessionStore, Turn
+from shared_store import SharedIndexStore
+from snapshot_file import SnapshotFile, string_sections, write_snapshot
+from collection_cache import (
+    COLLECTION_NAME_PATTERN, DEFAULT_COLLECTION, CollectionCache
+)
+
 # --- LOGGING SETUP ---
 logging.basicConfig(
     level=logging.INFO,
@@ -34,12 +68,6 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # --- IMPORTS WITH GRACEFUL FAILURE ---
-try:
-    from rank_bm25 import BM25Okapi
-except ImportError:
-    logger.error("BM25Okapi not installed. Run: pip install rank-bm25")
-    raise SystemExit(1)
-
 try:
     from sumy.parsers.plaintext import PlaintextParser
     from sumy.nlp.tokenizers import Tokenizer
@@ -70,31 +98,157 @@ class Config:
     # Security
     ALLOWED_SCHEMES = {"http", "https"}
     BLOCKED_HOSTS = {"localhost", "127.0.0.1", "0.0.0.0", "::1"}
+    # Only for benchmarks against a local fixture site; never enable in production
+    ALLOW_PRIVATE_NETWORKS = os.getenv("ALLOW_PRIVATE_NETWORKS", "false").lower() == "true"
     MAX_URL_LENGTH = 2048
     
     # Crawling
     MAX_PAGES_PER_CRAWL = 10
     CRAWL_TIMEOUT = 10
-    MIN_CHUNK_LENGTH = 50
-    MAX_CHUNK_LENGTH = 2000
+    SITEMAP_ENABLED = os.getenv("SITEMAP_ENABLED", "true").lower() == "true"
+    SITEMAP_MAX_URLS = int(os.getenv("SITEMAP_MAX_URLS", "1000"))
+    CRAWL_CHUNK_BYTES = 64 * 1024
+    # Bodies are streamed: longer pages are truncated, and a crawl stops
+    # fetching once it has downloaded CRAWL_MAX_TOTAL_BYTES
+    CRAWL_MAX_PAGE_BYTES = int(os.getenv("CRAWL_MAX_PAGE_BYTES", str(2 * 1024 * 1024)))
+    CRAWL_MAX_TOTAL_BYTES = int(os.getenv("CRAWL_MAX_TOTAL_BYTES", str(20 * 1024 * 1024)))
+    
+    # Chunking (token counts are approximate: words + punctuation)
+    CHUNK_TARGET_TOKENS = 120  # Top-K chunks must fit in MAX_MODEL_LENGTH
+    CHUNK_OVERLAP_TOKENS = 20
+    CHUNK_MIN_TOKENS = 10
     
     # Memory limits
     MAX_TOTAL_CHUNKS = 10000
     MAX_CHUNKS_PER_SOURCE = 1000
     
-    # Model
+    # Bulk ingest: sources per request (crawled or parsed BATCH_WORKERS at a time)
+    BULK_MAX_URLS = int(os.getenv("BULK_MAX_URLS", "200"))
+    BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", "20"))
+    BULK_MAX_UPLOAD_BYTES = int(os.getenv("BULK_MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+    
+    # Near-duplicate chunk detection
+    DEDUP_ENABLED = True
+    DEDUP_THRESHOLD = 0.9  # Minimum SimHash similarity to count as duplicate
+    
+    # Model: "transformers" runs MODEL_NAME in-process, "ollama" calls an
+    # Ollama-compatible server (used by the offline benchmark suite)
+    GENERATION_BACKEND = os.getenv("GENERATION_BACKEND", "transformers")
     MODEL_NAME = "MBZUAI/LaMini-Flan-T5-248M"
     MAX_MODEL_LENGTH = 512
+    OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+    OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+    # How long Ollama keeps the model (and its KV cache) loaded after a call
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
     
     # Retrieval
     TOP_K_RETRIEVAL = 5
+    # BM25 text analysis, shared by index and queries: "stemmed" (stopwords
+    # and Snowball stems), "standard" (stopwords only), "simple" (lowercased
+    # words) or "module:attribute" for a custom analyzer. With
+    # ANALYZER_PROCESSES > 0, corpora of ANALYZER_PARALLEL_MIN_CHUNKS or more
+    # are analyzed in that many worker processes.
+    ANALYZER = os.getenv("ANALYZER", "stemmed")
+    ANALYZER_PROCESSES = int(os.getenv("ANALYZER_PROCESSES", "0"))
+    ANALYZER_PARALLEL_MIN_CHUNKS = int(os.getenv("ANALYZER_PARALLEL_MIN_CHUNKS", "2000"))
+    
+    # Reranking: retrieval fetches RERANK_CANDIDATES chunks and RERANKER
+    # ("ollama", "cross-encoder" or "none") rescores them best-first,
+    # RERANK_BATCH_SIZE per call, for at most RERANK_BUDGET_MS; the top TOP_K_RETRIEVAL
+    # are kept. Scores are cached per (question, chunk), up to
+    # RERANK_CACHE_SIZE of them. RERANK_MODEL defaults to OLLAMA_MODEL for
+    # "ollama" and to ms-marco-MiniLM-L-6-v2 for "cross-encoder".
+    RERANKER = os.getenv("RERANKER", "none")
+    RERANK_MODEL = os.getenv("RERANK_MODEL", "")
+    RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+    RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "300"))
+    RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "8"))
+    RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "10000"))
+    
+    # Context packing: only the question's most relevant sentences of the
+    # retrieved chunks go into the prompt, up to CONTEXT_TOKEN_BUDGET tokens
+    # of the model's tokenizer (0 = whatever MAX_MODEL_LENGTH leaves after
+    # the rest of the prompt)
+    CONTEXT_COMPRESSION = os.getenv("CONTEXT_COMPRESSION", "true").lower() == "true"
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "0"))
+    
+    # Chat sessions: send "session_id": "new" to /chat to start one and the
+    # returned id to continue it. A session keeps its last SESSION_MAX_TURNS
+    # turns (SESSION_HISTORY_TOKENS of them go into the prompt) and reuses its
+    # retrieval while follow-ups stay on topic (SESSION_TOPIC_OVERLAP of their
+    # terms already asked about). With Ollama, on-topic follow-ups continue
+    # from the model's context (up to SESSION_MAX_CONTEXT tokens) instead of
+    # resending passages and history. At most MAX_SESSIONS sessions are kept,
+    # each for SESSION_TTL idle seconds.
+    MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "1000"))
+    SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))
+    SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "6"))
+    SESSION_HISTORY_TOKENS = int(os.getenv("SESSION_HISTORY_TOKENS", "128"))
+    SESSION_TOPIC_OVERLAP = float(os.getenv("SESSION_TOPIC_OVERLAP", "0.5"))
+    SESSION_MAX_CONTEXT = int(os.getenv("SESSION_MAX_CONTEXT", "4096"))
     
     # Summary
     SUMMARY_SENTENCES = 5
     LANGUAGE = "english"
     
-    # Threading
-    MAX_WORKERS = 3
+    # Threading: MAX_WORKERS threads shared by two lanes. Interactive work
+    # (chat) always goes first; batch work (crawls, parsing, briefings,
+    # podcasts, index rebuilds) uses at most BATCH_WORKERS threads, so chat
+    # never waits behind it. New requests get 503 + Retry-After while their
+    # lane has *_MAX_QUEUE items waiting (0 = unbounded). MAX_WORKERS=0 sizes
+    # the pool for this machine: one thread per CPU for the in-process model,
+    # more for the Ollama backend, whose threads mostly wait on HTTP.
+    MAX_WORKERS = int(os.getenv("MAX_WORKERS", "0")) or default_workers(io_bound=GENERATION_BACKEND == "ollama")
+    BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(max(1, MAX_WORKERS - 1))))
+    INTERACTIVE_MAX_QUEUE = int(os.getenv("INTERACTIVE_MAX_QUEUE", "32"))
+    BATCH_MAX_QUEUE = int(os.getenv("BATCH_MAX_QUEUE", "8"))
+    
+    # Event-loop monitoring: the loop is checked every LOOP_LAG_INTERVAL
+    # seconds (0 = off); stalls longer than LOOP_LAG_THRESHOLD seconds are
+    # logged with the blocking stack and counted
+    LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))
+    LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD", "0.25"))
+    
+    # Rate limiting: memory (per process), sqlite (shared by all workers on
+    # this host), redis (shared across hosts) or fakeredis (testing)
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "./rate_limits.sqlite3")
+    RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    
+    # The corpus lives in a SQLite store: it survives restarts, is shared by
+    # WORKERS > 1 processes (each reloads when the store's version changes) and
+    # lets idle collections be unloaded. "" keeps everything in memory only
+    # (single worker, no unloading).
+    WORKERS = int(os.getenv("WORKERS", "1"))
+    SHARED_INDEX_PATH = os.getenv("SHARED_INDEX_PATH", "./nano_rag_index.sqlite3")
+    # Reads check the store's version at most this often, so other workers'
+    # writes show up within it; writes always check. 0 checks on every read.
+    STORE_VERSION_TTL_MS = float(os.getenv("STORE_VERSION_TTL_MS", "100"))
+    
+    # Collections: named, isolated corpora with their own index. At most
+    # MAX_LOADED_COLLECTIONS stay in memory; idle ones are unloaded after
+    # COLLECTION_IDLE_TTL seconds and reload from the store on next use.
+    MAX_LOADED_COLLECTIONS = int(os.getenv("MAX_LOADED_COLLECTIONS", "8"))
+    COLLECTION_IDLE_TTL = float(os.getenv("COLLECTION_IDLE_TTL", "1800"))
+    
+    # Snapshots: GET/POST /admin/snapshot export/import a collection (chunks,
+    # BM25 postings, dedup fingerprints) as one binary file. Files listed in SNAPSHOT_IMPORT
+    # (comma-separated) are imported at startup into collections still empty.
+    SNAPSHOT_IMPORT = os.getenv("SNAPSHOT_IMPORT", "")
+    
+    # Exports: GET /export/chunks streams a collection's chunks and POST
+    # /export/retrieval the top-k chunks of every query in the request body,
+    # both as NDJSON of about EXPORT_BATCH_SIZE records per batch. At most
+    # EXPORT_MAX_QUERIES queries of up to MAX_QUERY_CHARS characters, in a
+    # body of at most EXPORT_MAX_BODY_BYTES, per request.
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    EXPORT_MAX_QUERIES = int(os.getenv("EXPORT_MAX_QUERIES", "10000"))
+    EXPORT_MAX_BODY_BYTES = int(os.getenv("EXPORT_MAX_BODY_BYTES", str(8 * 1024 * 1024)))
+    
+    # Batch retrieval: POST /retrieve/batch answers up to BATCH_MAX_QUERIES
+    # queries per request with their top-k chunks (no generation).
+    BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "1000"))
 
 config = Config()
 
@@ -107,24 +261,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "DELETE"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
+app.middleware("http")(request_id_middleware)
+app.include_router(admin_router)
 
 # --- GLOBAL STATE ---
-class Database:
-    """Thread-safe in-memory database"""
-    def __init__(self):
-        self.sources: Dict[str, List[str]] = {}  # {url: [chunks]}
-        self.chunk_metadata: List[Dict] = []  # [{text, source_url, timestamp}]
-        self.bm25: BM25Okapi = None
-        self.lock = asyncio.Lock()
-        self.stemmer = Stemmer(config.LANGUAGE)
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """
+    Immutable view of the corpus and its BM25 index.
+    Readers grab db.snapshot once and use only that reference, so they never
+    lock and never see metadata from one version with an index from another.
+    """
+    chunk_metadata: Tuple[Dict, ...] = ()  # ({text, source_url, timestamp}, ...)
+    sources: Mapping[str, Tuple[str, ...]] = field(default_factory=lambda: MappingProxyType({}))  # {url: (chunks)}
+    bm25: Optional[BM25Index] = None
+    version: int = 0
     
     def get_stats(self) -> Dict:
         """Get database statistics"""
         return {
             "total_sources": len(self.sources),
-            "total_chunks": len(self.chunk_metadata),
-            "sources": list(self.sources.keys())
+            "total_chunks": len(self.chunk_metadata)
         }
     
     def get_full_text_sample(self, max_chars: int = 5000) -> str:
@@ -140,15 +299,71 @@ class Database:
         
         return " ".join(text_parts)
 
-db = Database()
-executor = ThreadPoolExecutor(max_workers=config.MAX_WORKERS)
+class Database:
+    """
+    One collection's copy-on-write database: writers (serialized by
+    write_lock) build a new IndexSnapshot off the event loop and swap it in
+    with one assignment. Optionally backed by the shared index store.
+    """
+    def __init__(self, name: str = DEFAULT_COLLECTION, store: Optional[SharedIndexStore] = None):
+        self.name = name
+        self.snapshot = IndexSnapshot()
+        self.write_lock = asyncio.Lock()
+        self.stemmer = Stemmer(config.LANGUAGE)
+        self.dedup = NearDuplicateFilter(threshold=config.DEDUP_THRESHOLD)
+        self.store = store
+        self.version_checked = 0.0  # time.monotonic() of the last read-path store version check
+    
+    def reset_dedup(self, chunk_metadata: Sequence[Dict]):
+        """Rebuild the dedup filter from the chunks that remain"""
+        self.dedup.reset()
+        self.dedup.add(meta['text'] for meta in chunk_metadata)
+    
+    async def publish(self, chunk_metadata: Sequence[Dict], version: int, bm25: Optional[BM25Index] = None):
+        """Build a snapshot in the batch lane and make it current (hold write_lock)"""
+        loop = asyncio.get_running_loop()
+        snapshot = await loop.run_in_executor(batch_executor, bind(build_snapshot, chunk_metadata, version, bm25))
+        self.snapshot = snapshot
+        update_corpus_gauges()
+
+store: Optional[SharedIndexStore] = None  # Opened on startup when SHARED_INDEX_PATH is set
+collections: CollectionCache[Database] = CollectionCache(
+    # Memory-only collections can't be reloaded, so never unload them
+    capacity=config.MAX_LOADED_COLLECTIONS if config.SHARED_INDEX_PATH else 0,
+    idle_ttl=config.COLLECTION_IDLE_TTL,
+    can_evict=lambda db: not db.write_lock.locked()
+)
+
+def update_corpus_gauges():
+    """Corpus gauges cover every loaded collection"""
+    loaded = [db.snapshot for _, db in collections.items()]
+    CORPUS_CHUNKS.set(sum(len(snapshot.chunk_metadata) for snapshot in loaded))
+    CORPUS_SOURCES.set(sum(len(snapshot.sources) for snapshot in loaded))
+
+scheduler = PriorityExecutor(config.MAX_WORKERS, on_wait=observe_executor_wait)
+executor = scheduler.add_lane("interactive", priority=0, max_queue=config.INTERACTIVE_MAX_QUEUE)
+batch_executor = scheduler.add_lane(
+    "batch", priority=1, max_workers=config.BATCH_WORKERS, max_queue=config.BATCH_MAX_QUEUE
+)
+track_executor_queue("interactive", executor)
+track_executor_queue("batch", batch_executor)
+
+loop_monitor = LoopLagMonitor(config.LOOP_LAG_INTERVAL, config.LOOP_LAG_THRESHOLD)
+
+# Concurrent identical requests share one computation
+chat_flights = SingleFlight("chat")
+briefing_flights = SingleFlight("briefing")
+podcast_flights = SingleFlight("podcast")
+
+sessions = SessionStore(config.MAX_SESSIONS, config.SESSION_TTL, config.SESSION_MAX_TURNS)
+
+analyzer = create_analyzer(config.ANALYZER, config.LANGUAGE)
+analyzer_pool: Optional[AnalyzerPool] = None  # Started on startup when ANALYZER_PROCESSES > 0
 
 # --- UTILITY FUNCTIONS ---
 def tokenize(text: str) -> List[str]:
-    """Improved tokenization with punctuation handling"""
-    # Convert to lowercase and extract words
-    tokens = re.findall(r'\b\w+\b', text.lower())
-    return tokens
+    """BM25 terms of a chunk or query (the configured analyzer)"""
+    return analyzer(text)
 
 def validate_url(url: str) -> bool:
     """Validate URL for security"""
@@ -160,6 +375,9 @@ def validate_url(url: str) -> bool:
     if parsed.scheme not in config.ALLOWED_SCHEMES:
         raise ValueError(f"Only {', '.join(config.ALLOWED_SCHEMES)} schemes allowed")
     
+    if config.ALLOW_PRIVATE_NETWORKS:
+        return True
+    
     if parsed.hostname in config.BLOCKED_HOSTS:
         raise ValueError("Cannot crawl local/private resources")
     
@@ -169,143 +387,571 @@ def validate_url(url: str) -> bool:
            parsed.hostname.startswith('10.') or \
            parsed.hostname.startswith('172.'):
             raise ValueError("Cannot crawl private IP ranges")
+        try:
+            ip = ip_address(parsed.hostname)
+        except ValueError:
+            ip = None  # A hostname, not an address
+        if ip is not None and not ip.is_global:
+            raise ValueError("Cannot crawl local/private resources")
     
     return True
 
-def clean_text(text: str) -> str:
-    """Clean and normalize text"""
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text)
-    # Remove control characters
-    text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text)
-    return text.strip()
+CRAWL_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+}
+UNWANTED_TAGS = ["script", "style", "nav", "footer", "iframe", "noscript", "aside"]
 
+def chunk_page(blocks: Iterable[str]) -> List[str]:
+    """Merge/split text blocks into sentence-aligned chunks"""
+    with stage_timer("chunk"):
+        return list(chunk_blocks(
+            blocks,
+            target_tokens=config.CHUNK_TARGET_TOKENS,
+            overlap_tokens=config.CHUNK_OVERLAP_TOKENS,
+            min_tokens=config.CHUNK_MIN_TOKENS
+        ))
+
+def document_chunks(kind: str, content: str) -> List[str]:
+    """Chunks of an uploaded document ('html' markup or plain 'text')"""
+    if kind == "html":
+        with stage_timer("parse"):
+            soup = BeautifulSoup(content, "html.parser")
+            for element in soup(UNWANTED_TAGS):
+                element.decompose()
+        return chunk_page(iter_blocks(soup))
+    return chunk_page(block for block in re.split(r'\n\s*\n', content) if block.strip())
+
+def fetch_raw(url: str) -> Optional[bytes]:
+    """A sitemap or robots.txt document, or None if it's blocked or unavailable"""
+    try:
+        validate_url(url)
+        resp = requests.get(url, headers=CRAWL_HEADERS, timeout=config.CRAWL_TIMEOUT)
+        resp.raise_for_status()
+        return resp.content
+    except (ValueError, requests.RequestException) as e:
+        logger.warning(f"Could not fetch {url}: {e}")
+        return None
+
+@traced("crawl_website")
 def crawl_website(base_url: str, max_pages: int = None) -> Tuple[List[str], List[str]]:
     """
     Robustly crawls a website for text content.
-    Returns: (chunks, visited_urls)
+    Returns: (chunks, visited_urls); ValueError if base_url is not allowed
     """
+    validate_url(base_url)
     if max_pages is None:
         max_pages = config.MAX_PAGES_PER_CRAWL
     
-    domain = urlparse(base_url).netloc
     visited = set()
-    queue = [base_url]
     chunks = []
+    budget = CrawlBudget(config.CRAWL_MAX_TOTAL_BYTES)
     
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-    }
+    # Best-first frontier, seeded from the sitemap when the budget allows more than the seed page
+    frontier = CrawlFrontier(base_url)
+    if config.SITEMAP_ENABLED and max_pages > 1:
+        listed = frontier.add_sitemap(sitemap_entries(base_url, fetch_raw, config.SITEMAP_MAX_URLS))
+        if listed:
+            logger.info(f"🗺️ Sitemap lists {listed} pages")
     
     logger.info(f"🕷️ Starting crawl: {base_url} (max {max_pages} pages)")
     
-    while queue and len(visited) < max_pages:
-        current_url = queue.pop(0)
-        
-        if current_url in visited:
-            continue
+    while frontier and len(visited) < max_pages and not budget.exhausted:
+        current_url = frontier.pop()
         
         try:
             logger.info(f"Visiting: {current_url}")
-            resp = requests.get(
-                current_url, 
-                headers=headers, 
-                timeout=config.CRAWL_TIMEOUT,
-                allow_redirects=True
-            )
-            resp.raise_for_status()
-            
-            content_type = resp.headers.get("Content-Type", "")
-            if "text/html" not in content_type:
-                logger.warning(f"Skipping non-HTML: {current_url}")
-                continue
+            with stage_timer("crawl_fetch"):
+                with requests.get(
+                    current_url, 
+                    headers=CRAWL_HEADERS, 
+                    timeout=config.CRAWL_TIMEOUT,
+                    allow_redirects=True,
+                    stream=True
+                ) as resp:
+                    resp.raise_for_status()
+                    
+                    # Check content type before reading the body; closing the response aborts the download
+                    content_type = resp.headers.get("Content-Type", "")
+                    if not is_html(content_type):
+                        logger.warning(f"Skipping non-HTML: {current_url}")
+                        PAGES_FETCHED.labels("skipped").inc()
+                        continue
+                    
+                    decoder = PageDecoder(content_type, config.CRAWL_MAX_PAGE_BYTES, budget)
+                    for chunk in resp.iter_content(chunk_size=config.CRAWL_CHUNK_BYTES):
+                        if not decoder.feed(chunk):
+                            break
+            CRAWL_BYTES.inc(decoder.received)
+            if decoder.truncated:
+                logger.warning(f"Truncated at {decoder.received} bytes: {current_url}")
+            PAGES_FETCHED.labels("ok").inc()
             
-            soup = BeautifulSoup(resp.content, "html.parser")
-            
-            # Remove unwanted elements
-            for element in soup(["script", "style", "nav", "footer", "iframe", "noscript", "aside"]):
-                element.decompose()
-            
-            # Extract text from meaningful elements
-            page_chunks = []
-            for tag in soup.find_all(['p', 'h1', 'h2', 'h3', 'article', 'section']):
-                text = clean_text(tag.get_text(separator=' ', strip=True))
+            with stage_timer("parse"):
+                soup = BeautifulSoup(decoder.text(), "html.parser")
                 
-                if config.MIN_CHUNK_LENGTH <= len(text) <= config.MAX_CHUNK_LENGTH:
-                    page_chunks.append(text)
+                # Remove unwanted elements
+                for element in soup(UNWANTED_TAGS):
+                    element.decompose()
+            
+            page_chunks = chunk_page(iter_blocks(soup))
             
             if page_chunks:
                 chunks.extend(page_chunks)
                 visited.add(current_url)
                 logger.info(f"✓ Found {len(page_chunks)} chunks on {current_url}")
                 
-                # Find and queue same-domain links
-                for link in soup.find_all("a", href=True):
-                    try:
-                        full_url = urljoin(current_url, link["href"])
-                        parsed = urlparse(full_url)
-                        
-                        # Only queue same-domain HTTP(S) links
-                        if parsed.netloc == domain and \
-                           parsed.scheme in config.ALLOWED_SCHEMES and \
-                           full_url not in visited and \
-                           full_url not in queue:
-                            queue.append(full_url)
-                    except Exception as e:
-                        logger.debug(f"Skipping invalid link: {e}")
+                # Queue same-domain links, scored by the frontier
+                frontier.push_links(current_url, (link["href"] for link in soup.find_all("a", href=True)))
             else:
                 logger.warning(f"No substantial content found on: {current_url}")
         
         except requests.RequestException as e:
             logger.error(f"Failed to fetch {current_url}: {e}")
+            PAGES_FETCHED.labels("error").inc()
         except Exception as e:
             logger.error(f"Error processing {current_url}: {e}")
     
+    if budget.exhausted:
+        logger.warning(f"Crawl stopped at its {config.CRAWL_MAX_TOTAL_BYTES} byte limit")
     logger.info(f"✓ Crawl complete: {len(chunks)} chunks from {len(visited)} pages")
     return chunks, list(visited)
 
-async def rebuild_index():
-    """Rebuilds BM25 index from current database state"""
-    if not db.chunk_metadata:
-        db.bm25 = None
+@traced("build_snapshot")
+def build_snapshot(chunk_metadata: Sequence[Dict], version: int,
+                   bm25: Optional[BM25Index] = None) -> IndexSnapshot:
+    """Builds an immutable snapshot from chunk metadata (indexing it unless bm25 is given)"""
+    sources: Dict[str, List[str]] = {}
+    for meta in chunk_metadata:
+        sources.setdefault(meta['source_url'], []).append(meta['text'])
+    
+    if bm25 is not None and len(bm25) == len(chunk_metadata):
+        logger.info(f"✓ Using prebuilt BM25 index v{version} with {len(chunk_metadata)} chunks")
+    elif chunk_metadata:
+        # Tokenize and build BM25 index
+        with stage_timer("index"):
+            tokenized_corpus = analyze_corpus(
+                analyzer, [meta['text'] for meta in chunk_metadata],
+                analyzer_pool, config.ANALYZER_PARALLEL_MIN_CHUNKS
+            )
+            bm25 = BM25Index.from_corpus(tokenized_corpus)
+        logger.info(f"✓ Built BM25 index v{version} with {len(chunk_metadata)} chunks")
+    else:
+        bm25 = None
         logger.info("Database empty, index cleared")
+    
+    return IndexSnapshot(
+        chunk_metadata=tuple(chunk_metadata),
+        sources=MappingProxyType({url: tuple(chunks) for url, chunks in sources.items()}),
+        bm25=bm25,
+        version=version
+    )
+
+def search(snapshot: IndexSnapshot, question: str, k: int) -> List[Tuple[int, float]]:
+    """Top-k (chunk index, BM25 score) pairs for a question"""
+    if snapshot.bm25 is None:
+        return []
+    return snapshot.bm25.search(tokenize(question), k)
+
+def search_many(snapshot: IndexSnapshot, questions: Sequence[str], k: int) -> List[List[Tuple[int, float]]]:
+    """search for each of many questions, scored together in one vectorized pass"""
+    if snapshot.bm25 is None:
+        return [[] for _ in questions]
+    return snapshot.bm25.search_many([tokenize(question) for question in questions], k)
+
+def retrieve(snapshot: IndexSnapshot, question: str, k: int) -> List[Dict]:
+    """Top-k chunk metadata for a question by BM25 score, reranked if a reranker is configured"""
+    candidates = k if reranker is None else max(k, config.RERANK_CANDIDATES)
+    with stage_timer("retrieval"):
+        hits = [snapshot.chunk_metadata[i] for i, _ in search(snapshot, question, candidates)]
+    if reranker is None:
+        return hits
+    with stage_timer("rerank"):
+        return reranker.rerank(question, hits, lambda meta: meta['text'], k)
+
+# --- EXPORTS ---
+def chunk_batches(snapshot: IndexSnapshot, source: Optional[str], size: int) -> Iterator[List[Dict]]:
+    """A snapshot's chunks (only source's, if given) as export records, size at a time"""
+    batch = []
+    for i, meta in enumerate(snapshot.chunk_metadata):
+        if source is None or meta['source_url'] == source:
+            batch.append({"id": i, "source": meta['source_url'], "timestamp": meta['timestamp'], "text": meta['text']})
+            if len(batch) == size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def retrieval_records(snapshot: IndexSnapshot, queries: Sequence[Tuple], k: int, include_text: bool) -> List[Dict]:
+    """Top-k results of each (id, query) as export records, all queries scored in one batch"""
+    hits = search_many(snapshot, [query for _, query in queries], k)
+    records = []
+    for (query_id, query), query_hits in zip(queries, hits):
+        results = []
+        for rank, (i, score) in enumerate(query_hits, 1):
+            result = {"rank": rank, "id": i, "source": snapshot.chunk_metadata[i]['source_url'], "score": score}
+            if include_text:
+                result["text"] = snapshot.chunk_metadata[i]['text']
+            results.append(result)
+        records.append({"id": query_id, "query": query, "results": results})
+    return records
+
+def retrieval_batches(snapshot: IndexSnapshot, queries: Sequence[Tuple], k: int, include_text: bool,
+                      size: int) -> Iterator[List[Dict]]:
+    """retrieval_records of size queries at a time"""
+    for start in range(0, len(queries), size):
+        yield retrieval_records(snapshot, queries[start:start + size], k, include_text)
+
+# --- SNAPSHOTS ---
+SNAPSHOT_KIND = "nano-rag-bm25"
+
+def write_index_snapshot(snapshot: IndexSnapshot, collection: str, path: str,
+                         dedup: Optional[NearDuplicateFilter] = None) -> int:
+    """Write a collection's chunks, BM25 postings and dedup fingerprints to a snapshot file; returns its size"""
+    chunks = snapshot.chunk_metadata
+    source_ids = {url: i for i, url in enumerate(snapshot.sources)}
+    arrays = {
+        **string_sections("text", [meta['text'] for meta in chunks]),
+        **string_sections("timestamp", [meta['timestamp'] for meta in chunks]),
+        **string_sections("source", list(source_ids)),
+        "source_ids": np.array([source_ids[meta['source_url']] for meta in chunks], dtype=np.int32),
+    }
+    if snapshot.bm25 is not None:
+        arrays.update(string_sections("terms", snapshot.bm25.terms))
+        arrays.update({f"bm25.{name}": array for name, array in snapshot.bm25.arrays().items()})
+    if dedup is not None:
+        digests, fingerprints = dedup.export_state()
+        arrays["dedup.digests"] = np.frombuffer(b"".join(digests), dtype=np.uint8).reshape(len(digests), 16)
+        arrays["dedup.fingerprints"] = np.array(fingerprints, dtype=np.uint64)
+    meta = {
+        "collection": collection,
+        "version": snapshot.version,
+        "chunks": len(chunks),
+        "analyzer": config.ANALYZER,
+        "bm25": snapshot.bm25.params() if snapshot.bm25 is not None else None,
+        "dedup": dedup.params() if dedup is not None else None,
+        "created": datetime.now().isoformat(),
+    }
+    return write_snapshot(path, SNAPSHOT_KIND, meta, arrays)
+
+def read_index_snapshot(
+    path: str, mapped: bool = True
+) -> Tuple[Dict, List[Dict], Optional[BM25Index], Optional[Tuple[List, List]]]:
+    """
+    (header metadata, chunk metadata, BM25 index or None, dedup state or None)
+    of a snapshot file; ValueError if unusable. The postings stay mapped from
+    the file unless mapped=False, which reads it into memory instead.
+    """
+    snap = SnapshotFile(path, mapped=mapped)
+    if snap.kind != SNAPSHOT_KIND:
+        raise ValueError(f"Not a {SNAPSHOT_KIND} snapshot (got '{snap.kind}')")
+    sources = snap.strings("source")
+    chunk_metadata = [
+        {'text': text, 'source_url': sources[source_id], 'timestamp': timestamp}
+        for text, source_id, timestamp in zip(
+            snap.strings("text"), snap.array("source_ids").tolist(), snap.strings("timestamp")
+        )
+    ]
+    
+    bm25 = None
+    if snap.meta.get("bm25") and snap.meta.get("analyzer") == config.ANALYZER:
+        # Postings stay memory-mapped; only the vocabulary dict is built
+        bm25 = BM25Index(
+            snap.strings("terms"), snap.array("bm25.offsets"), snap.array("bm25.doc_ids"),
+            snap.array("bm25.tfs"), snap.array("bm25.doc_len"), **snap.meta["bm25"]
+        )
+    elif snap.meta.get("bm25"):
+        logger.warning(
+            f"Snapshot was indexed with analyzer '{snap.meta.get('analyzer')}', not '{config.ANALYZER}'; reindexing"
+        )
+    
+    dedup_state = None
+    if snap.meta.get("dedup") == NearDuplicateFilter(threshold=config.DEDUP_THRESHOLD).params():
+        digests = snap.array("dedup.digests")
+        dedup_state = ([row.tobytes() for row in digests], snap.array("dedup.fingerprints").tolist())
+    return snap.meta, chunk_metadata, bm25, dedup_state
+
+async def reload_if_stale(db: Database):
+    """Publish the store's state of a collection if it is newer (hold db.write_lock)"""
+    if db.store is None:
+        return
+    loop = asyncio.get_running_loop()
+    if await loop.run_in_executor(executor, db.store.version, db.name) == db.snapshot.version:
         return
     
-    # Extract texts and tokenize
-    corpus_texts = [meta['text'] for meta in db.chunk_metadata]
-    tokenized_corpus = [tokenize(text) for text in corpus_texts]
+    version, chunk_metadata = await loop.run_in_executor(executor, db.store.load, db.name)
+    logger.info(f"🔄 Collection '{db.name}' changed (v{db.snapshot.version} -> v{version}), reloading")
+    await loop.run_in_executor(batch_executor, db.reset_dedup, chunk_metadata)
+    await db.publish(chunk_metadata, version)
+
+async def sync_from_store(db: Database):
+    """
+    Version check before reads, off the loop and at most every
+    STORE_VERSION_TTL_MS; reloads only when the store moved on
+    """
+    if db.store is None:
+        return
+    now = time.monotonic()
+    if now - db.version_checked < config.STORE_VERSION_TTL_MS / 1000:
+        return
+    db.version_checked = now
+    loop = asyncio.get_running_loop()
+    if await loop.run_in_executor(executor, db.store.version, db.name) == db.snapshot.version:
+        return
     
-    # Build BM25 index
-    db.bm25 = BM25Okapi(tokenized_corpus)
-    logger.info(f"✓ Rebuilt BM25 index with {len(corpus_texts)} chunks")
+    async with db.write_lock:
+        await reload_if_stale(db)
 
-# --- LOAD AI MODEL ---
-logger.info(f"⏳ Loading AI model: {config.MODEL_NAME}")
-try:
-    chatbot = pipeline(
-        "text2text-generation",
-        model=config.MODEL_NAME,
-        max_length=config.MAX_MODEL_LENGTH,
-        device=-1  # CPU
+async def get_collection(name: str) -> Database:
+    """A collection's database, loaded from the store on first use and kept current"""
+    db = collections.get(name, lambda: Database(name, store))
+    await sync_from_store(db)
+    return db
+
+async def store_write(db: Database, method: str, *args) -> Optional[int]:
+    """
+    Persist a change to the shared store, if any (hold db.write_lock).
+    Returns the version to publish the change under, or None if the state
+    was reloaded from the store instead because other workers wrote in between.
+    """
+    current = db.snapshot.version
+    if db.store is None:
+        return current + 1
+    
+    loop = asyncio.get_running_loop()
+    version = await loop.run_in_executor(executor, bind(getattr(db.store, method), *args, collection=db.name))
+    if version == current + 1:
+        return version
+    
+    await reload_if_stale(db)
+    return None
+
+async def commit_sources(db: Database, sources: List[Tuple[str, List[str]]]) -> Tuple[int, Optional[DedupReport]]:
+    """
+    Dedup and store chunks of one or more sources as a single index update:
+    one store write, one BM25 rebuild. Returns (chunks added, dedup report).
+    """
+    loop = asyncio.get_running_loop()
+    pairs = [(url, chunk) for url, chunks in sources for chunk in chunks]
+    
+    async with db.write_lock:
+        await reload_if_stale(db)
+        
+        dedup_report = None
+        if config.DEDUP_ENABLED:
+            pairs, dedup_report = await loop.run_in_executor(
+                batch_executor,
+                bind(timed, "dedup", db.dedup.filter, pairs, text_of=lambda pair: pair[1], record=False)
+            )
+            logger.info(
+                f"🧹 Dedup dropped {dedup_report.chunks_dropped}/{dedup_report.chunks_in} chunks "
+                f"({dedup_report.bytes_saved} bytes)"
+            )
+        
+        if not pairs:
+            return 0, dedup_report
+        
+        timestamp = datetime.now().isoformat()
+        grouped: Dict[str, List[str]] = {}
+        for url, chunk in pairs:
+            grouped.setdefault(url, []).append(chunk)
+        
+        version = await store_write(db, "append_many", list(grouped.items()), timestamp)
+        if config.DEDUP_ENABLED:
+            # Remembered only once stored, so a failed write can simply be retried
+            await loop.run_in_executor(batch_executor, db.dedup.add, [chunk for _, chunk in pairs])
+        if version is not None:
+            # New snapshot = current chunk metadata + new chunks
+            chunk_metadata = list(db.snapshot.chunk_metadata)
+            chunk_metadata.extend(
+                {'text': chunk, 'source_url': url, 'timestamp': timestamp}
+                for url, chunk in pairs
+            )
+            
+            # Rebuild index and publish
+            await db.publish(chunk_metadata, version)
+    
+    return len(pairs), dedup_report
+
+async def import_snapshot(
+    path: str, collection: Optional[str] = None, only_if_empty: bool = False, mapped: bool = True
+) -> Dict:
+    """
+    Replace a collection's content with a snapshot file's (its own collection
+    unless one is given) in one store write, publishing the snapshot's BM25
+    postings without reindexing. With mapped=True the file must outlive the index.
+    """
+    loop = asyncio.get_running_loop()
+    meta, chunk_metadata, bm25, dedup_state = await loop.run_in_executor(
+        batch_executor, bind(timed, "snapshot_load", read_index_snapshot, path, mapped)
     )
-    logger.info("✅ AI model loaded successfully")
-except Exception as e:
-    logger.error(f"❌ Failed to load AI model: {e}")
-    logger.error("Server cannot start without the model. Please check your installation.")
-    raise SystemExit(1)
+    name = collection or meta.get("collection") or DEFAULT_COLLECTION
+    if not re.match(COLLECTION_NAME_PATTERN, name):
+        raise ValueError(f"Invalid collection name in snapshot: {name}")
+    
+    db = await get_collection(name)
+    async with db.write_lock:
+        await reload_if_stale(db)
+        if only_if_empty and db.snapshot.chunk_metadata:
+            logger.info(f"Collection '{name}' already has content, not importing {path}")
+            return {"collection": name, "imported": False, "total_chunks": len(db.snapshot.chunk_metadata)}
+        
+        rows = [(m['source_url'], m['text'], m['timestamp']) for m in chunk_metadata]
+        version = await store_write(db, "replace", rows)
+        if version is not None:
+            if dedup_state is not None:
+                await loop.run_in_executor(batch_executor, db.dedup.load_state, *dedup_state)
+            else:
+                await loop.run_in_executor(batch_executor, db.reset_dedup, chunk_metadata)
+            await db.publish(chunk_metadata, version, bm25)
+    
+    logger.info(f"📥 Imported snapshot into '{name}': {len(chunk_metadata)} chunks")
+    return {
+        "collection": name,
+        "imported": True,
+        "total_chunks": len(chunk_metadata),
+        "total_sources": len(db.snapshot.sources),
+        "snapshot_version": meta.get("version"),
+        "reindexed": bm25 is None
+    }
+
+# --- AI MODEL AND RERANKER ---
+# Loaded on startup (see load_backends), not at import, so processes that
+# only import this module don't load a model too
+chatbot = None
+ollama: Optional[OllamaClient] = None
+reranker: Optional[RerankStage] = None
+
+def load_model():
+    """Load the generation backend and the reranker (blocking; called on startup)"""
+    global chatbot, ollama, reranker
+    if config.GENERATION_BACKEND == "ollama":
+        logger.info(f"🔗 Using Ollama model {config.OLLAMA_MODEL} at {config.OLLAMA_HOST}")
+        ollama = OllamaClient(config.OLLAMA_HOST)
+    else:
+        logger.info(f"⏳ Loading AI model: {config.MODEL_NAME}")
+        try:
+            chatbot = pipeline(
+                "text2text-generation",
+                model=config.MODEL_NAME,
+                max_length=config.MAX_MODEL_LENGTH,
+                device=-1  # CPU
+            )
+            logger.info("✅ AI model loaded successfully")
+        except Exception as e:
+            logger.error(f"❌ Failed to load AI model: {e}")
+            logger.error("Server cannot start without the model. Please check your installation.")
+            raise SystemExit(1)
+    
+    if config.RERANKER == "ollama" and ollama is None:
+        # Answers come from the in-process model, relevance scores from Ollama
+        ollama = OllamaClient(config.OLLAMA_HOST)
+    rerank_scorer = create_scorer(
+        config.RERANKER, config.RERANK_MODEL or (config.OLLAMA_MODEL if config.RERANKER == "ollama" else ""),
+        ollama_client=ollama, keep_alive=config.OLLAMA_KEEP_ALIVE
+    )
+    reranker = RerankStage(
+        rerank_scorer, config.RERANK_BUDGET_MS, config.RERANK_BATCH_SIZE, config.RERANK_CACHE_SIZE
+    ) if rerank_scorer is not None else None
+
+def generate(prompt: str, **kwargs) -> str:
+    """Runs the configured generation backend (blocking; call from the executor)"""
+    if chatbot is not None:
+        return chatbot(prompt, max_length=config.MAX_MODEL_LENGTH, **kwargs)[0]['generated_text']
+    
+    return ollama.generate(
+        config.OLLAMA_MODEL, prompt, {"num_predict": config.MAX_MODEL_LENGTH}, keep_alive=config.OLLAMA_KEEP_ALIVE
+    )
+
+def generate_turn(prompt: str, context: Optional[List[int]] = None) -> Tuple[str, Optional[List[int]]]:
+    """
+    A chat answer, continuing from an earlier answer's Ollama context if given;
+    returns (answer, context to continue from, or None for in-process models)
+    """
+    if chatbot is not None:
+        return generate(prompt, do_sample=False), None
+    
+    return ollama.generate_with_context(
+        config.OLLAMA_MODEL, prompt, context, {"num_predict": config.MAX_MODEL_LENGTH},
+        keep_alive=config.OLLAMA_KEEP_ALIVE
+    )
+
+def prompt_tokens(text: str) -> int:
+    """Tokens of text as the model sees them (estimated for the Ollama backend)"""
+    if chatbot is not None:
+        return len(chatbot.tokenizer.encode(text, add_special_tokens=False))
+    return count_tokens(text)
+
+CHAT_PROMPT = (
+    "Answer the question based ONLY on the context below. "
+    "Be concise and specific. If the answer isn't in the context, say so. "
+    "Cite passages by their [number].\n\n"
+    "Context:\n{context}\n\n"
+    "{history}"
+    "Question: {question}\n\n"
+    "Answer:"
+)
+# Appended to a session's model context, which already holds the passages and earlier turns
+FOLLOW_UP_PROMPT = "\n\nQuestion: {question}\n\nAnswer:"
+
+def format_history(turns: Sequence[Turn]) -> str:
+    if not turns:
+        return ""
+    return "Conversation so far:\n" + "".join(f"Q: {t.question}\nA: {t.answer}\n" for t in turns) + "\n"
+
+def build_chat_prompt(question: str, hits: Sequence[Dict], history: str = "") -> Tuple[str, List[str], int]:
+    """Prompt packed with the hits' most relevant sentences; returns (prompt, citations, context tokens)"""
+    passages = [(meta['text'], meta['source_url']) for meta in hits]
+    if config.CONTEXT_COMPRESSION:
+        budget = config.CONTEXT_TOKEN_BUDGET or (
+            config.MAX_MODEL_LENGTH
+            - prompt_tokens(CHAT_PROMPT.format(context="", history=history, question=question)) - 2
+        )
+        count = prompt_tokens
+    else:
+        budget, count = sys.maxsize, count_tokens  # Whole chunks, still numbered per source
+    packed = pack_context(
+        question, passages, max(budget, 0), count=count,
+        relevant_only=config.CONTEXT_COMPRESSION, analyze=tokenize
+    )
+    prompt = CHAT_PROMPT.format(context=packed.text, history=history, question=question)
+    return prompt, packed.citations, packed.tokens
 
 # --- REQUEST MODELS ---
 class IngestRequest(BaseModel):
     url: str = Field(..., description="URL to crawl and ingest")
     max_pages: int = Field(default=5, ge=1, le=20, description="Maximum pages to crawl")
+    collection: str = Field(default=DEFAULT_COLLECTION, pattern=COLLECTION_NAME_PATTERN, description="Collection to use")
     
     @validator('url')
     def validate_url_field(cls, v):
         validate_url(v)
         return v
 
+class BulkIngestRequest(BaseModel):
+    urls: List[str] = Field(default_factory=list, max_length=config.BULK_MAX_URLS, description="Pages to ingest")
+    sitemap_url: Optional[str] = Field(default=None, description="sitemap.xml whose pages to ingest")
+    max_pages: int = Field(default=1, ge=1, le=20, description="Pages to crawl from each listed URL")
+    collection: str = Field(default=DEFAULT_COLLECTION, pattern=COLLECTION_NAME_PATTERN, description="Collection to use")
+    
+    @validator('urls', each_item=True)
+    def validate_urls(cls, v):
+        validate_url(v)
+        return v
+    
+    @validator('sitemap_url')
+    def validate_sitemap_url(cls, v):
+        if v is not None:
+            validate_url(v)
+        return v
+
+MAX_QUERY_CHARS = 500  # Questions and retrieval queries
+
 class ChatRequest(BaseModel):
-    question: str = Field(..., min_length=1, max_length=500)
+    question: str = Field(..., min_length=1, max_length=MAX_QUERY_CHARS)
+    collection: str = Field(default=DEFAULT_COLLECTION, pattern=COLLECTION_NAME_PATTERN, description="Collection to use")
+    session_id: Optional[str] = Field(
+        default=None, max_length=64, description='Session to continue ("new" starts one); omit for a one-off question'
+    )
     
     @validator('question')
     def validate_question(cls, v):
@@ -314,33 +960,62 @@ class ChatRequest(BaseModel):
             raise ValueError("Question cannot be empty")
         return v
 
+class BatchRetrieveRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=config.BATCH_MAX_QUERIES, description="Questions to retrieve for")
+    k: int = Field(default=config.TOP_K_RETRIEVAL, ge=1, le=100, description="Results per query")
+    include_text: bool = Field(default=False, description="Include each result's chunk text")
+    collection: str = Field(default=DEFAULT_COLLECTION, pattern=COLLECTION_NAME_PATTERN, description="Collection to use")
+    
+    @validator('queries', each_item=True)
+    def validate_queries(cls, v):
+        v = v.strip()
+        if not v or len(v) > MAX_QUERY_CHARS:
+            raise ValueError(f"Queries must be 1 to {MAX_QUERY_CHARS} characters")
+        return v
+
 class DeleteSourceRequest(BaseModel):
     source_url: str
+    collection: str = Field(default=DEFAULT_COLLECTION, pattern=COLLECTION_NAME_PATTERN, description="Collection to use")
+
+def collection_query() -> str:
+    return Query(DEFAULT_COLLECTION, pattern=COLLECTION_NAME_PATTERN, description="Collection to use")
 
-# --- RATE LIMITING (Simple in-memory) ---
-rate_limit_store: Dict[str, List[float]] = {}
+# --- RATE LIMITING (Sliding window counter) ---
+rate_limiter: Optional[RateLimiter] = None  # Created on startup (see load_backends)
 
 async def rate_limit_check(request: Request, max_requests: int = 10, window: int = 60):
-    """Simple rate limiting: max_requests per window (seconds)"""
-    client_ip = request.client.host
-    now = datetime.now().timestamp()
-    
-    if client_ip not in rate_limit_store:
-        rate_limit_store[client_ip] = []
+    """Rate limiting per client and endpoint: max_requests per window (seconds)"""
+    if not config.RATE_LIMIT_ENABLED:
+        return
     
-    # Remove old requests outside window
-    rate_limit_store[client_ip] = [
-        req_time for req_time in rate_limit_store[client_ip]
-        if now - req_time < window
-    ]
+    client_ip = request.client.host if request.client else "unknown"
+    key = f"{request.url.path}:{client_ip}"
+    if config.RATE_LIMIT_BACKEND == "memory":
+        allowed, retry_after = rate_limiter.hit(key, max_requests, window)
+    else:
+        # SQLite and Redis round trips stay off the event loop
+        loop = asyncio.get_running_loop()
+        allowed, retry_after = await loop.run_in_executor(executor, rate_limiter.hit, key, max_requests, window)
     
-    if len(rate_limit_store[client_ip]) >= max_requests:
+    if not allowed:
+        RATE_LIMIT_REJECTIONS.labels(request.url.path).inc()
         raise HTTPException(
             status_code=429,
-            detail=f"Rate limit exceeded. Max {max_requests} requests per {window}s"
+            detail=f"Rate limit exceeded. Max {max_requests} requests per {window}s",
+            headers={"Retry-After": str(retry_after)}
         )
+
+def admission_check(lane: str):
+    """Turn a new request away while its executor lane already has a full queue"""
+    allowed, retry_after = scheduler.admit(lane)
     
-    rate_limit_store[client_ip].append(now)
+    if not allowed:
+        EXECUTOR_REJECTIONS.labels(lane).inc()
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server busy ({lane} queue is full). Try again later",
+            headers={"Retry-After": str(retry_after)}
+        )
 
 # --- API ENDPOINTS ---
 
@@ -350,13 +1025,76 @@ async def root():
     return {
         "status": "running",
         "version": "2.0",
-        "endpoints": ["/ingest", "/chat", "/briefing", "/podcast", "/sources", "/stats", "/clear"]
+        "endpoints": ["/ingest", "/ingest/bulk", "/ingest/upload", "/chat", "/chat/sessions", "/retrieve/batch", "/briefing", "/podcast", "/sources", "/stats", "/collections", "/clear", "/export/chunks", "/export/retrieval", "/metrics", "/admin/traces", "/admin/profile", "/admin/snapshot"]
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    if not PROMETHEUS_AVAILABLE:
+        raise HTTPException(status_code=503, detail="prometheus-client is not installed")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/stats")
-async def get_stats():
+async def get_stats(collection: str = collection_query()):
     """Get database statistics"""
-    return db.get_stats()
+    db = await get_collection(collection)
+    return dict(db.snapshot.get_stats(), collection=collection)
+
+@app.get("/collections")
+async def list_collections():
+    """All collections with their sizes, and whether each is loaded in memory"""
+    stored = {}
+    if store is not None:
+        loop = asyncio.get_running_loop()
+        stored = await loop.run_in_executor(executor, store.collections)
+    loaded = {name: db for name, db in collections.items()}
+    names = sorted(set(stored) | {name for name, db in loaded.items() if db.snapshot.chunk_metadata})
+    return {
+        "collections": [
+            {
+                "name": name,
+                "total_chunks": len(loaded[name].snapshot.chunk_metadata) if name in loaded else stored[name][0],
+                "total_sources": len(loaded[name].snapshot.sources) if name in loaded else stored[name][1],
+                "loaded": name in loaded
+            }
+            for name in names
+        ],
+        "loaded": len(loaded),
+        "max_loaded": config.MAX_LOADED_COLLECTIONS if store is not None else None
+    }
+
+def check_capacity(db: Database):
+    if len(db.snapshot.chunk_metadata) >= config.MAX_TOTAL_CHUNKS:
+        raise HTTPException(
+            status_code=507,
+            detail=f"Collection at capacity ({config.MAX_TOTAL_CHUNKS} chunks). Delete some sources first."
+        )
+
+async def run_bounded(calls: List, limit: int) -> List:
+    """Run blocking calls in the batch lane, at most `limit` at once; exceptions are returned"""
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max(1, limit))
+    
+    async def run(call):
+        async with semaphore:
+            return await loop.run_in_executor(batch_executor, call)
+    
+    return await asyncio.gather(*(run(call) for call in calls), return_exceptions=True)
+
+def bulk_response(db: Database, sources: List[Tuple[str, List[str]]], failed: List[Dict],
+                  chunks_added: int, dedup_report: Optional[DedupReport], **extra) -> Dict:
+    return {
+        "status": "success" if sources else "failed",
+        "collection": db.name,
+        "sources_ingested": len(sources),
+        "sources_failed": failed,
+        **extra,
+        "chunks_added": chunks_added,
+        "total_chunks": len(db.snapshot.chunk_metadata),
+        "dedup": dedup_report.to_dict() if dedup_report else None
+    }
 
 @app.post("/ingest")
 async def ingest(req: IngestRequest, request: Request):
@@ -365,22 +1103,18 @@ async def ingest(req: IngestRequest, request: Request):
     Rate limited to prevent abuse.
     """
     await rate_limit_check(request, max_requests=5, window=60)
+    admission_check("batch")
     
     try:
-        # Check if we're at capacity
-        if len(db.chunk_metadata) >= config.MAX_TOTAL_CHUNKS:
-            raise HTTPException(
-                status_code=507,
-                detail=f"Database at capacity ({config.MAX_TOTAL_CHUNKS} chunks). Delete some sources first."
-            )
+        db = await get_collection(req.collection)
+        
+        check_capacity(db)
         
         # Run crawl in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         chunks, visited_urls = await loop.run_in_executor(
-            executor,
-            crawl_website,
-            req.url,
-            req.max_pages
+            batch_executor,
+            bind(crawl_website, req.url, req.max_pages)
         )
         
         if not chunks:
@@ -394,31 +1128,17 @@ async def ingest(req: IngestRequest, request: Request):
             logger.warning(f"Truncating {len(chunks)} chunks to {config.MAX_CHUNKS_PER_SOURCE}")
             chunks = chunks[:config.MAX_CHUNKS_PER_SOURCE]
         
-        # Store with metadata
-        async with db.lock:
-            timestamp = datetime.now().isoformat()
-            
-            # Add to sources
-            db.sources[req.url] = chunks
-            
-            # Add to chunk metadata
-            for chunk in chunks:
-                db.chunk_metadata.append({
-                    'text': chunk,
-                    'source_url': req.url,
-                    'timestamp': timestamp
-                })
-            
-            # Rebuild index
-            await rebuild_index()
+        chunks_added, dedup_report = await commit_sources(db, [(req.url, chunks)])
         
         return {
             "status": "success",
             "source_url": req.url,
+            "collection": req.collection,
             "pages_visited": len(visited_urls),
-            "chunks_added": len(chunks),
-            "count": len(chunks),
-            "total_chunks": len(db.chunk_metadata)
+            "chunks_added": chunks_added,
+            "count": chunks_added,
+            "total_chunks": len(db.snapshot.chunk_metadata),
+            "dedup": dedup_report.to_dict() if dedup_report else None
         }
     
     except HTTPException:
@@ -431,159 +1151,329 @@ async def ingest(req: IngestRequest, request: Request):
         logger.exception("Unexpected error in ingest")
         raise HTTPException(status_code=500, detail="Internal server error during ingestion")
 
+@app.post("/ingest/bulk")
+async def ingest_bulk(req: BulkIngestRequest, request: Request):
+    """
+    Ingest a list of URLs and/or every page of a sitemap in one request.
+    Sources are crawled concurrently and committed as one index update.
+    """
+    await rate_limit_check(request, max_requests=5, window=60)
+    admission_check("batch")
+    if not req.urls and not req.sitemap_url:
+        raise HTTPException(status_code=400, detail="Provide urls and/or sitemap_url")
+    
+    db = await get_collection(req.collection)
+    check_capacity(db)
+    
+    targets = [(url, req.max_pages) for url in req.urls]
+    rejected = []  # Sitemap entries validate_url refused
+    if req.sitemap_url:
+        loop = asyncio.get_running_loop()
+        entries = await loop.run_in_executor(
+            batch_executor,
+            bind(collect_sitemap, fetch_raw, req.sitemap_url, config.BULK_MAX_URLS - len(targets))
+        )
+        listed = set(req.urls)
+        for entry in entries:
+            if entry.url in listed:
+                continue
+            try:
+                validate_url(entry.url)
+            except ValueError as e:
+                rejected.append({"source": entry.url, "error": str(e)})
+                continue
+            targets.append((entry.url, 1))
+    
+    results = await run_bounded(
+        [bind(crawl_website, url, max_pages) for url, max_pages in targets],
+        config.BATCH_WORKERS
+    )
+    
+    sources, failed, pages_visited = [], rejected, 0
+    for (url, _), result in zip(targets, results):
+        if isinstance(result, Exception):
+            failed.append({"source": url, "error": str(result)})
+            continue
+        chunks, visited_urls = result
+        pages_visited += len(visited_urls)
+        if not chunks:
+            failed.append({"source": url, "error": "No substantial content found"})
+            continue
+        sources.append((url, chunks[:config.MAX_CHUNKS_PER_SOURCE]))
+    
+    chunks_added, dedup_report = await commit_sources(db, sources)
+    logger.info(f"📦 Bulk ingest: {len(sources)} sources, {chunks_added} chunks into '{db.name}'")
+    return bulk_response(db, sources, failed, chunks_added, dedup_report, pages_visited=pages_visited)
+
+@app.post("/ingest/upload")
+async def ingest_upload(
+    request: Request,
+    files: List[UploadFile] = File(..., description="PDF, HTML or text files"),
+    collection: str = Form(DEFAULT_COLLECTION, pattern=COLLECTION_NAME_PATTERN)
+):
+    """Ingest uploaded PDF/HTML/text documents as one index update."""
+    await rate_limit_check(request, max_requests=5, window=60)
+    admission_check("batch")
+    if len(files) > config.BULK_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {config.BULK_MAX_FILES} files per request")
+    
+    db = await get_collection(collection)
+    check_capacity(db)
+    
+    calls, names, failed = [], [], []
+    for upload in files:
+        data = await upload.read(config.BULK_MAX_UPLOAD_BYTES + 1)
+        if len(data) > config.BULK_MAX_UPLOAD_BYTES:
+            failed.append({"source": upload.filename, "error": f"Larger than {config.BULK_MAX_UPLOAD_BYTES} bytes"})
+            continue
+        
+        def parse(filename=upload.filename, content_type=upload.content_type, data=data):
+            return document_chunks(*extract_upload(filename, content_type, data))
+        
+        calls.append(bind(parse))
+        names.append(upload.filename)
+    
+    sources = []
+    for name, result in zip(names, await run_bounded(calls, config.BATCH_WORKERS)):
+        if isinstance(result, Exception):
+            failed.append({"source": name, "error": str(result)})
+        elif not result:
+            failed.append({"source": name, "error": "No substantial content found"})
+        else:
+            sources.append((upload_source(name), result[:config.MAX_CHUNKS_PER_SOURCE]))
+    
+    chunks_added, dedup_report = await commit_sources(db, sources)
+    logger.info(f"📦 Upload ingest: {len(sources)} documents, {chunks_added} chunks into '{db.name}'")
+    return bulk_response(db, sources, failed, chunks_added, dedup_report)
+
+async def answer_question(snapshot: IndexSnapshot, question: str) -> Dict:
+    """Retrieve, pack and generate: the /chat response for one snapshot"""
+    # 1. Retrieve relevant chunks using BM25
+    loop = asyncio.get_running_loop()
+    hits = await loop.run_in_executor(
+        executor, bind(retrieve, snapshot, question, config.TOP_K_RETRIEVAL)
+    )
+    
+    # 2. Pack the most relevant sentences into the model's input budget
+    prompt, citations, context_tokens = await loop.run_in_executor(
+        executor, bind(timed, "context_packing", build_chat_prompt, question, hits)
+    )
+    
+    # 3. Generate answer using Nano AI
+    # Run model inference in thread pool
+    result = await loop.run_in_executor(
+        executor,
+        bind(timed, "generation", generate, prompt, do_sample=False)
+    )
+    
+    # citations[n - 1] is the source of passage [n]
+    return {
+        "answer": result.strip(),
+        "sources": citations,
+        "citations": citations,
+        "chunks_retrieved": len(hits),
+        "context_tokens": context_tokens
+    }
+
+async def answer_in_session(snapshot: IndexSnapshot, session: ChatSession, question: str) -> Dict:
+    """
+    One turn of a chat session: while the topic holds, the session's retrieval
+    (and with Ollama, the model's context) is reused instead of rebuilt
+    """
+    loop = asyncio.get_running_loop()
+    async with session.lock:
+        terms = frozenset(tokenize(question))
+        reused = session.same_topic(terms, snapshot.version, config.SESSION_TOPIC_OVERLAP)
+        if reused:
+            hits, citations = session.reuse_retrieval(terms)
+        else:
+            hits = await loop.run_in_executor(
+                executor, bind(retrieve, snapshot, question, config.TOP_K_RETRIEVAL)
+            )
+        
+        context = session.backend_state if reused else None
+        if context:
+            prompt, context_tokens = FOLLOW_UP_PROMPT.format(question=question), 0
+        else:
+            history = format_history(session.history(config.SESSION_HISTORY_TOKENS, prompt_tokens))
+            prompt, citations, context_tokens = await loop.run_in_executor(
+                executor, bind(timed, "context_packing", build_chat_prompt, question, hits, history)
+            )
+        if reused:
+            session.retrieval = (hits, citations)
+        else:
+            session.remember_retrieval(terms, snapshot.version, (hits, citations))
+        
+        answer, context = await loop.run_in_executor(
+            executor, bind(timed, "generation", generate_turn, prompt, context)
+        )
+        session.backend_state = context if context and len(context) <= config.SESSION_MAX_CONTEXT else None
+        session.add_turn(question, answer.strip())
+    
+    return {
+        "answer": answer.strip(),
+        "sources": citations,
+        "citations": citations,
+        "chunks_retrieved": len(hits),
+        "context_tokens": context_tokens,
+        "session_id": session.id,
+        "retrieval_reused": reused
+    }
+
 @app.post("/chat")
 async def chat(req: ChatRequest, request: Request):
     """
     RAG-powered chat: retrieves relevant chunks and generates answer.
     """
     await rate_limit_check(request, max_requests=20, window=60)
+    db = await get_collection(req.collection)
     
     logger.info(f"Chat request: {req.question}")
     
-    if not db.bm25:
+    # One snapshot for the whole request: ingests publishing meanwhile don't affect it
+    snapshot = db.snapshot
+    if not snapshot.bm25:
         raise HTTPException(
             status_code=400,
             detail="No content available. Please ingest a website first using /ingest"
         )
     
+    if req.session_id is not None:
+        admission_check("interactive")
+        session = sessions.get_or_create(req.session_id, db.name)
+        try:
+            return await answer_in_session(snapshot, session, req.question)
+        except Exception as e:
+            logger.exception("Error in chat endpoint")
+            raise HTTPException(status_code=500, detail="Failed to generate answer")
+    
+    # Identical questions about the same index version share one answer
+    key = (db.name, snapshot.version, normalize_text(req.question))
+    if key not in chat_flights:
+        admission_check("interactive")
+    
     try:
-        # 1. Retrieve relevant chunks using BM25
-        tokenized_query = tokenize(req.question)
-        scores = db.bm25.get_scores(tokenized_query)
-        
-        # Get top K indices
-        top_indices = sorted(
-            range(len(scores)),
-            key=lambda i: scores[i],
-            reverse=True
-        )[:config.TOP_K_RETRIEVAL]
-        
-        # Build context and track sources
-        context_parts = []
-        source_urls = set()
-        
-        for idx in top_indices:
-            if idx < len(db.chunk_metadata):
-                meta = db.chunk_metadata[idx]
-                context_parts.append(meta['text'])
-                source_urls.add(meta['source_url'])
-        
-        context = "\n\n".join(context_parts)
-        
-        # 2. Generate answer using Nano AI
-        prompt = (
-            f"Answer the question based ONLY on the context below. "
-            f"Be concise and specific. If the answer isn't in the context, say so.\n\n"
-            f"Context:\n{context}\n\n"
-            f"Question: {req.question}\n\n"
-            f"Answer:"
-        )
-        
-        # Run model inference in thread pool
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            executor,
-            lambda: chatbot(prompt, max_length=config.MAX_MODEL_LENGTH, do_sample=False)[0]['generated_text']
-        )
-        
-        return {
-            "answer": result.strip(),
-            "sources": list(source_urls),
-            "citations": list(source_urls),
-            "chunks_retrieved": len(context_parts)
-        }
+        return await chat_flights.do(key, lambda: answer_question(snapshot, req.question))
     
     except Exception as e:
         logger.exception("Error in chat endpoint")
         raise HTTPException(status_code=500, detail="Failed to generate answer")
 
+@app.post("/retrieve/batch")
+async def retrieve_batch(req: BatchRetrieveRequest, request: Request):
+    """
+    Top-k chunks by BM25 score for many queries at once, for offline
+    evaluation: retrieval only (no reranking or generation), all queries
+    scored in one vectorized pass. Results are in query order:
+    {id, query, results: [{rank, id, source, score}]} with id the query's
+    position; chunk ids match /export/chunks of the same index_version.
+    """
+    await rate_limit_check(request, max_requests=10, window=60)
+    admission_check("batch")
+    db = await get_collection(req.collection)
+    
+    snapshot = db.snapshot
+    loop = asyncio.get_running_loop()
+    results = await loop.run_in_executor(batch_executor, bind(
+        timed, "batch_retrieval", retrieval_records, snapshot, list(enumerate(req.queries)), req.k, req.include_text
+    ))
+    return {"collection": req.collection, "index_version": snapshot.version, "k": req.k, "results": results}
+
+@app.delete("/chat/sessions/{session_id}")
+async def end_session(session_id: str):
+    """Forget a chat session"""
+    if not sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return {"status": "success", "session_id": session_id}
+
+def summarize(snapshot: IndexSnapshot, stemmer: Stemmer) -> str:
+    """Extractive TextRank summary of a snapshot's text sample (blocking)"""
+    full_text = snapshot.get_full_text_sample(max_chars=10000)
+    parser = PlaintextParser.from_string(full_text, Tokenizer(config.LANGUAGE))
+    summarizer = TextRankSummarizer(stemmer)
+    summary_sentences = summarizer(parser.document, config.SUMMARY_SENTENCES)
+    return " ".join([str(s) for s in summary_sentences])
+
+async def write_briefing(snapshot: IndexSnapshot, stemmer: Stemmer) -> str:
+    """TextRank summary plus generated FAQs for one snapshot"""
+    loop = asyncio.get_running_loop()
+    summary = await loop.run_in_executor(batch_executor, bind(timed, "summarize", summarize, snapshot, stemmer))
+    
+    # Generate FAQs using AI
+    faq_prompt = (
+        f"Based on this summary, generate 3 useful questions and answers:\n\n"
+        f"{summary}\n\n"
+        f"Format as:\nQ1: [question]\nA1: [answer]\n\nQ2:..."
+    )
+    
+    faq_content = await loop.run_in_executor(
+        batch_executor,
+        bind(timed, "generation", generate, faq_prompt)
+    )
+    
+    return (
+        f"# 📝 Content Briefing\n\n"
+        f"**Sources:** {len(snapshot.sources)} websites, {len(snapshot.chunk_metadata)} chunks\n\n"
+        f"## Summary (TextRank)\n{summary}\n\n"
+        f"## Generated FAQs\n{faq_content}"
+    )
+
 @app.post("/briefing")
-async def briefing(request: Request):
+async def briefing(request: Request, collection: str = collection_query()):
     """
     Generates a briefing using TextRank summarization and AI-generated FAQs.
     """
     await rate_limit_check(request, max_requests=5, window=60)
+    db = await get_collection(collection)
     
-    if not db.chunk_metadata:
+    snapshot = db.snapshot
+    if not snapshot.chunk_metadata:
         raise HTTPException(
             status_code=400,
             detail="No content available. Please ingest a website first."
         )
     
+    # Concurrent briefings of the same index version share one generation
+    key = (db.name, snapshot.version)
+    if key not in briefing_flights:
+        admission_check("batch")
+    
     try:
-        # Get text sample for summarization
-        full_text = db.get_full_text_sample(max_chars=10000)
-        
-        # Generate extractive summary using TextRank
-        parser = PlaintextParser.from_string(full_text, Tokenizer(config.LANGUAGE))
-        summarizer = TextRankSummarizer(db.stemmer)
-        summary_sentences = summarizer(parser.document, config.SUMMARY_SENTENCES)
-        summary = " ".join([str(s) for s in summary_sentences])
-        
-        # Generate FAQs using AI
-        faq_prompt = (
-            f"Based on this summary, generate 3 useful questions and answers:\n\n"
-            f"{summary}\n\n"
-            f"Format as:\nQ1: [question]\nA1: [answer]\n\nQ2:..."
-        )
-        
-        loop = asyncio.get_event_loop()
-        faq_content = await loop.run_in_executor(
-            executor,
-            lambda: chatbot(faq_prompt, max_length=config.MAX_MODEL_LENGTH)[0]['generated_text']
-        )
-        
-        briefing_content = (
-            f"# 📝 Content Briefing\n\n"
-            f"**Sources:** {len(db.sources)} websites, {len(db.chunk_metadata)} chunks\n\n"
-            f"## Summary (TextRank)\n{summary}\n\n"
-            f"## Generated FAQs\n{faq_content}"
-        )
-        
+        briefing_content = await briefing_flights.do(key, lambda: write_briefing(snapshot, db.stemmer))
         return {"content": briefing_content}
     
     except Exception as e:
         logger.exception("Error in briefing endpoint")
         raise HTTPException(status_code=500, detail="Failed to generate briefing")
 
-@app.get("/podcast")
-async def podcast(request: Request):
-    """
-    Generates a 2-host podcast script and converts to MP3.
-    """
-    await rate_limit_check(request, max_requests=3, window=300)
+async def record_podcast(snapshot: IndexSnapshot) -> bytes:
+    """A generated 2-host script about one snapshot, spoken with Edge TTS (MP3)"""
+    loop = asyncio.get_running_loop()
     
-    if not db.chunk_metadata:
-        raise HTTPException(
-            status_code=400,
-            detail="No content available for podcast generation."
-        )
+    # Get sample text
+    sample_text = await loop.run_in_executor(batch_executor, bind(snapshot.get_full_text_sample, max_chars=3000))
     
-    try:
-        # Get sample text
-        sample_text = db.get_full_text_sample(max_chars=3000)
-        
-        # Generate podcast script
-        script_prompt = (
-            f"Create a brief 2-host podcast script about this content. "
-            f"Format as 'Host A: [text]' and 'Host B: [text]' alternating.\n\n"
-            f"Content: {sample_text}"
-        )
-        
-        loop = asyncio.get_event_loop()
-        script = await loop.run_in_executor(
-            executor,
-            lambda: chatbot(script_prompt, max_length=config.MAX_MODEL_LENGTH)[0]['generated_text']
-        )
-        
-        # Generate audio using Edge TTS
+    # Generate podcast script
+    script_prompt = (
+        f"Create a brief 2-host podcast script about this content. "
+        f"Format as 'Host A: [text]' and 'Host B: [text]' alternating.\n\n"
+        f"Content: {sample_text}"
+    )
+    
+    script = await loop.run_in_executor(
+        batch_executor,
+        bind(timed, "generation", generate, script_prompt)
+    )
+    
+    # Generate audio using Edge TTS
+    with stage_timer("tts"):
         full_audio = b""
-        
+    
         for line in script.split('\n'):
             line = line.strip()
             if not line:
                 continue
-            
+        
             # Detect host and extract text
             if "Host A:" in line or line.startswith("Host A"):
                 text = re.sub(r'Host A:?\s*', '', line, flags=re.IGNORECASE)
@@ -594,22 +1484,41 @@ async def podcast(request: Request):
             else:
                 text = line
                 voice = "en-US-AriaNeural"
-            
+        
             if text:
                 communicate = edge_tts.Communicate(text, voice)
                 async for chunk in communicate.stream():
                     if chunk["type"] == "audio":
                         full_audio += chunk["data"]
-        
-        # Save to temporary file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-        temp_file.write(full_audio)
-        temp_file.close()
-        
-        return FileResponse(
-            temp_file.name,
+    
+    return full_audio
+
+@app.get("/podcast")
+async def podcast(request: Request, collection: str = collection_query()):
+    """
+    Generates a 2-host podcast script and converts to MP3.
+    """
+    await rate_limit_check(request, max_requests=3, window=300)
+    db = await get_collection(collection)
+    
+    snapshot = db.snapshot
+    if not snapshot.chunk_metadata:
+        raise HTTPException(
+            status_code=400,
+            detail="No content available for podcast generation."
+        )
+    
+    # Concurrent podcasts of the same index version share one script and TTS run
+    key = (db.name, snapshot.version)
+    if key not in podcast_flights:
+        admission_check("batch")
+    
+    try:
+        full_audio = await podcast_flights.do(key, lambda: record_podcast(snapshot))
+        return Response(
+            content=full_audio,
             media_type="audio/mpeg",
-            filename="podcast.mp3"
+            headers={"Content-Disposition": 'attachment; filename="podcast.mp3"'}
         )
     
     except Exception as e:
@@ -617,75 +1526,235 @@ async def podcast(request: Request):
         raise HTTPException(status_code=500, detail="Failed to generate podcast")
 
 @app.get("/sources")
-async def get_sources():
+async def get_sources(collection: str = collection_query()):
     """List all ingested sources as a simple list to match the frontend expectations, and include metadata."""
-    urls = list(db.sources.keys())
+    db = await get_collection(collection)
+    sources = db.snapshot.sources
+    urls = list(sources.keys())
     # sources_info for backwards compatibility / debugging
-    sources_info = [{"url": url, "chunk_count": len(db.sources[url])} for url in urls]
+    sources_info = [{"url": url, "chunk_count": len(sources[url])} for url in urls]
     return {
         "total_sources": len(urls),
         "sources": urls,
         "sources_info": sources_info
     }
 
+@app.get("/export/chunks")
+async def export_chunks(
+    request: Request,
+    collection: str = collection_query(),
+    source: Optional[str] = Query(None, description="Only this source's chunks")
+):
+    """Stream a collection's chunks as NDJSON: {id, source, timestamp, text} per line"""
+    await rate_limit_check(request, max_requests=10, window=60)
+    admission_check("batch")
+    db = await get_collection(collection)
+    
+    snapshot = db.snapshot  # One version for the whole export, however long it streams
+    if source is not None and source not in snapshot.sources:
+        raise HTTPException(status_code=404, detail="Source not found")
+    
+    return StreamingResponse(
+        stream_ndjson(chunk_batches(snapshot, source, config.EXPORT_BATCH_SIZE), batch_executor),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"X-Index-Version": str(snapshot.version)}
+    )
+
+@app.post("/export/retrieval")
+async def export_retrieval(
+    request: Request,
+    collection: str = collection_query(),
+    k: int = Query(config.TOP_K_RETRIEVAL, ge=1, le=100, description="Results per query"),
+    include_text: bool = Query(False, description="Include each result's chunk text")
+):
+    """
+    Top-k chunks by BM25 score for every query in the request body (one per
+    line: text, or JSON with "query" and optional "id"), streamed as NDJSON:
+    {id, query, results: [{rank, id, source, score}]} per query. Result ids
+    match /export/chunks of the same X-Index-Version.
+    """
+    await rate_limit_check(request, max_requests=10, window=60)
+    admission_check("batch")
+    
+    try:
+        queries = await read_queries(
+            request.stream(), config.EXPORT_MAX_QUERIES, MAX_QUERY_CHARS, config.EXPORT_MAX_BODY_BYTES
+        )
+    except BodyTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except QueryTooLong as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    db = await get_collection(collection)
+    snapshot = db.snapshot
+    batches = retrieval_batches(snapshot, queries, k, include_text, max(1, config.EXPORT_BATCH_SIZE // k))
+    return StreamingResponse(
+        stream_ndjson(batches, batch_executor),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"X-Index-Version": str(snapshot.version)}
+    )
+
 @app.post("/delete_source")
 async def delete_source(req: DeleteSourceRequest):
     """Delete a specific source and rebuild index"""
-    async with db.lock:
-        if req.source_url not in db.sources:
-            raise HTTPException(status_code=404, detail="Source not found")
-        
-        # Remove from sources
-        del db.sources[req.source_url]
+    db = await get_collection(req.collection)
+    async with db.write_lock:
+        await reload_if_stale(db)
         
-        # Remove from chunk metadata
-        db.chunk_metadata = [
-            meta for meta in db.chunk_metadata
-            if meta['source_url'] != req.source_url
-        ]
+        if req.source_url not in db.snapshot.sources:
+            raise HTTPException(status_code=404, detail="Source not found")
         
-        # Rebuild index
-        await rebuild_index()
+        version = await store_write(db, "delete_source", req.source_url)
+        if version is not None:
+            # Remove from chunk metadata
+            chunk_metadata = [
+                meta for meta in db.snapshot.chunk_metadata
+                if meta['source_url'] != req.source_url
+            ]
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(batch_executor, db.reset_dedup, chunk_metadata)
+            
+            # Rebuild index and publish
+            await db.publish(chunk_metadata, version)
     
     return {
         "status": "success",
         "message": f"Deleted source: {req.source_url}",
-        "remaining_chunks": len(db.chunk_metadata)
+        "remaining_chunks": len(db.snapshot.chunk_metadata)
     }
 
 @app.post("/clear")
-async def clear_database():
-    """Clear entire database"""
-    async with db.lock:
-        db.sources.clear()
-        db.chunk_metadata.clear()
-        db.bm25 = None
-    
-    logger.info("Database cleared")
+async def clear_database(collection: str = collection_query()):
+    """Clear a collection"""
+    db = await get_collection(collection)
+    async with db.write_lock:
+        version = await store_write(db, "clear")
+        if version is not None:
+            db.dedup.reset()
+            db.snapshot = IndexSnapshot(version=version)
+            update_corpus_gauges()
+    
+    logger.info(f"Collection '{collection}' cleared")
     return {
         "status": "success",
-        "message": "Database cleared successfully"
+        "message": f"Collection '{collection}' cleared successfully"
     }
 
+@app.get("/admin/snapshot", dependencies=[Depends(require_admin)])
+async def export_snapshot(collection: str = collection_query()):
+    """Download a collection as a binary snapshot file"""
+    db = await get_collection(collection)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".ragsnap") as f:
+        path = f.name
+    
+    loop = asyncio.get_running_loop()
+    try:
+        # Under the write lock, so the dedup fingerprints match the snapshot's chunks
+        async with db.write_lock:
+            snapshot = db.snapshot
+            size = await loop.run_in_executor(
+                batch_executor, bind(timed, "snapshot_write", write_index_snapshot, snapshot, collection, path, db.dedup)
+            )
+    except Exception:
+        os.remove(path)
+        raise
+    logger.info(f"📤 Exported '{collection}' v{snapshot.version}: {size} bytes")
+    return FileResponse(
+        path,
+        media_type="application/octet-stream",
+        filename=f"{collection}-v{snapshot.version}.ragsnap",
+        background=BackgroundTask(os.remove, path)
+    )
+
+@app.post("/admin/snapshot", dependencies=[Depends(require_admin)])
+async def import_snapshot_file(
+    file: UploadFile = File(...),
+    collection: Optional[str] = Query(None, pattern=COLLECTION_NAME_PATTERN, description="Defaults to the snapshot's")
+):
+    """Replace a collection with an uploaded snapshot file"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".ragsnap") as f:
+        path = f.name
+    try:
+        loop = asyncio.get_running_loop()
+        with open(path, "wb") as out:
+            while chunk := await file.read(1024 * 1024):
+                await loop.run_in_executor(batch_executor, out.write, chunk)
+        # Read into memory rather than mapped: a mapped file can't be removed on Windows
+        return await import_snapshot(path, collection, mapped=False)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        os.remove(path)
+
 # --- STARTUP/SHUTDOWN ---
+def load_backends():
+    """
+    The model, index store and rate limit backend (blocking). Called on
+    startup rather than at import time, so importing this module is cheap.
+    """
+    global store, rate_limiter
+    load_model()
+    if config.SHARED_INDEX_PATH:
+        store = SharedIndexStore(config.SHARED_INDEX_PATH)
+    rate_limiter = RateLimiter(create_backend(
+        config.RATE_LIMIT_BACKEND,
+        sqlite_path=config.RATE_LIMIT_SQLITE_PATH,
+        redis_url=config.RATE_LIMIT_REDIS_URL
+    ))
+
 @app.on_event("startup")
 async def startup_event():
     logger.info("=" * 60)
     logger.info("🚀 Nano RAG Server Starting")
     logger.info(f"📍 Host: {config.HOST}:{config.PORT}")
     logger.info(f"🤖 AI Model: {config.MODEL_NAME}")
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(batch_executor, load_backends)
+    if store is not None:
+        logger.info(f"🗄️ Index store: {config.SHARED_INDEX_PATH} ({config.WORKERS} workers)")
+        if config.WORKERS > 1 and config.RATE_LIMIT_BACKEND == "memory":
+            logger.warning("Rate limits are per worker; set RATE_LIMIT_BACKEND=sqlite to share them")
+    elif config.WORKERS > 1:
+        logger.warning("WORKERS > 1 without SHARED_INDEX_PATH: each worker has its own corpus")
+    logger.info(f"🧵 {config.MAX_WORKERS} worker threads, at most {config.BATCH_WORKERS} for batch work")
     logger.info("=" * 60)
+    
+    global analyzer_pool
+    if config.ANALYZER_PROCESSES > 0:
+        # Workers start from a fresh interpreter, so they don't inherit this
+        # process's threads; start them before the loop monitor adds another
+        analyzer_pool = AnalyzerPool(analyzer, config.ANALYZER_PROCESSES)
+        logger.info(f"🔤 Analyzer '{config.ANALYZER}' running in {config.ANALYZER_PROCESSES} processes")
+    
+    if config.LOOP_LAG_INTERVAL > 0:
+        loop_monitor.start()
+    
+    for path in filter(None, (p.strip() for p in config.SNAPSHOT_IMPORT.split(","))):
+        try:
+            await import_snapshot(path, only_if_empty=True)
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Could not import snapshot {path}: {e}")
+    
+    await get_collection(DEFAULT_COLLECTION)
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    executor.shutdown(wait=True)
+    if config.LOOP_LAG_INTERVAL > 0:
+        await loop_monitor.stop()
+    scheduler.shutdown(wait=True)
+    if analyzer_pool is not None:
+        analyzer_pool.shutdown()
     logger.info("Server shutdown complete")
 
 # --- MAIN ---
 if __name__ == "__main__":
     uvicorn.run(
-        app,
+        # Multiple workers need an import string so each process loads the app
+        "server2:app" if config.WORKERS > 1 else app,
         host=config.HOST,
         port=config.PORT,
+        workers=config.WORKERS,
         log_level="info"
     )
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+Multi-turn chat sessions.
+
+A session remembers the last few turns of a conversation and what the last
+retrieval found, so follow-up questions are both answerable ("and how much
+does it cost?") and cheap:
+
+- the recent turns go into the prompt, trimmed to a token budget;
+- a follow-up that stays on topic (its terms mostly repeat the terms the
+  current retrieval was made for, or it has no content terms at all, like
+  "why?") reuses the retrieval instead of searching again, as long as the
+  index hasn't changed since;
+- servers can park backend state on the session, e.g. Ollama's context
+  tokens, so the model continues from its KV cache instead of re-reading the
+  passages and history.
+
+Sessions live in process memory, bounded by an LRU of max_sessions and
+evicted after ttl idle seconds.
+"""
+
+import asyncio
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, FrozenSet, Hashable, List, Optional
+
+from metrics import CACHE_HITS, CACHE_MISSES, CHAT_SESSIONS
+
+
+@dataclass(frozen=True)
+class Turn:
+    question: str
+    answer: str
+
+
+class ChatSession:
+    def __init__(self, session_id: str, collection: str, max_turns: int = 6):
+        self.id = session_id
+        self.collection = collection
+        self.turns: Deque[Turn] = deque(maxlen=max_turns)
+        self.topic: FrozenSet[str] = frozenset()  # Terms the current retrieval was made for
+        self.retrieval: Any = None
+        self.retrieval_version: Optional[Hashable] = None
+        self.backend_state: Any = None  # E.g. Ollama context tokens after the last answer
+        self.lock = asyncio.Lock()  # One turn at a time, so history stays in order
+
+    def same_topic(self, terms: FrozenSet[str], version: Hashable, min_overlap: float) -> bool:
+        """Whether a question with these terms can reuse the current retrieval."""
+        if self.retrieval is None or version != self.retrieval_version:
+            return False
+        if not terms:
+            return True
+        return len(terms & self.topic) / len(terms) >= min_overlap
+
+    def reuse_retrieval(self, terms: FrozenSet[str]) -> Any:
+        CACHE_HITS.labels("session_retrieval").inc()
+        self.topic |= terms
+        return self.retrieval
+
+    def remember_retrieval(self, terms: FrozenSet[str], version: Hashable, retrieval: Any):
+        CACHE_MISSES.labels("session_retrieval").inc()
+        self.topic = terms
+        self.retrieval = retrieval
+        self.retrieval_version = version
+        self.backend_state = None  # It was built on the old passages
+
+    def add_turn(self, question: str, answer: str):
+        self.turns.append(Turn(question, answer))
+
+    def history(self, max_tokens: int, count: Callable[[str], int]) -> List[Turn]:
+        """The most recent turns that fit in max_tokens, oldest first."""
+        kept: List[Turn] = []
+        used = 0
+        for turn in reversed(self.turns):
+            used += count(turn.question) + count(turn.answer)
+            if used > max_tokens:
+                break
+            kept.append(turn)
+        return kept[::-1]
+
+
+class SessionStore:
+    """Thread-safe LRU of sessions with an idle TTL."""
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 1800.0, max_turns: int = 6,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, List]" = OrderedDict()  # id -> [session, last used]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict(self, now: float):
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used < self.ttl and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+        CHAT_SESSIONS.set(len(self._sessions))
+
+    def get(self, session_id: str, collection: str) -> Optional[ChatSession]:
+        """A live session of this collection, or None if unknown, expired or of another collection."""
+        now = self._clock()
+        with self._lock:
+            self._evict(now)
+            entry = self._sessions.get(session_id)
+            if entry is None or entry[0].collection != collection:
+                return None
+            entry[1] = now
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def create(self, collection: str) -> ChatSession:
+        session = ChatSession(secrets.token_urlsafe(16), collection, self.max_turns)
+        now = self._clock()
+        with self._lock:
+            self._sessions[session.id] = [session, now]
+            self._evict(now)
+        return session
+
+    def get_or_create(self, session_id: Optional[str], collection: str) -> ChatSession:
+        """The session to continue, or a new one when session_id is missing or no longer valid."""
+        session = self.get(session_id, collection) if session_id else None
+        return session or self.create(collection)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            found = self._sessions.pop(session_id, None) is not None
+            CHAT_SESSIONS.set(len(self._sessions))
+        return found
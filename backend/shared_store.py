@@ -0,0 +1,176 @@
+"""
+Versioned index state shared by several server processes.
+
+A single SQLite file (WAL mode, memory-mapped reads) holds a version counter
+and, for server2.py, the chunk corpus itself. Every write runs inside one
+BEGIN IMMEDIATE transaction, so there is exactly one writer at a time across
+all workers, and the version is bumped in the same commit. Readers poll the
+version (a single-row SELECT that never blocks on the writer) and reload when
+it changes, so every worker converges on the same corpus without restarts.
+
+Chunks belong to a named collection, each with its own version alongside the
+global one, so readers reload only the collections that actually changed.
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from collection_cache import DEFAULT_COLLECTION
+
+# Writers queue behind each other for up to this long (embedding a crawl can be slow)
+WRITER_TIMEOUT = 600.0
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+class WriteTransaction:
+    """Handle for an open write; version holds the committed version afterwards."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.version: int = 0
+
+
+class SharedIndexStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self.transaction(bump=False):
+            pass
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; executor threads each get their own."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=WRITER_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS chunks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    source_url TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    collection TEXT NOT NULL DEFAULT 'default'
+                )"""
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(chunks)")}
+            if "collection" not in columns:  # Stores created before collections existed
+                conn.execute("ALTER TABLE chunks ADD COLUMN collection TEXT NOT NULL DEFAULT 'default'")
+            conn.execute("DROP INDEX IF EXISTS chunks_source")
+            conn.execute("CREATE INDEX IF NOT EXISTS chunks_collection_source ON chunks (collection, source_url)")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _version_key(collection: Optional[str]) -> str:
+        return "version" if collection is None else f"version:{collection}"
+
+    def version(self, collection: Optional[str] = None) -> int:
+        """Global version, or one collection's version."""
+        row = self._connect().execute(
+            "SELECT value FROM meta WHERE key = ?", (self._version_key(collection),)
+        ).fetchone()
+        return row[0] if row else 0
+
+    @contextmanager
+    def transaction(self, bump: bool = True, collection: Optional[str] = None) -> Iterator[WriteTransaction]:
+        """
+        Exclusive write transaction. Blocks until no other process is writing;
+        commits with the global version (and the collection's, if given) bumped
+        unless the body raises. txn.version is the collection's version if
+        given, else the global one.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        txn = WriteTransaction(conn)
+        key = self._version_key(collection)
+        try:
+            yield txn
+            if bump:
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+                if collection is not None:
+                    conn.execute(
+                        "INSERT INTO meta (key, value) VALUES (?, 1) "
+                        "ON CONFLICT (key) DO UPDATE SET value = value + 1",
+                        (key,)
+                    )
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            txn.version = row[0] if row else 0
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    # --- Chunk corpus (server2.py) ---
+    def load(self, collection: str = DEFAULT_COLLECTION) -> Tuple[int, List[Dict]]:
+        """Read a consistent (version, chunk_metadata) pair for a collection."""
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            version = self.version(collection)
+            rows = conn.execute(
+                "SELECT text, source_url, timestamp FROM chunks WHERE collection = ? ORDER BY id",
+                (collection,)
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        return version, [
+            {'text': text, 'source_url': source_url, 'timestamp': timestamp}
+            for text, source_url, timestamp in rows
+        ]
+
+    def append(self, source_url: str, chunks: List[str], timestamp: str,
+               collection: str = DEFAULT_COLLECTION) -> int:
+        """Add chunks for a source; returns the collection's new version."""
+        with self.transaction(collection=collection) as txn:
+            txn.conn.executemany(
+                "INSERT INTO chunks (source_url, text, timestamp, collection) VALUES (?, ?, ?, ?)",
+                [(source_url, chunk, timestamp, collection) for chunk in chunks]
+            )
+        return txn.version
+
+    def append_many(self, sources: List[Tuple[str, List[str]]], timestamp: str,
+                    collection: str = DEFAULT_COLLECTION) -> int:
+        """Add chunks for several sources in one write; returns the collection's new version."""
+        with self.transaction(collection=collection) as txn:
+            txn.conn.executemany(
+                "INSERT INTO chunks (source_url, text, timestamp, collection) VALUES (?, ?, ?, ?)",
+                [(source_url, chunk, timestamp, collection) for source_url, chunks in sources for chunk in chunks]
+            )
+        return txn.version
+
+    def replace(self, rows: List[Tuple[str, str, str]], collection: str = DEFAULT_COLLECTION) -> int:
+        """Swap a collection's chunks for (source_url, text, timestamp) rows in one write."""
+        with self.transaction(collection=collection) as txn:
+            txn.conn.execute("DELETE FROM chunks WHERE collection = ?", (collection,))
+            txn.conn.executemany(
+                "INSERT INTO chunks (source_url, text, timestamp, collection) VALUES (?, ?, ?, ?)",
+                [(source_url, text, timestamp, collection) for source_url, text, timestamp in rows]
+            )
+        return txn.version
+
+    def delete_source(self, source_url: str, collection: str = DEFAULT_COLLECTION) -> int:
+        """Remove a source's chunks; returns the collection's new version."""
+        with self.transaction(collection=collection) as txn:
+            txn.conn.execute(
+                "DELETE FROM chunks WHERE collection = ? AND source_url = ?", (collection, source_url)
+            )
+        return txn.version
+
+    def clear(self, collection: str = DEFAULT_COLLECTION) -> int:
+        """Remove every chunk of a collection; returns its new version."""
+        with self.transaction(collection=collection) as txn:
+            txn.conn.execute("DELETE FROM chunks WHERE collection = ?", (collection,))
+        return txn.version
+
+    def collections(self) -> Dict[str, Tuple[int, int]]:
+        """{name: (chunks, sources)} for every non-empty collection."""
+        rows = self._connect().execute(
+            "SELECT collection, COUNT(*), COUNT(DISTINCT source_url) FROM chunks GROUP BY collection"
+        ).fetchall()
+        return {name: (chunks, sources) for name, chunks, sources in rows}
@@ -0,0 +1,49 @@
+"""
+Request coalescing ("single flight") for expensive async work.
+
+While a computation for a key is running, identical requests join it
+instead of starting their own, and every caller receives the same result (or
+the same exception). Nothing is cached: once the computation finishes the
+key is forgotten, so the next request computes afresh. Keys should include
+whatever the result depends on (collection, index version, normalized
+question) so joiners never get an answer they could not have got alone.
+
+The shared computation runs as its own task, shielded from the callers: a
+client that disconnects cancels only its own wait, not the work the other
+callers are waiting for.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from metrics import COALESCED_REQUESTS
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """fn's result, from an identical in-flight call of fn if there is one."""
+        task = self._inflight.get(key)
+        if task is not None:
+            COALESCED_REQUESTS.labels(self.name).inc()
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-collapsed, case-folded text: requests differing only in formatting share a key."""
+    return " ".join(text.split()).casefold()
@@ -0,0 +1,161 @@
+"""
+Versioned binary snapshot files for warm starts and replication.
+
+Layout:
+
+    b"RAGSNAP\\0" | format version (u32 LE) | header length (u32 LE) | header JSON
+    | sections, each starting on a 64-byte boundary
+
+The JSON header names the snapshot kind (what wrote it), free-form metadata,
+and every section's dtype, shape, offset and CRC32. Sections are raw
+little-endian NumPy arrays, so a reader memory-maps the file and views them
+in place: nothing is parsed or copied until it is used, and the page cache
+is shared between processes reading the same file. Lists of strings are
+stored as a UTF-8 blob plus an offsets array.
+
+Files are self-contained and platform-independent; copy them between
+machines as they are.
+"""
+
+import json
+import mmap
+import os
+import struct
+import zlib
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"RAGSNAP\0"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_PREAMBLE = struct.Struct("<8sII")
+
+
+def _padding(position: int) -> int:
+    return -position % ALIGNMENT
+
+
+def pack_strings(strings: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """(offsets, blob) arrays for a list of strings; item i is blob[offsets[i]:offsets[i + 1]]."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def unpack_strings(offsets: np.ndarray, blob: np.ndarray) -> List[str]:
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [data[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+
+
+def write_snapshot(path: str, kind: str, meta: Dict, arrays: Dict[str, np.ndarray]) -> int:
+    """
+    Write arrays (little-endian, C order) and metadata to path atomically;
+    returns the file size.
+    """
+    arrays = {
+        name: np.ascontiguousarray(array, dtype=np.asarray(array).dtype.newbyteorder("<"))
+        for name, array in arrays.items()
+    }
+    sections, offset = {}, 0
+    for name, array in arrays.items():
+        sections[name] = {
+            "dtype": array.dtype.str, "shape": list(array.shape), "offset": offset,
+            "nbytes": array.nbytes, "crc32": zlib.crc32(memoryview(array).cast("B")),
+        }
+        offset += array.nbytes + _padding(array.nbytes)
+    header = json.dumps({"kind": kind, "meta": meta, "sections": sections}).encode("utf-8")
+    data_start = _PREAMBLE.size + len(header)
+    data_start += _padding(data_start)
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        f.write(b"\0" * (data_start - f.tell()))
+        for name, array in arrays.items():
+            f.write(memoryview(array).cast("B"))
+            f.write(b"\0" * _padding(array.nbytes))
+        size = f.tell()
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return size
+
+
+class SnapshotFile:
+    """
+    A memory-mapped snapshot. Arrays are read-only views into the file.
+    With mapped=False the file is read into memory instead and closed right
+    away, so it can be deleted (even on Windows) while the arrays are in use.
+    """
+
+    def __init__(self, path: str, verify: bool = True, mapped: bool = True):
+        self.path = path
+        with open(path, "rb") as f:
+            preamble = f.read(_PREAMBLE.size)
+            if len(preamble) < _PREAMBLE.size:
+                raise ValueError("Not a snapshot file (too short)")
+            magic, version, header_len = _PREAMBLE.unpack(preamble)
+            if magic != MAGIC:
+                raise ValueError("Not a snapshot file")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported snapshot format version {version} (expected {FORMAT_VERSION})")
+            try:
+                header = json.loads(f.read(header_len))
+            except ValueError as e:
+                raise ValueError(f"Corrupt snapshot header: {e}")
+            if mapped:
+                self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                f.seek(0)
+                self._buffer = f.read()
+
+        self.kind: str = header["kind"]
+        self.meta: Dict = header["meta"]
+        self.sections: Dict[str, Dict] = header["sections"]
+        start = _PREAMBLE.size + header_len
+        self._data_start = start + _padding(start)
+        end = max((s["offset"] + s["nbytes"] for s in self.sections.values()), default=0)
+        if self._data_start + end > len(self._buffer):
+            raise ValueError("Truncated snapshot file")
+        if verify:
+            for name in self.sections:
+                self._check(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.sections
+
+    def _view(self, name: str) -> memoryview:
+        section = self.sections[name]
+        start = self._data_start + section["offset"]
+        return memoryview(self._buffer)[start:start + section["nbytes"]]
+
+    def _check(self, name: str):
+        if zlib.crc32(self._view(name)) != self.sections[name]["crc32"]:
+            raise ValueError(f"Snapshot section '{name}' is corrupt (checksum mismatch)")
+
+    def array(self, name: str) -> np.ndarray:
+        if name not in self.sections:
+            raise ValueError(f"Snapshot has no section '{name}'")
+        section = self.sections[name]
+        return np.frombuffer(self._view(name), dtype=np.dtype(section["dtype"])).reshape(section["shape"])
+
+    def strings(self, name: str) -> List[str]:
+        """A string list written as {name}.offsets / {name}.blob."""
+        return unpack_strings(self.array(f"{name}.offsets"), self.array(f"{name}.blob"))
+
+    def nbytes(self) -> int:
+        return len(self._buffer)
+
+
+def string_sections(name: str, strings: Sequence[str]) -> Dict[str, np.ndarray]:
+    offsets, blob = pack_strings(strings)
+    return {f"{name}.offsets": offsets, f"{name}.blob": blob}
+
+
+def iter_batches(n: int, batch_size: int) -> Iterator[slice]:
+    for start in range(0, n, batch_size):
+        yield slice(start, min(n, start + batch_size))
@@ -0,0 +1,75 @@
+import sys
+import os
+import pickle
+import re
+import subprocess
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from analyzer import Analyzer, AnalyzerPool, analyze_corpus, create_analyzer, normalize, simple_analyzer
+
+def shout(text):
+    return text.upper().split()
+
+class TestAnalyzer:
+    def test_simple_matches_original_tokenizer(self):
+        text = "Hello, World! It's 2024_v2."
+        assert simple_analyzer(text) == re.findall(r'\b\w+\b', text.lower())
+
+    def test_normalize(self):
+        assert normalize("Café ＡＢＣ Straße") == "cafe abc strasse"
+
+    def test_stemmed_pipeline(self):
+        analyze = create_analyzer("stemmed")
+        assert analyze("The crawlers were crawling the CAFÉS") == ["crawler", "crawl", "cafe"]
+        assert analyze("crawled") == analyze("crawling")
+
+    def test_standard_keeps_word_forms(self):
+        assert create_analyzer("standard")("The crawlers were crawling") == ["crawlers", "crawling"]
+
+    def test_stem_cache_is_bounded(self):
+        analyze = Analyzer(cache_size=3)
+        analyze("running jumping swimming reading writing")
+        assert len(analyze._stems) <= 3
+
+    def test_picklable_without_cache(self):
+        analyze = Analyzer()
+        analyze("running")
+        copy = pickle.loads(pickle.dumps(analyze))
+        assert copy._stems == {} and copy("running") == ["run"]
+
+    def test_custom_analyzer(self):
+        assert create_analyzer("test_analyzer:shout")("a b") == ["A", "B"]
+        with pytest.raises(ValueError):
+            create_analyzer("snowball")
+
+class TestAnalyzeCorpus:
+    def test_pool_matches_serial(self):
+        analyze = create_analyzer("stemmed")
+        texts = [f"Document {i} describes crawling and indexing pages" for i in range(50)]
+        pool = AnalyzerPool(analyze, processes=2, batch_size=7)
+        try:
+            assert analyze_corpus(analyze, texts, pool, min_parallel=10) == [analyze(t) for t in texts]
+        finally:
+            pool.shutdown()
+
+    def test_workers_do_not_import_main_script(self, tmp_path):
+        # Stands in for `python server2.py`: module-level setup must run once
+        script = tmp_path / "server_main.py"
+        script.write_text(
+            "import os, sys\n"
+            f"sys.path.insert(0, {os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))!r})\n"
+            "with open(os.environ['MARKER'], 'a') as f:\n"
+            "    f.write(__name__ + '\\n')\n"
+            "from analyzer import AnalyzerPool, create_analyzer\n"
+            "if __name__ == '__main__':\n"
+            "    pool = AnalyzerPool(create_analyzer('standard'), processes=2, batch_size=10)\n"
+            "    assert len(pool.map(['The cat sat'] * 100)) == 100\n"
+            "    pool.shutdown()\n"
+        )
+        marker = tmp_path / "imports.txt"
+        subprocess.run([sys.executable, str(script)], check=True, timeout=60, env={**os.environ, "MARKER": str(marker)})
+        assert marker.read_text().split() == ["__main__"]
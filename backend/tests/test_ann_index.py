@@ -0,0 +1,125 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ann_index import FlatIndex, IVFIndex, create_index, rescore
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((20, 32))
+    vectors = centers[rng.integers(0, 20, 2000)] + 0.3 * rng.standard_normal((2000, 32))
+    return [f"id{i}" for i in range(len(vectors))], vectors
+
+class TestFlatIndex:
+    @pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+    def test_finds_itself(self, corpus, dtype):
+        ids, vectors = corpus
+        index = FlatIndex(dtype)
+        index.add(ids, vectors)
+        hits = index.search(vectors[123], k=3)
+        assert hits[0][0] == "id123"
+        assert hits[0][1] == pytest.approx(1.0, abs=0.02)
+        assert [score for _, score in hits] == sorted((score for _, score in hits), reverse=True)
+
+    @pytest.mark.parametrize("dtype", ["float32", "int8"])
+    def test_search_many_matches_search(self, corpus, dtype):
+        ids, vectors = corpus
+        index = FlatIndex(dtype)
+        index.add(ids, vectors)
+        queries = vectors[:10] + 0.1
+        for batch, single in zip(index.search_many(queries, k=5, max_cells=3 * len(ids)), queries):
+            expected = index.search(single, k=5)
+            assert [id_ for id_, _ in batch] == [id_ for id_, _ in expected]
+            assert [score for _, score in batch] == pytest.approx([score for _, score in expected], abs=1e-5)
+
+    def test_quantization_shrinks_memory(self, corpus):
+        ids, vectors = corpus
+        sizes = {}
+        for dtype in ("float32", "float16", "int8"):
+            index = FlatIndex(dtype)
+            index.add(ids, vectors)
+            sizes[dtype] = index.nbytes
+        assert sizes["float16"] == sizes["float32"] // 2
+        assert sizes["int8"] < sizes["float16"]
+
+    def test_remove_and_replace(self, corpus):
+        ids, vectors = corpus
+        index = FlatIndex()
+        index.add(ids[:10], vectors[:10])
+        assert index.remove(["id3", "missing"]) == 1
+        assert len(index) == 9
+        assert "id3" not in [i for i, _ in index.search(vectors[3], k=9)]
+        assert index.search(vectors[9], k=1)[0][0] == "id9"  # Moved into the hole
+        index.add(["id0"], vectors[5:6])
+        assert len(index) == 9
+        assert index.search(vectors[5], k=2)[0][1] == pytest.approx(1.0, abs=1e-5)
+
+    def test_rejects_wrong_dimension(self, corpus):
+        ids, vectors = corpus
+        index = FlatIndex()
+        index.add(ids[:1], vectors[:1])
+        with pytest.raises(ValueError):
+            index.add(["x"], np.ones((1, 8)))
+
+    def test_pca_reduces_after_sample_and_rescoring_restores_recall(self, corpus):
+        ids, vectors = corpus
+        index = FlatIndex("int8", pca_dim=24, pca_sample=1000)
+        index.add(ids[:500], vectors[:500])
+        assert index.components is None and index.dim == 32
+        index.add(ids[500:], vectors[500:])  # Fits, and re-encodes the first 500 too
+        assert index.dim == 24 and index.lossy
+        assert index.nbytes == 2000 * (24 + 4) + index.components.nbytes
+        full = dict(zip(ids, vectors))
+        exact = FlatIndex()
+        exact.add(ids, vectors)
+        hits = reduced_hits = total = 0
+        for i in range(0, 2000, 100):
+            expected = {id_ for id_, _ in exact.search(vectors[i], k=5)}
+            found = rescore(vectors[i], index.search(vectors[i], k=20), full, 5)
+            assert [score for _, score in found] == sorted((score for _, score in found), reverse=True)
+            hits += len(expected & {id_ for id_, _ in found})
+            reduced_hits += len(expected & {id_ for id_, _ in index.search(vectors[i], k=5)})
+            total += 5
+        assert hits / total >= 0.95 > reduced_hits / total
+
+class TestIVFIndex:
+    def test_trains_and_keeps_recall(self, corpus):
+        ids, vectors = corpus
+        exact = FlatIndex()
+        exact.add(ids, vectors)
+        index = IVFIndex(nlist=16, nprobe=4, min_train_per_list=10)
+        index.add(ids, vectors)
+        assert index.centroids is not None
+        hits = total = 0
+        for i in range(0, 2000, 100):
+            expected = {id_ for id_, _ in exact.search(vectors[i], k=5)}
+            hits += len(expected & {id_ for id_, _ in index.search(vectors[i], k=5)})
+            total += 5
+        assert hits / total >= 0.9
+
+    def test_searches_exhaustively_before_training(self, corpus):
+        ids, vectors = corpus
+        index = IVFIndex(nlist=16)
+        index.add(ids[:50], vectors[:50])
+        assert index.centroids is None
+        assert index.search(vectors[7], k=1)[0][0] == "id7"
+
+    def test_trains_in_reduced_space(self, corpus):
+        ids, vectors = corpus
+        index = IVFIndex(nlist=16, min_train_per_list=10, pca_dim=8, pca_sample=1500)
+        index.add(ids[:1000], vectors[:1000])
+        assert index.centroids is None  # Waits for the projection
+        index.add(ids[1000:], vectors[1000:])
+        assert index.centroids.shape == (16, 8)
+        assert index.search(vectors[7], k=1)[0][0] == "id7"
+
+    def test_create_index(self):
+        assert isinstance(create_index("ivf", "int8"), IVFIndex)
+        with pytest.raises(ValueError):
+            create_index("hnsw")
@@ -0,0 +1,76 @@
+import sys
+import os
+import random
+
+import numpy as np
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bm25_index import BM25Index, top_k
+from snapshot_file import SnapshotFile, string_sections, write_snapshot
+
+rank_bm25 = pytest.importorskip("rank_bm25")
+
+def make_corpus(docs=200, seed=3):
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(300)] + ["common"] * 50
+    return [[rng.choice(words) for _ in range(rng.randint(1, 40))] for _ in range(docs)]
+
+class TestBM25Index:
+    def test_scores_match_bm25okapi(self):
+        corpus = make_corpus()
+        index = BM25Index.from_corpus(corpus)
+        reference = rank_bm25.BM25Okapi(corpus)
+        for query in (["w1", "w2"], ["common"], ["w5", "w5", "unknown"], []):
+            assert np.array_equal(index.get_scores(query), reference.get_scores(query))
+
+    def test_postings_are_sorted_by_document(self):
+        index = BM25Index.from_corpus([["a", "b"], ["b"], ["a", "a"]])
+        a = index.vocabulary["a"]
+        postings = index.doc_ids[index.offsets[a]:index.offsets[a + 1]]
+        assert postings.tolist() == [0, 2]
+        assert index.tfs[index.offsets[a]:index.offsets[a + 1]].tolist() == [1, 2]
+        assert len(index) == 3
+
+    def test_empty_corpus(self):
+        index = BM25Index.from_corpus([])
+        assert len(index) == 0
+        assert index.get_scores(["a"]).tolist() == []
+
+    def test_snapshot_round_trip(self, tmp_path):
+        corpus = make_corpus()
+        index = BM25Index.from_corpus(corpus, k1=1.2, b=0.7)
+        path = str(tmp_path / "bm25.ragsnap")
+        write_snapshot(path, "bm25", index.params(), {**index.arrays(), **string_sections("terms", index.terms)})
+        
+        snap = SnapshotFile(path)
+        loaded = BM25Index(
+            snap.strings("terms"), snap.array("offsets"), snap.array("doc_ids"),
+            snap.array("tfs"), snap.array("doc_len"), **snap.meta
+        )
+        query = ["w10", "common", "w200"]
+        assert np.array_equal(loaded.get_scores(query), index.get_scores(query))
+
+    def test_top_k_matches_stable_sort(self):
+        rng = random.Random(5)
+        for _ in range(50):
+            scores = np.array([rng.choice([0.0, 0.5, 1.0, 2.0]) for _ in range(rng.randint(1, 30))])
+            expected = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+            for k in (1, 3, len(scores), len(scores) + 2):
+                assert top_k(scores, k).tolist() == expected[:k]
+
+    def test_search(self):
+        index = BM25Index.from_corpus([["a"], ["b", "c"], ["b"]])
+        hits = index.search(["b"], 2)
+        assert [doc for doc, _ in hits] == [2, 1]  # Shorter document first
+        assert hits[0][1] > hits[1][1] > 0
+
+    def test_search_many_matches_search(self):
+        corpus = make_corpus()
+        index = BM25Index.from_corpus(corpus)
+        rng = random.Random(7)
+        queries = [[rng.choice(["common", "w1", "w2", "w3", "unknown"]) for _ in range(3)] for _ in range(30)] + [[]]
+        # Small batches, so some are split and common terms become dense rows
+        assert index.search_many(queries, 5, max_cells=len(corpus) * 4) == [index.search(q, 5) for q in queries]
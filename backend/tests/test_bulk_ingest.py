@@ -0,0 +1,72 @@
+import sys
+import os
+import gzip
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bulk_ingest import (
+    SitemapEntry, collect_sitemap, decode_text, extract_upload, parse_sitemap, upload_kind, upload_source
+)
+
+URLSET = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://a.com/one</loc><lastmod>2024-05-01</lastmod></url>
+  <url><loc> https://a.com/two </loc></url>
+  <url><lastmod>2024-05-01</lastmod></url>
+</urlset>"""
+
+INDEX = b"""<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://a.com/pages.xml</loc></sitemap>
+</sitemapindex>"""
+
+class TestSitemaps:
+    def test_parses_urlset(self):
+        pages, nested = parse_sitemap(URLSET)
+        assert pages == [SitemapEntry("https://a.com/one", "2024-05-01"), SitemapEntry("https://a.com/two")]
+        assert nested == []
+
+    def test_parses_gzipped_index(self):
+        pages, nested = parse_sitemap(gzip.compress(INDEX))
+        assert pages == []
+        assert nested == ["https://a.com/pages.xml"]
+
+    def test_rejects_invalid_xml(self):
+        with pytest.raises(ValueError):
+            parse_sitemap(b"<urlset><url>")
+
+    def test_collect_follows_index_and_caps(self):
+        docs = {"https://a.com/sitemap.xml": INDEX, "https://a.com/pages.xml": URLSET}
+        fetched = []
+
+        def fetch(url):
+            fetched.append(url)
+            return docs.get(url)
+
+        entries = collect_sitemap(fetch, "https://a.com/sitemap.xml", max_urls=1)
+        assert [e.url for e in entries] == ["https://a.com/one"]
+        assert fetched == ["https://a.com/sitemap.xml", "https://a.com/pages.xml"]
+
+class TestUploads:
+    def test_kind_from_extension_or_content_type(self):
+        assert upload_kind("report.PDF", None) == "pdf"
+        assert upload_kind("notes", "text/plain; charset=utf-8") == "text"
+        assert upload_kind("image.png", "image/png") is None
+
+    def test_extracts_text_and_html(self):
+        assert extract_upload("a.txt", None, "café".encode("latin-1")) == ("text", "caf�")
+        assert extract_upload("a.html", None, b"<p>hi</p>") == ("html", "<p>hi</p>")
+
+    def test_decode_uses_charset(self):
+        assert decode_text("café".encode("latin-1"), "text/plain; charset=latin-1") == "café"
+
+    def test_rejects_unsupported_and_broken_files(self):
+        with pytest.raises(ValueError):
+            extract_upload("a.exe", "application/octet-stream", b"MZ")
+        with pytest.raises(ValueError):
+            extract_upload("a.pdf", None, b"not a pdf")
+
+    def test_upload_source(self):
+        assert upload_source("/tmp/dir/report.pdf") == "upload://report.pdf"
@@ -0,0 +1,62 @@
+import sys
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from chunking import chunk_blocks, count_tokens, iter_blocks, split_sentences
+
+class TestIterBlocks:
+    def test_nested_blocks_not_duplicated(self):
+        soup = BeautifulSoup(
+            "<article><h1>Title</h1><p>First para.</p><section><p>Second para.</p></section></article>",
+            "html.parser"
+        )
+        assert list(iter_blocks(soup)) == ["Title", "First para.", "Second para."]
+
+    def test_leaf_container_is_a_block(self):
+        soup = BeautifulSoup("<section>Plain   section\ttext</section>", "html.parser")
+        assert list(iter_blocks(soup)) == ["Plain section text"]
+
+class TestSplitSentences:
+    def test_splits_on_terminal_punctuation(self):
+        assert split_sentences("One here. Two there! Three?") == ["One here.", "Two there!", "Three?"]
+
+    def test_does_not_split_decimals(self):
+        assert split_sentences("Pi is 3.14 roughly.") == ["Pi is 3.14 roughly."]
+
+class TestChunkBlocks:
+    def test_small_blocks_are_merged(self):
+        blocks = ["Alpha beta gamma.", "Delta epsilon zeta.", "Eta theta iota."]
+        chunks = list(chunk_blocks(blocks, target_tokens=50, overlap_tokens=5, min_tokens=1))
+        assert chunks == ["Alpha beta gamma. Delta epsilon zeta. Eta theta iota."]
+
+    def test_large_block_split_near_target(self):
+        block = " ".join(f"Sentence number {i} is here." for i in range(100))
+        chunks = list(chunk_blocks([block], target_tokens=30, overlap_tokens=6, min_tokens=1))
+        assert len(chunks) > 1
+        assert all(count_tokens(c) <= 30 for c in chunks)
+        # Every chunk ends on a sentence boundary
+        assert all(c.endswith(".") for c in chunks)
+
+    def test_overlap_carries_previous_sentence(self):
+        block = "Aaa bbb ccc. Ddd eee fff. Ggg hhh iii. Jjj kkk lll."
+        chunks = list(chunk_blocks([block], target_tokens=8, overlap_tokens=4, min_tokens=1))
+        assert chunks[0] == "Aaa bbb ccc. Ddd eee fff."
+        assert chunks[1].startswith("Ddd eee fff.")
+
+    def test_overlong_sentence_hard_split(self):
+        block = " ".join(["word"] * 50)
+        chunks = list(chunk_blocks([block], target_tokens=20, overlap_tokens=0, min_tokens=1))
+        assert all(count_tokens(c) <= 20 for c in chunks)
+        assert sum(count_tokens(c) for c in chunks) == 50
+
+    def test_tiny_page_dropped(self):
+        assert list(chunk_blocks(["Hi."], min_tokens=10)) == []
+
+    def test_invalid_overlap(self):
+        with pytest.raises(ValueError):
+            list(chunk_blocks(["x"], target_tokens=10, overlap_tokens=10))
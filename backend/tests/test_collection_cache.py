@@ -0,0 +1,54 @@
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from collection_cache import CollectionCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestCollectionCache:
+    def test_loads_once(self):
+        cache = CollectionCache(capacity=2)
+        loads = []
+        for _ in range(3):
+            cache.get("a", lambda: loads.append("a") or "index-a")
+        assert loads == ["a"]
+        assert cache.peek("a") == "index-a"
+
+    def test_evicts_least_recently_used(self):
+        cache = CollectionCache(capacity=2)
+        cache.get("a", lambda: "a")
+        cache.get("b", lambda: "b")
+        cache.get("a", lambda: "a")
+        cache.get("c", lambda: "c")
+        assert "b" not in cache
+        assert [name for name, _ in cache.items()] == ["a", "c"]
+
+    def test_evicts_idle(self):
+        clock = FakeClock()
+        cache = CollectionCache(capacity=8, idle_ttl=10, clock=clock)
+        cache.get("a", lambda: "a")
+        clock.now = 5
+        cache.get("b", lambda: "b")
+        clock.now = 12
+        assert cache.evict_idle() == 1
+        assert "a" not in cache and "b" in cache
+
+    def test_keeps_busy_collections(self):
+        cache = CollectionCache(capacity=1, can_evict=lambda value: value != "busy")
+        cache.get("a", lambda: "busy")
+        cache.get("b", lambda: "b")
+        assert "a" in cache and "b" in cache
+
+    def test_zero_capacity_never_evicts(self):
+        cache = CollectionCache(capacity=0, idle_ttl=1)
+        for name in "abc":
+            cache.get(name, lambda: name)
+        assert len(cache) == 3
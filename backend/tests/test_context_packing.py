@@ -0,0 +1,56 @@
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from chunking import count_tokens
+from context_packing import pack_context, truncate
+
+PASSAGES = [
+    ("The office opens at nine. Parking is free on weekends. The cafeteria serves lunch until two.", "https://a.com/visit"),
+    ("Refunds are issued within 14 days. Contact support to request a refund. Our logo is blue.", "https://a.com/refunds"),
+    ("Parking permits cost 20 dollars. The building has three floors.", "https://a.com/visit"),
+]
+
+class TestPackContext:
+    def test_keeps_relevant_sentences_within_budget(self):
+        packed = pack_context("How are refunds issued and how do I request a refund?", PASSAGES, budget_tokens=20)
+        assert "Refunds are issued within 14 days." in packed.text
+        assert "Contact support to request a refund." in packed.text
+        assert "cafeteria" not in packed.text
+        assert packed.tokens <= 20
+        assert packed.sentences_kept < packed.sentences_total
+
+    def test_citations_map_numbers_to_sources(self):
+        packed = pack_context("Where is parking and what does a permit cost?", PASSAGES, budget_tokens=40)
+        assert packed.citations == ["https://a.com/visit"]
+        # Sentences from both chunks of one source share a number, in original order
+        assert packed.text.startswith("[1] Parking is free on weekends.")
+        assert "Parking permits cost 20 dollars." in packed.text
+
+    def test_large_budget_keeps_everything(self):
+        packed = pack_context("anything", PASSAGES, budget_tokens=10_000)
+        assert packed.sentences_kept == packed.sentences_total == 8
+        assert packed.citations == ["https://a.com/visit", "https://a.com/refunds"]
+        assert packed.text.split("\n\n")[1].startswith("[2] Refunds")
+
+    def test_uses_given_token_counter(self):
+        chars = lambda text: len(text)
+        packed = pack_context("refund", PASSAGES, budget_tokens=45, count=chars)
+        assert packed.text == "[1] Contact support to request a refund."
+
+    def test_oversized_sentence_is_truncated(self):
+        long_passage = [("refund " + "word " * 200, "https://a.com/long")]
+        packed = pack_context("refund", long_passage, budget_tokens=30)
+        assert 0 < packed.tokens <= 30
+        assert packed.citations == ["https://a.com/long"]
+
+    def test_empty(self):
+        packed = pack_context("refund", [], budget_tokens=100)
+        assert packed.text == "" and packed.citations == []
+
+class TestTruncate:
+    def test_word_prefix(self):
+        assert truncate("one two three four", 2) == "one two"
+        assert count_tokens(truncate("a, b, c, d", 3)) <= 3
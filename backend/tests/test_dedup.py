@@ -0,0 +1,86 @@
+import sys
+import os
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dedup import NearDuplicateFilter, simhash, hamming_distance
+
+ARTICLE = (
+    "The quick brown fox jumps over the lazy dog while the farmer watches "
+    "from the porch and wonders why the dog never seems to chase anything at all"
+)
+
+class TestSimHash:
+    def test_identical_text_same_fingerprint(self):
+        tokens = ARTICLE.lower().split()
+        assert simhash(tokens) == simhash(list(tokens))
+
+    def test_small_edit_is_close(self):
+        a = simhash(ARTICLE.lower().split())
+        b = simhash((ARTICLE + " today").lower().split())
+        assert hamming_distance(a, b) <= 6
+
+class TestNearDuplicateFilter:
+    def test_exact_duplicates_dropped(self):
+        dedup = NearDuplicateFilter()
+        kept, report = dedup.filter(["Accept all cookies", "  accept ALL cookies ", "Hello"])
+        assert kept == ["Accept all cookies", "Hello"]
+        assert report.exact_duplicates == 1
+        assert report.bytes_saved == len("  accept ALL cookies ")
+
+    def test_near_duplicates_dropped(self):
+        dedup = NearDuplicateFilter(threshold=0.9)
+        kept, report = dedup.filter([ARTICLE, ARTICLE + " today"])
+        assert kept == [ARTICLE]
+        assert report.near_duplicates == 1
+        assert report.to_dict()["chunks_dropped"] == 1
+
+    def test_distinct_text_kept(self):
+        dedup = NearDuplicateFilter()
+        other = "Python is a high level general purpose programming language with dynamic typing and garbage collection"
+        kept, report = dedup.filter([ARTICLE, other])
+        assert len(kept) == 2
+        assert report.chunks_dropped == 0
+
+    def test_remembers_across_calls_until_reset(self):
+        dedup = NearDuplicateFilter()
+        dedup.add([ARTICLE])
+        kept, _ = dedup.filter([ARTICLE])
+        assert kept == []
+
+        dedup.reset()
+        kept, _ = dedup.filter([ARTICLE])
+        assert kept == [ARTICLE]
+
+    def test_filter_without_recording(self):
+        dedup = NearDuplicateFilter()
+        kept, report = dedup.filter([ARTICLE, ARTICLE], record=False)
+        assert kept == [ARTICLE] and report.exact_duplicates == 1
+        assert len(dedup) == 0  # Nothing remembered until add()
+        assert dedup.filter([ARTICLE], record=False)[0] == [ARTICLE]
+        dedup.add(kept)
+        assert dedup.filter([ARTICLE])[0] == []
+
+    def test_text_of_extracts_content(self):
+        dedup = NearDuplicateFilter()
+        items = [{"text": "same"}, {"text": "same"}]
+        kept, _ = dedup.filter(items, text_of=lambda item: item["text"])
+        assert kept == [{"text": "same"}]
+
+    def test_invalid_threshold(self):
+        with pytest.raises(ValueError):
+            NearDuplicateFilter(threshold=0)
+
+    def test_state_round_trip(self):
+        dedup = NearDuplicateFilter()
+        dedup.add([ARTICLE, "Accept all cookies"])
+        
+        restored = NearDuplicateFilter()
+        restored.load_state(*dedup.export_state())
+        kept, report = restored.filter(["accept all cookies", ARTICLE + " today", "Hello"])
+        assert kept == ["Hello"]
+        assert report.exact_duplicates == 1
+        assert report.near_duplicates == 1
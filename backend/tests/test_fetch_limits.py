@@ -0,0 +1,56 @@
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fetch_limits import CrawlBudget, PageDecoder, header_charset, is_html, sniff_charset
+
+def feed_all(decoder, data, size=7):
+    for start in range(0, len(data), size):
+        if not decoder.feed(data[start:start + size]):
+            break
+    return decoder.text()
+
+class TestContentType:
+    def test_is_html(self):
+        assert is_html("text/html; charset=UTF-8")
+        assert is_html("application/xhtml+xml")
+        assert not is_html("application/pdf")
+        assert not is_html(None)
+
+    def test_charsets(self):
+        assert header_charset('text/html; charset="ISO-8859-1"') == "ISO-8859-1"
+        assert header_charset("text/html") is None
+        assert sniff_charset(b'<html><head><meta charset="windows-1252">') == "windows-1252"
+        assert sniff_charset(b'<meta http-equiv="Content-Type" content="text/html; charset=koi8-r">') == "koi8-r"
+        assert sniff_charset(b"<html>") == "utf-8"
+
+class TestPageDecoder:
+    def test_multibyte_split_across_chunks(self):
+        text = "naïve café – ünïcödé " * 100
+        assert feed_all(PageDecoder("text/html; charset=utf-8", 10**6), text.encode("utf-8")) == text
+
+    def test_sniffs_meta_charset(self):
+        page = "<meta charset='cp1252'><p>Café</p>" + " " * 2000
+        assert "Café" in feed_all(PageDecoder("text/html", 10**6), page.encode("cp1252"))
+
+    def test_short_page_without_charset(self):
+        assert feed_all(PageDecoder("text/html", 10**6), "<p>héllo</p>".encode("utf-8")) == "<p>héllo</p>"
+
+    def test_unknown_charset_falls_back(self):
+        assert feed_all(PageDecoder("text/html; charset=bogus", 100), b"<p>ok</p>") == "<p>ok</p>"
+
+    def test_page_cap_truncates(self):
+        decoder = PageDecoder("text/html; charset=utf-8", 20)
+        assert feed_all(decoder, b"x" * 100) == "x" * 20
+        assert decoder.truncated and decoder.received == 20
+
+class TestCrawlBudget:
+    def test_budget_shared_across_pages(self):
+        budget = CrawlBudget(30)
+        first = PageDecoder("text/html; charset=utf-8", 20, budget)
+        assert feed_all(first, b"a" * 20) == "a" * 20 and not first.truncated
+        second = PageDecoder("text/html; charset=utf-8", 20, budget)
+        assert feed_all(second, b"b" * 20) == "b" * 10 and second.truncated
+        assert budget.exhausted and budget.take(5) == 0
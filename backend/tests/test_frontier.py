@@ -0,0 +1,74 @@
+import sys
+import os
+from datetime import datetime, timezone
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bulk_ingest import SitemapEntry
+from frontier import CrawlFrontier, canonicalize, discover_sitemaps, is_crawlable
+
+NOW = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+def drain(frontier):
+    urls = []
+    while frontier:
+        urls.append(frontier.pop())
+    return urls
+
+class TestCanonicalize:
+    def test_drops_fragment_and_tracking(self):
+        assert canonicalize("HTTPS://A.com/x?b=2&utm_source=t&a=1#top") == "https://a.com/x?a=1&b=2"
+
+    def test_skips_binaries(self):
+        assert is_crawlable("https://a.com/docs/v1.2/intro")
+        assert not is_crawlable("https://a.com/files/report.PDF")
+
+class TestCrawlFrontier:
+    def test_seed_first_then_best(self):
+        frontier = CrawlFrontier("https://a.com/docs/", now=NOW)
+        assert frontier.pop() == "https://a.com/docs/"
+        frontier.push_links("https://a.com/docs/", ["/login", "/tag/news", "intro", "/about", "intro?page=2"])
+        order = drain(frontier)
+        assert order[0] == "https://a.com/docs/intro"
+        assert order.index("https://a.com/about") < order.index("https://a.com/login")
+        assert order.index("https://a.com/docs/intro?page=2") < order.index("https://a.com/login")
+        assert set(order[-2:]) == {"https://a.com/tag/news", "https://a.com/login"}
+
+    def test_variants_fetched_once(self):
+        frontier = CrawlFrontier("https://a.com/", now=NOW)
+        frontier.pop()
+        frontier.push_links("https://a.com/", ["/p#a", "/p#b", "/p?utm_campaign=x", "https://other.com/p"])
+        assert drain(frontier) == ["https://a.com/p"]
+        frontier.push_links("https://a.com/q", ["/p"])  # Already crawled
+        assert not frontier
+
+    def test_inlinks_raise_priority(self):
+        frontier = CrawlFrontier("https://a.com/", now=NOW)
+        frontier.pop()
+        frontier.push_links("https://a.com/", ["/rare", "/popular"])
+        frontier.push_links("https://a.com/x", ["/popular"])
+        frontier.push_links("https://a.com/y", ["/popular"])
+        assert frontier.pop() == "https://a.com/popular"
+
+    def test_sitemap_pages_ranked_by_freshness(self):
+        frontier = CrawlFrontier("https://a.com/", now=NOW)
+        frontier.pop()
+        frontier.push_links("https://a.com/", ["/linked"])
+        added = frontier.add_sitemap([
+            SitemapEntry("https://a.com/old", "2019-01-01"),
+            SitemapEntry("https://a.com/fresh", "2024-05-20T10:00:00Z"),
+            SitemapEntry("https://elsewhere.com/x"),
+        ])
+        assert added == 2
+        assert drain(frontier) == ["https://a.com/fresh", "https://a.com/old", "https://a.com/linked"]
+
+class TestDiscoverSitemaps:
+    def test_reads_robots(self):
+        robots = b"User-agent: *\nDisallow: /private\nSitemap: https://a.com/s1.xml\nsitemap: https://a.com/s2.xml\n"
+        assert discover_sitemaps("https://a.com/docs/", lambda url: robots) == [
+            "https://a.com/s1.xml", "https://a.com/s2.xml"
+        ]
+
+    def test_falls_back_to_sitemap_xml(self):
+        assert discover_sitemaps("https://a.com/docs/", lambda url: None) == ["https://a.com/sitemap.xml"]
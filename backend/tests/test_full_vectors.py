@@ -0,0 +1,54 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from full_vectors import FullVectorStore
+
+@pytest.fixture
+def store(tmp_path):
+    return FullVectorStore(str(tmp_path / "full_vectors.sqlite3"))
+
+class TestFullVectorStore:
+    def test_put_and_get(self, store):
+        vectors = np.arange(12, dtype=np.float64).reshape(3, 4)
+        store.put("docs", ["a", "b", "c"], vectors)
+        found = store.get("docs", ["c", "a", "missing"])
+        assert set(found) == {"a", "c"}
+        assert found["c"].dtype == np.float32
+        assert found["c"].tolist() == [8.0, 9.0, 10.0, 11.0]
+        assert store.get("other", ["a"]) == {}
+
+    def test_put_replaces(self, store):
+        store.put("docs", ["a"], [[1.0, 2.0]])
+        store.put("docs", ["a"], [[3.0, 4.0]])
+        assert store.get("docs", ["a"])["a"].tolist() == [3.0, 4.0]
+
+    def test_pages_cover_collection(self, store):
+        ids = [f"id{i:03d}" for i in range(25)]
+        store.put("docs", ids, np.eye(25, dtype=np.float32))
+        store.put("other", ["x"], [[0.0] * 25])
+        pages = list(store.pages("docs", page_size=10))
+        assert [len(page_ids) for page_ids, _ in pages] == [10, 10, 5]
+        assert [id_ for page_ids, _ in pages for id_ in page_ids] == ids
+        assert pages[0][1].shape == (10, 25)
+
+    def test_delete_and_drop(self, store):
+        store.put("docs", ["a", "b"], [[1.0], [2.0]])
+        store.put("other", ["a"], [[3.0]])
+        store.delete("docs", ["a"])
+        assert set(store.get("docs", ["a", "b"])) == {"b"}
+        store.drop("docs")
+        assert store.get("docs", ["b"]) == {}
+        assert set(store.get("other", ["a"])) == {"a"}
+
+    def test_rename_replaces_target(self, store):
+        store.put("docs", ["old"], [[1.0]])
+        store.put("staging", ["new"], [[2.0]])
+        store.rename("staging", "docs")
+        assert set(store.get("docs", ["old", "new"])) == {"new"}
+        assert store.get("staging", ["new"]) == {}
@@ -0,0 +1,45 @@
+import sys
+import os
+import asyncio
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from loop_monitor import LoopLagMonitor
+
+def block_the_loop(seconds):
+    time.sleep(seconds)
+
+class TestLoopLagMonitor:
+    def test_reports_blocking_call_while_blocked(self):
+        reports = []
+        monitor = LoopLagMonitor(interval=0.01, threshold=0.05, on_block=lambda s, stack: reports.append((s, stack)))
+        
+        async def main():
+            monitor.start()
+            await asyncio.sleep(0.05)
+            block_the_loop(0.3)
+            await asyncio.sleep(0.05)
+            await monitor.stop()
+        
+        asyncio.run(main())
+        assert len(reports) == 1  # One stall, reported once
+        seconds, stack = reports[0]
+        assert 0.05 <= seconds < 0.3
+        assert "block_the_loop" in stack
+        assert monitor.max_lag >= 0.25
+
+    def test_quiet_loop_reports_nothing(self):
+        reports = []
+        monitor = LoopLagMonitor(interval=0.01, threshold=0.1, on_block=lambda s, stack: reports.append(s))
+        
+        async def main():
+            monitor.start()
+            for _ in range(10):
+                await asyncio.sleep(0.01)
+            await monitor.stop()
+        
+        asyncio.run(main())
+        assert reports == []
+        assert monitor.max_lag < 0.1
@@ -0,0 +1,34 @@
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import metrics
+from metrics import _NoopMetric, render_metrics, stage_timer, timed, track_executor_queue
+
+class TestMetrics:
+    def test_noop_metric_accepts_everything(self):
+        m = _NoopMetric()
+        m.labels("x").inc()
+        m.set(3)
+        m.observe(0.1)
+        with m.labels("x").time():
+            pass
+
+    def test_timed_returns_result(self):
+        assert timed("test_stage", lambda a, b=0: a + b, 1, b=2) == 3
+
+    @pytest.mark.skipif(not metrics.PROMETHEUS_AVAILABLE, reason="prometheus-client not installed")
+    def test_stage_latency_rendered(self):
+        with stage_timer("unit_test"):
+            pass
+        track_executor_queue("unit_test", ThreadPoolExecutor(max_workers=1))
+        body, content_type = render_metrics()
+        text = body.decode()
+        assert 'rag_stage_seconds_count{stage="unit_test"}' in text
+        assert 'rag_executor_queue_depth{executor="unit_test"} 0.0' in text
+        assert content_type.startswith("text/plain")
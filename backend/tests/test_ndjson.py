@@ -0,0 +1,73 @@
+import sys
+import os
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ndjson import BodyTooLarge, QueryTooLong, encode_lines, parse_query, read_queries, stream_ndjson
+
+async def body(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+async def collect(stream):
+    return [piece async for piece in stream]
+
+class TestQueries:
+    def test_parse_query(self):
+        assert parse_query("  what is x?  ", 3) == (3, "what is x?")
+        assert parse_query('{"id": "q7", "query": "pricing"}', 1) == ("q7", "pricing")
+        assert parse_query('{"question": "why"}', 2) == (2, "why")
+        assert parse_query("   ", 4) is None
+
+    def test_parse_query_rejects_bad_json(self):
+        with pytest.raises(ValueError, match="Line 5"):
+            parse_query('{"query": ', 5)
+        with pytest.raises(ValueError, match="query"):
+            parse_query('{"id": 1}', 6)
+
+    def test_read_queries_across_chunk_boundaries(self):
+        queries = asyncio.run(read_queries(body(b"first qu", b"ery\n\n{\"id\": \"b\", \"qu", b"ery\": \"second\"}\nthird"), 10, 100, 1000))
+        assert queries == [(1, "first query"), ("b", "second"), (4, "third")]
+
+    def test_read_queries_limit(self):
+        with pytest.raises(ValueError, match="At most 2"):
+            asyncio.run(read_queries(body(b"a\nb\nc\n"), 2, 100, 1000))
+
+    def test_read_queries_rejects_oversized_line(self):
+        # A newline-free body is cut off at the line cap, not buffered whole
+        chunks = (b"x" * 1024 for _ in range(1000))
+        with pytest.raises(BodyTooLarge, match="Line 1"):
+            asyncio.run(read_queries(body(*chunks), 10, 100, 10 ** 9, max_line_bytes=4096))
+
+    def test_read_queries_caps_body_and_query_length(self):
+        with pytest.raises(BodyTooLarge, match="limited to 10 bytes"):
+            asyncio.run(read_queries(body(b"a\nb\n", b"c\nd\ne\nf\n"), 10, 100, 10))
+        with pytest.raises(QueryTooLong, match="Line 2"):
+            asyncio.run(read_queries(body(b"short\n" + b"y" * 101 + b"\n"), 10, 100, 1000))
+
+class TestStream:
+    def test_stream_is_lazy_and_line_delimited(self):
+        produced = []
+        
+        def batches():
+            for i in range(3):
+                produced.append(i)
+                yield [{"n": i, "text": "é"}]
+        
+        async def main(executor):
+            stream = stream_ndjson(batches(), executor)
+            first = await stream.__anext__()
+            assert produced == [0]  # Nothing made ahead of the client
+            return [first] + await collect(stream)
+        
+        with ThreadPoolExecutor(1) as executor:
+            pieces = asyncio.run(main(executor))
+        lines = b"".join(pieces).decode("utf-8").splitlines()
+        assert [json.loads(line)["n"] for line in lines] == [0, 1, 2]
+        assert encode_lines([{"text": "é"}]) == '{"text": "é"}\n'.encode("utf-8")
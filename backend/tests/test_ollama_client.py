@@ -0,0 +1,123 @@
+import sys
+import os
+import asyncio
+import json
+
+import httpx
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ollama_client import CircuitBreaker, CircuitOpenError, OllamaClient
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=FakeClock())
+        breaker.record_failure()
+        assert breaker.state == "closed"
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert not breaker.allow()
+
+    def test_success_resets_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, clock=FakeClock())
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == "closed"
+
+    def test_half_open_single_trial(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        assert breaker.state == "half_open"
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert breaker.retry_after() == 10
+        clock.now = 20
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+def make_client(handler, **kwargs):
+    client = OllamaClient("http://ollama.test", **kwargs)
+    transport = httpx.MockTransport(handler)
+    client.http = httpx.Client(base_url=client.base_url, transport=transport)
+    client.async_http = httpx.AsyncClient(base_url=client.base_url, transport=transport)
+    return client
+
+class TestOllamaClient:
+    def test_fails_fast_when_open(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request.url.path)
+            return httpx.Response(503)
+
+        client = make_client(handler, breaker=CircuitBreaker(failure_threshold=2))
+        for _ in range(2):
+            with pytest.raises(httpx.HTTPStatusError):
+                client.embed("m", "text")
+        with pytest.raises(CircuitOpenError):
+            client.embed("m", "text")
+        assert len(calls) == 2
+
+    def test_client_errors_do_not_trip(self):
+        client = make_client(lambda request: httpx.Response(404, json={}), breaker=CircuitBreaker(failure_threshold=1))
+        with pytest.raises(httpx.HTTPStatusError):
+            client.generate("m", "prompt")
+        assert client.breaker.state == "closed"
+
+    def test_health_is_cached(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request.url.path)
+            return httpx.Response(200, json={"version": "x"})
+
+        client = make_client(handler, health_ttl=60)
+
+        async def probe():
+            return [await client.is_healthy() for _ in range(5)]
+
+        assert asyncio.run(probe()) == [True] * 5
+        assert calls == ["/api/version"]
+
+    def test_chat_payload(self):
+        def handler(request):
+            assert request.url.path == "/api/chat"
+            return httpx.Response(200, json={"message": {"role": "assistant", "content": "hi"}})
+
+        client = make_client(handler)
+        assert client.chat("m", [{"role": "user", "content": "hello"}]) == "hi"
+
+    def test_generate_continues_context(self):
+        def handler(request):
+            payload = json.loads(request.content)
+            assert request.url.path == "/api/generate"
+            assert payload["context"] == [1, 2, 3]
+            assert payload["keep_alive"] == "30m"
+            return httpx.Response(200, json={"response": "more", "context": [1, 2, 3, 4, 5]})
+
+        client = make_client(handler)
+        answer, context = client.generate_with_context("m", "and then?", [1, 2, 3], keep_alive="30m")
+        assert (answer, context) == ("more", [1, 2, 3, 4, 5])
+
+    def test_embed_many_keeps_order(self):
+        def handler(request):
+            prompt = json.loads(request.content)["prompt"]
+            return httpx.Response(200, json={"embedding": [float(len(prompt))]})
+
+        client = make_client(handler)
+        assert client.embed_many("m", ["a", "bbb", "cc"]) == [[1.0], [3.0], [2.0]]
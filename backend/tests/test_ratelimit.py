@@ -0,0 +1,96 @@
+import sys
+import os
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ratelimit import (
+    RateLimiter, RateLimitBackend, InMemoryBackend, SQLiteBackend, RedisBackend, InMemoryRedis, create_backend
+)
+
+@pytest.fixture(params=["memory", "sqlite", "fakeredis"])
+def limiter(request, tmp_path):
+    if request.param == "memory":
+        backend = InMemoryBackend()
+    elif request.param == "sqlite":
+        backend = SQLiteBackend(str(tmp_path / "rl.sqlite3"))
+    else:
+        backend = RedisBackend(InMemoryRedis())
+    return RateLimiter(backend)
+
+class TestRateLimiter:
+    def test_allows_up_to_limit(self, limiter):
+        now = 1000.0
+        results = [limiter.hit("ip", 3, 60, now=now)[0] for _ in range(4)]
+        assert results == [True, True, True, False]
+
+    def test_rejection_reports_retry_after(self, limiter):
+        for _ in range(2):
+            limiter.hit("ip", 2, 60, now=1000.0)
+        allowed, retry_after = limiter.hit("ip", 2, 60, now=1000.0)
+        assert not allowed
+        assert retry_after >= 1
+
+    def test_keys_are_independent(self, limiter):
+        assert limiter.hit("a", 1, 60, now=1000.0)[0]
+        assert limiter.hit("b", 1, 60, now=1000.0)[0]
+        assert not limiter.hit("a", 1, 60, now=1000.0)[0]
+
+    def test_previous_window_decays(self, limiter):
+        # Fill window [960, 1020)
+        for _ in range(10):
+            limiter.hit("ip", 10, 60, now=970.0)
+        # Just after the window rolls, the previous window still counts almost fully
+        assert not limiter.hit("ip", 10, 60, now=1021.0)[0]
+        # Near the end of the next window it has mostly decayed
+        assert limiter.hit("ip", 10, 60, now=1075.0)[0]
+
+    def test_rejected_requests_not_counted(self, limiter):
+        limiter.hit("ip", 1, 60, now=1000.0)
+        for _ in range(5):
+            limiter.hit("ip", 1, 60, now=1000.0)
+        # Only the one accepted hit carries into the next window's estimate
+        assert limiter.hit("ip", 1, 60, now=1200.0)[0]
+
+class TestBackends:
+    def test_incomplete_backend_fails_on_creation(self):
+        class IncrementOnly(RateLimitBackend):
+            def increment(self, key, window_index, window, now):
+                return 0, 1
+
+        with pytest.raises(TypeError):
+            IncrementOnly()
+
+    def test_memory_evicts_idle_keys(self):
+        backend = InMemoryBackend()
+        limiter = RateLimiter(backend)
+        limiter.hit("old", 5, 60, now=1000.0)
+        limiter.hit("new", 5, 60, now=1200.0)
+        assert len(backend) == 1
+
+    def test_memory_max_keys(self):
+        backend = InMemoryBackend(max_keys=2)
+        limiter = RateLimiter(backend)
+        for key in ["a", "b", "c"]:
+            limiter.hit(key, 5, 60, now=1000.0)
+        assert len(backend) == 2
+
+    def test_sqlite_shared_between_instances(self, tmp_path):
+        path = str(tmp_path / "shared.sqlite3")
+        worker_a = RateLimiter(SQLiteBackend(path))
+        worker_b = RateLimiter(SQLiteBackend(path))
+        assert worker_a.hit("ip", 2, 60, now=1000.0)[0]
+        assert worker_b.hit("ip", 2, 60, now=1000.0)[0]
+        assert not worker_a.hit("ip", 2, 60, now=1000.0)[0]
+
+    def test_fake_redis_expiry(self):
+        client = InMemoryRedis()
+        client.incr("k")
+        client.expire("k", 0)
+        assert client.dbsize() == 0
+
+    def test_create_backend_unknown(self):
+        with pytest.raises(ValueError):
+            create_backend("carrier-pigeon")
@@ -0,0 +1,93 @@
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rerank import OllamaReranker, RerankStage, create_scorer
+
+class LengthScorer:
+    """Scores passages by length, recording each batch it is asked for"""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+
+    def __call__(self, question, texts):
+        self.batches.append(list(texts))
+        time.sleep(self.delay)
+        return [float(len(text)) for text in texts]
+
+class FakeOllama:
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+
+    def generate(self, model, prompt, options=None, keep_alive=None):
+        self.prompts.append(prompt)
+        return self.reply
+
+class TestRerankStage:
+    def test_reorders_and_keeps_top_k(self):
+        stage = RerankStage(LengthScorer(), budget_ms=1000, batch_size=2)
+        assert stage.rerank("q", ["a", "ccc", "bb", "dddd"], str, 3) == ["dddd", "ccc", "bb"]
+
+    def test_scores_in_batches(self):
+        scorer = LengthScorer()
+        stage = RerankStage(scorer, budget_ms=1000, batch_size=2)
+        stage.rerank("q", ["a", "b", "c", "d", "e"], str, 5)
+        assert scorer.batches == [["a", "b"], ["c", "d"], ["e"]]
+
+    def test_cached_scores_are_not_recomputed(self):
+        scorer = LengthScorer()
+        stage = RerankStage(scorer, budget_ms=1000, batch_size=8)
+        stage.rerank("What is X?", ["a", "bb"], str, 2)
+        # Same question up to whitespace and case
+        assert stage.rerank("what  is x?", ["bb", "a", "ccc"], str, 3) == ["ccc", "bb", "a"]
+        assert scorer.batches == [["a", "bb"], ["ccc"]]
+
+    def test_budget_keeps_retrieval_order_for_unscored(self):
+        scorer = LengthScorer(delay=0.2)
+        stage = RerankStage(scorer, budget_ms=50, batch_size=2)
+        started = time.perf_counter()
+        assert stage.rerank("q", ["a", "bb", "ccc"], str, 3) == ["a", "bb", "ccc"]
+        assert time.perf_counter() - started < 0.15
+
+        # The abandoned batch still finishes and fills the cache
+        time.sleep(0.3)
+        assert stage.rerank("q", ["a", "bb", "zzzz"], str, 3)[:2] == ["bb", "a"]
+
+    def test_slow_scorer_backlog_stays_bounded(self):
+        scorer = LengthScorer(delay=0.2)
+        stage = RerankStage(scorer, budget_ms=10, batch_size=1, workers=1)
+        for n in range(20):
+            assert stage.rerank("q", [f"doc {n}", f"other doc {n}"], str, 2) == [f"doc {n}", f"other doc {n}"]
+            assert stage._outstanding <= stage.workers + 1
+        assert stage._pool._work_queue.qsize() <= stage.workers + 1
+
+        # Queued batches were cancelled or never submitted, not left to run later
+        time.sleep(0.5)
+        assert len(scorer.batches) <= 3
+        assert stage._outstanding == 0
+
+    def test_scorer_failure_keeps_retrieval_order(self):
+        def failing(question, texts):
+            raise ConnectionError("down")
+        stage = RerankStage(failing, budget_ms=1000)
+        assert stage.rerank("q", ["a", "bb"], str, 2) == ["a", "bb"]
+
+    def test_unscored_passages_rank_below_scored(self):
+        stage = RerankStage(lambda q, texts: [None if t == "a" else 1.0 for t in texts], budget_ms=1000)
+        assert stage.rerank("q", ["a", "b", "c"], str, 3) == ["b", "c", "a"]
+
+class TestOllamaReranker:
+    def test_parses_ratings(self):
+        client = FakeOllama("1: 3\n[2] 9\n7: 10\nnot a score")
+        scorer = OllamaReranker(client, "llama3")
+        assert scorer("how?", ["first", "second", "third"]) == [3.0, 9.0, None]
+        assert "[2] second" in client.prompts[0]
+        assert "Question: how?" in client.prompts[0]
+
+    def test_create_scorer(self):
+        assert create_scorer("none") is None
+        assert isinstance(create_scorer("ollama", "llama3", FakeOllama("")), OllamaReranker)
@@ -0,0 +1,113 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scheduling import PriorityExecutor, available_cpus, default_workers
+
+def make_scheduler(workers=2, batch_workers=1, batch_queue=0, on_wait=None):
+    scheduler = PriorityExecutor(workers, on_wait=on_wait)
+    interactive = scheduler.add_lane("interactive", priority=0)
+    batch = scheduler.add_lane("batch", priority=1, max_workers=batch_workers, max_queue=batch_queue)
+    return scheduler, interactive, batch
+
+class TestPriorityExecutor:
+    def test_runs_work_and_propagates_errors(self):
+        scheduler, interactive, _ = make_scheduler()
+        try:
+            assert interactive.submit(pow, 2, 10).result(timeout=5) == 1024
+            with pytest.raises(ZeroDivisionError):
+                interactive.submit(lambda: 1 / 0).result(timeout=5)
+        finally:
+            scheduler.shutdown()
+
+    def test_interactive_runs_before_queued_batch_work(self):
+        scheduler, interactive, batch = make_scheduler(workers=1, batch_workers=1)
+        gate = threading.Event()
+        order = []
+        try:
+            blocker = interactive.submit(gate.wait)
+            futures = [batch.submit(order.append, "batch") for _ in range(2)]
+            futures.append(interactive.submit(order.append, "chat"))
+            gate.set()
+            for future in [blocker] + futures:
+                future.result(timeout=5)
+            assert order == ["chat", "batch", "batch"]
+        finally:
+            scheduler.shutdown()
+
+    def test_batch_quota_keeps_a_thread_for_interactive(self):
+        scheduler, interactive, batch = make_scheduler(workers=2, batch_workers=1)
+        gate = threading.Event()
+        try:
+            slow = [batch.submit(gate.wait) for _ in range(3)]
+            # The second thread may not take batch work, so chat runs right away
+            assert interactive.submit(lambda: "answer").result(timeout=5) == "answer"
+            assert scheduler.stats()["batch"]["running"] == 1
+            gate.set()
+            for future in slow:
+                future.result(timeout=5)
+        finally:
+            gate.set()
+            scheduler.shutdown()
+
+    def test_admission_control(self):
+        scheduler, _, batch = make_scheduler(workers=1, batch_workers=1, batch_queue=2)
+        gate = threading.Event()
+        try:
+            futures = [batch.submit(gate.wait)]
+            time.sleep(0.05)  # Let the worker pick up the first item
+            assert scheduler.admit("batch") == (True, 0)
+            futures += [batch.submit(gate.wait) for _ in range(2)]
+            allowed, retry_after = scheduler.admit("batch")
+            assert not allowed
+            assert retry_after >= 1
+            assert scheduler.admit("interactive") == (True, 0)
+            gate.set()
+            for future in futures:
+                future.result(timeout=5)
+            assert scheduler.admit("batch") == (True, 0)
+        finally:
+            gate.set()
+            scheduler.shutdown()
+
+    def test_reports_wait_per_lane(self):
+        waits = []
+        scheduler, interactive, batch = make_scheduler(on_wait=lambda lane, seconds: waits.append((lane, seconds)))
+        try:
+            interactive.submit(len, "a").result(timeout=5)
+            batch.submit(len, "b").result(timeout=5)
+        finally:
+            scheduler.shutdown()
+        assert [lane for lane, _ in waits] == ["interactive", "batch"]
+        assert all(seconds >= 0 for _, seconds in waits)
+
+    def test_works_with_run_in_executor(self):
+        scheduler, interactive, _ = make_scheduler()
+        
+        async def main():
+            return await asyncio.get_running_loop().run_in_executor(interactive, sum, [1, 2, 3])
+        
+        try:
+            assert asyncio.run(main()) == 6
+        finally:
+            scheduler.shutdown()
+
+    def test_shutdown_drains_queue_then_rejects(self):
+        scheduler, interactive, batch = make_scheduler(workers=1)
+        futures = [batch.submit(time.sleep, 0.01) for _ in range(3)]
+        scheduler.shutdown(wait=True)
+        assert all(future.done() for future in futures)
+        with pytest.raises(RuntimeError):
+            interactive.submit(len, "x")
+
+    def test_default_workers(self):
+        cpus = available_cpus()
+        assert default_workers(io_bound=True) == min(32, cpus + 4)
+        assert default_workers(io_bound=False) == max(2, cpus)
@@ -1,13 +1,23 @@
+import asyncio
+
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import Mock, patch, AsyncMock
 import sys
 import os
+import threading
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from server import app, SecurityValidator, AsyncWebCrawler, RAGService
+import chromadb
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+from ann_index import create_index
+from full_vectors import FullVectorStore
+from server import app, Config, SecurityValidator, AsyncWebCrawler, RAGService, CollectionIndex
 
 client = TestClient(app)
 
@@ -110,6 +120,17 @@ class TestChatEndpoint:
         })
         assert response.status_code == 422
 
+class TestExportRetrievalEndpoint:
+    @patch('server.ensure_ollama_ready', new_callable=AsyncMock)
+    def test_oversized_line_is_rejected(self, mock_ollama):
+        response = client.post("/export/retrieval", content=b"x" * (64 * 1024))
+        assert response.status_code == 413
+    
+    @patch('server.ensure_ollama_ready', new_callable=AsyncMock)
+    def test_too_long_query_is_rejected(self, mock_ollama):
+        response = client.post("/export/retrieval", content=b"what is x?\n" + b"y" * 1001)
+        assert response.status_code == 422
+
 class TestSourcesEndpoint:
     @patch('server.RAGService.get_sources')
     def test_get_sources_success(self, mock_get_sources):
@@ -142,6 +163,16 @@ class TestAsyncWebCrawler:
 
 # --- RAG Service Tests ---
 
+class AxisEmbeddings:
+    """Each known text points along its own axis"""
+    axes = {"alpha": 0, "beta": 1, "gamma": 2}
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+    def embed_query(self, text):
+        vector = [0.01] * 8
+        vector[self.axes.get(text, 7)] = 1.0
+        return vector
+
 class TestRAGService:
     def test_service_initialization(self):
         service = RAGService()
@@ -153,6 +184,152 @@ class TestRAGService:
         with patch('server.ChatOllama'):
             llm = service.get_llm()
             assert llm is not None
+    
+    def test_failed_write_does_not_mark_chunks_seen(self):
+        service = RAGService()
+        vectorstore = Mock()
+        vectorstore.get.return_value = {"ids": [], "documents": [], "metadatas": []}
+        vectorstore.add_documents.side_effect = [ConnectionError("Ollama down"), ["a", "b"]]
+        index = CollectionIndex("default", vectorstore)
+        splits = [Document(page_content="first chunk"), Document(page_content="second chunk")]
+        
+        with patch.object(service, "collection", return_value=index):
+            with pytest.raises(ConnectionError):
+                service._index_splits(splits, "default")
+            added, report = service._index_splits(splits, "default")
+            assert added == 2 and report.chunks_dropped == 0
+            # Now stored, they are duplicates
+            assert service._index_splits(splits, "default")[0] == 0
+
+    def test_in_process_index_keeps_vectors_out_of_chroma(self, tmp_path):
+        chroma = chromadb.EphemeralClient()
+        vectorstore = Chroma(client=chroma, collection_name="external-test", embedding_function=AxisEmbeddings())
+        full_vectors = FullVectorStore(str(tmp_path / "full_vectors.sqlite3"))
+        index = CollectionIndex("docs", vectorstore, create_index("flat", "int8"), full_vectors)
+        ids = index.add_documents([Document(page_content=text, metadata={"source": text}) for text in AxisEmbeddings.axes])
+        
+        # Chroma's HNSW index only gets placeholders; the float32 vectors are on disk
+        stored = vectorstore._collection.get(include=["embeddings"])["embeddings"]
+        assert [list(vector) for vector in stored] == [[1.0]] * 3
+        assert len(full_vectors.get("docs", ids)[ids[0]]) == 8
+        assert [doc.page_content for doc, _ in index.search("beta", 2)][0] == "beta"
+        
+        index.delete(ids[:1])
+        assert set(full_vectors.get("docs", ids)) == set(ids[1:])
+        assert "alpha" not in [doc.page_content for doc in index.similarity_search("alpha", 3)]
+
+    @patch.object(Config, "VECTOR_INDEX", "flat")
+    @patch.object(Config, "SNAPSHOT_BATCH_SIZE", 1)
+    def test_snapshot_import_replaces_collection_only_when_complete(self, tmp_path):
+        service = RAGService()
+        service.client = chromadb.EphemeralClient()
+        service.embeddings = AxisEmbeddings()
+        service.full_vectors = FullVectorStore(str(tmp_path / "full_vectors.sqlite3"))
+        service.collection("snap-source").add_documents([Document(page_content=t) for t in ("alpha", "beta")])
+        path = str(tmp_path / "source.ragsnap")
+        service.export_snapshot("snap-source", path)
+        service.collection("snap-target").add_documents([Document(page_content="gamma")])
+        
+        def texts():
+            return sorted(doc.page_content for doc in service.collection("snap-target").similarity_search("alpha", 5))
+        
+        def leftovers():
+            return [c.name for c in service.client.list_collections() if c.name.startswith(("import-", "replaced-"))]
+        
+        # A failure partway leaves the old content searchable and no staging collection behind
+        add_embedded = CollectionIndex.add_embedded
+        calls = []
+        def failing(index, *args):
+            calls.append(1)
+            if len(calls) == 2:
+                raise ConnectionError("disk full")
+            return add_embedded(index, *args)
+        with patch.object(CollectionIndex, "add_embedded", failing):
+            with pytest.raises(ConnectionError):
+                service.import_snapshot(path, "snap-target")
+        assert texts() == ["gamma"]
+        assert leftovers() == []
+        
+        assert service.import_snapshot(path, "snap-target")["total_chunks"] == 2
+        assert texts() == ["alpha", "beta"]
+        assert leftovers() == []
+        # Reopened from disk, it finds the imported vectors under its own name
+        service.collections.pop("snap-target")
+        assert texts() == ["alpha", "beta"]
+
+    @patch.object(Config, "VECTOR_INDEX", "chroma")
+    def test_reopen_after_other_worker_write_keeps_open_collections_usable(self, tmp_path):
+        with patch.object(Config, "PERSIST_DIRECTORY", str(tmp_path)), \
+                patch.object(Config, "SHARED_INDEX_PATH", str(tmp_path / "shared.sqlite3")):
+            writer, reader = RAGService(), RAGService()
+            for service in (writer, reader):
+                service.initialize()
+                service.embeddings = AxisEmbeddings()
+            in_flight = reader.collection("shared-docs")
+            with writer._exclusive_write():
+                writer.collection("shared-docs").add_documents([Document(page_content="alpha")])
+            
+            opened = []
+            open_client = RAGService._open_client
+            def counting(service):
+                opened.append(1)
+                return open_client(service)
+            with patch.object(RAGService, "_open_client", counting):
+                threads = [threading.Thread(target=reader.collection, args=("shared-docs",)) for _ in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            assert len(opened) == 1
+            assert [doc.page_content for doc in reader.collection("shared-docs").similarity_search("alpha", 1)] == ["alpha"]
+            # Requests still holding the previous collection can finish reading it
+            in_flight.similarity_search("alpha", 1)
+
+    @pytest.mark.asyncio
+    async def test_chat_after_ingest_does_not_join_older_answer(self):
+        service = RAGService()
+        vectorstore = Mock()
+        vectorstore.add_documents.return_value = ["new"]
+        index = CollectionIndex("default", vectorstore)
+        release = asyncio.Event()
+        versions = []
+        
+        async def slow_query(question, collection):
+            version = index.version
+            versions.append(version)
+            await release.wait()
+            return {"answer": f"as of {version}"}
+        
+        async def wait_for(calls):
+            for _ in range(200):
+                if len(versions) >= calls:
+                    return
+                await asyncio.sleep(0.01)
+            release.set()
+        
+        previous = getattr(app.state, "rag_service", None)
+        app.state.rag_service = service
+        try:
+            with patch.object(service, "collection", return_value=index), \
+                 patch.object(service, "query", side_effect=slow_query), \
+                 patch("server.ensure_ollama_ready", AsyncMock()):
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                    ask = lambda: asyncio.create_task(http.post("/chat", json={"question": "What is new?"}))
+                    before = ask()
+                    await wait_for(1)
+                    index.add_documents([Document(page_content="news")])
+                    after, joined = ask(), ask()
+                    await wait_for(2)
+                    await asyncio.sleep(0.05)
+                    release.set()
+                    answers = [(await task).json()["answer"] for task in (before, after, joined)]
+        finally:
+            app.state.rag_service = previous
+        
+        # The question asked after the ingest ran again; the identical one alongside it joined it
+        assert len(versions) == 2 and versions[0] != versions[1]
+        assert answers[1] == answers[2] != answers[0]
 
 # --- Integration Tests ---
 
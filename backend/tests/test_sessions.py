@@ -0,0 +1,82 @@
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sessions import ChatSession, SessionStore, Turn
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+def words(text):
+    return len(text.split())
+
+class TestChatSession:
+    def test_topic_reuse(self):
+        session = ChatSession("s", "docs")
+        assert not session.same_topic(frozenset({"cache"}), 1, 0.5)  # Nothing retrieved yet
+        
+        session.remember_retrieval(frozenset({"cache", "evict"}), 1, ["hit"])
+        assert session.same_topic(frozenset({"cache"}), 1, 0.5)
+        assert session.same_topic(frozenset(), 1, 0.5)  # "Why?"
+        assert not session.same_topic(frozenset({"price", "plan"}), 1, 0.5)
+        assert not session.same_topic(frozenset({"cache"}), 2, 0.5)  # Index changed
+        
+        assert session.reuse_retrieval(frozenset({"cache", "ttl"})) == ["hit"]
+        assert session.topic == {"cache", "evict", "ttl"}
+
+    def test_new_retrieval_drops_backend_state(self):
+        session = ChatSession("s", "docs")
+        session.backend_state = [1, 2, 3]
+        session.remember_retrieval(frozenset({"a"}), 1, [])
+        assert session.backend_state is None
+
+    def test_history_is_bounded(self):
+        session = ChatSession("s", "docs", max_turns=3)
+        for i in range(5):
+            session.add_turn(f"question {i}", f"answer {i}")
+        assert [t.question for t in session.turns] == ["question 2", "question 3", "question 4"]
+        # Each turn is 4 words: only the two most recent fit in 9, oldest first
+        assert session.history(9, words) == [Turn("question 3", "answer 3"), Turn("question 4", "answer 4")]
+        assert session.history(3, words) == []
+
+class TestSessionStore:
+    def test_get_or_create(self):
+        store = SessionStore()
+        session = store.get_or_create("new", "docs")
+        assert store.get_or_create(session.id, "docs") is session
+        assert store.get_or_create(None, "docs") is not session
+        # A session belongs to one collection
+        assert store.get(session.id, "other") is None
+
+    def test_lru_eviction(self):
+        store = SessionStore(max_sessions=2)
+        a, b = store.create("docs"), store.create("docs")
+        store.get(a.id, "docs")  # b is now least recently used
+        store.create("docs")
+        assert len(store) == 2
+        assert store.get(a.id, "docs") is a
+        assert store.get(b.id, "docs") is None
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        store = SessionStore(ttl=60, clock=clock)
+        session = store.create("docs")
+        clock.now = 59
+        assert store.get(session.id, "docs") is session  # Use extends the TTL
+        clock.now = 118
+        assert store.get(session.id, "docs") is session
+        clock.now = 200
+        assert store.get(session.id, "docs") is None
+        assert len(store) == 0
+
+    def test_delete(self):
+        store = SessionStore()
+        session = store.create("docs")
+        assert store.delete(session.id)
+        assert not store.delete(session.id)
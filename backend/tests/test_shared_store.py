@@ -0,0 +1,80 @@
+import sys
+import os
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from shared_store import SharedIndexStore
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "index.sqlite3")
+
+class TestSharedIndexStore:
+    def test_starts_empty(self, path):
+        version, chunks = SharedIndexStore(path).load()
+        assert version == 0
+        assert chunks == []
+
+    def test_writes_bump_version(self, path):
+        store = SharedIndexStore(path)
+        assert store.append("https://a.com", ["one", "two"], "t1") == 1
+        assert store.append("https://b.com", ["three"], "t2") == 2
+        assert store.delete_source("https://a.com") == 3
+        version, chunks = store.load()
+        assert version == 3
+        assert chunks == [{'text': "three", 'source_url': "https://b.com", 'timestamp': "t2"}]
+
+    def test_other_instance_sees_writes(self, path):
+        writer = SharedIndexStore(path)
+        reader = SharedIndexStore(path)
+        writer.append("https://a.com", ["one"], "t")
+        assert reader.version() == 1
+        assert [c['text'] for c in reader.load()[1]] == ["one"]
+
+    def test_failed_write_rolls_back(self, path):
+        store = SharedIndexStore(path)
+        with pytest.raises(RuntimeError):
+            with store.transaction() as txn:
+                txn.conn.execute("INSERT INTO chunks (source_url, text, timestamp) VALUES ('u', 'x', 't')")
+                raise RuntimeError("boom")
+        assert store.load() == (0, [])
+
+    def test_clear(self, path):
+        store = SharedIndexStore(path)
+        store.append("https://a.com", ["one"], "t")
+        assert store.clear() == 2
+        assert store.load() == (2, [])
+
+    def test_collections_are_isolated(self, path):
+        store = SharedIndexStore(path)
+        store.append("https://a.com", ["one"], "t", collection="alpha")
+        store.append("https://b.com", ["two", "three"], "t", collection="beta")
+        assert store.version("alpha") == 1
+        assert store.version("beta") == 1
+        assert [c['text'] for c in store.load("beta")[1]] == ["two", "three"]
+        store.clear("alpha")
+        assert store.load("alpha")[1] == []
+        assert store.collections() == {"beta": (2, 1)}
+
+    def test_append_many_is_one_write(self, path):
+        store = SharedIndexStore(path)
+        version = store.append_many([("https://a.com", ["one"]), ("https://b.com", ["two", "three"])], "t")
+        assert version == 1
+        assert [(c['source_url'], c['text']) for c in store.load()[1]] == [
+            ("https://a.com", "one"), ("https://b.com", "two"), ("https://b.com", "three")
+        ]
+
+    def test_replace_swaps_collection(self, path):
+        store = SharedIndexStore(path)
+        store.append("https://a.com", ["old"], "t0", collection="alpha")
+        store.append("https://b.com", ["other"], "t0", collection="beta")
+        version = store.replace([("https://c.com", "new", "t1"), ("https://c.com", "newer", "t2")], collection="alpha")
+        assert version == 2
+        assert store.load("alpha")[1] == [
+            {'text': "new", 'source_url': "https://c.com", 'timestamp': "t1"},
+            {'text': "newer", 'source_url': "https://c.com", 'timestamp': "t2"},
+        ]
+        assert [c['text'] for c in store.load("beta")[1]] == ["other"]
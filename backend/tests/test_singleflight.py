@@ -0,0 +1,83 @@
+import sys
+import os
+import asyncio
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from singleflight import SingleFlight, normalize_text
+
+class Counted:
+    """An expensive call that counts how often it actually runs."""
+    def __init__(self, result="answer", error=None):
+        self.calls = 0
+        self.result = result
+        self.error = error
+    
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        if self.error:
+            raise self.error
+        return self.result
+
+class TestSingleFlight:
+    def test_concurrent_identical_calls_share_one_run(self):
+        flights, work = SingleFlight("test"), Counted()
+        
+        async def main():
+            return await asyncio.gather(*(flights.do("key", work) for _ in range(5)))
+        
+        assert asyncio.run(main()) == ["answer"] * 5
+        assert work.calls == 1
+        assert len(flights) == 0
+
+    def test_different_keys_run_separately(self):
+        flights, work = SingleFlight("test"), Counted()
+        
+        async def main():
+            await asyncio.gather(flights.do("a", work), flights.do("b", work))
+        
+        asyncio.run(main())
+        assert work.calls == 2
+
+    def test_nothing_is_cached_after_completion(self):
+        flights, work = SingleFlight("test"), Counted()
+        
+        async def main():
+            await flights.do("key", work)
+            await flights.do("key", work)
+        
+        asyncio.run(main())
+        assert work.calls == 2
+
+    def test_errors_reach_every_caller(self):
+        flights, work = SingleFlight("test"), Counted(error=RuntimeError("model down"))
+        
+        async def main():
+            return await asyncio.gather(*(flights.do("key", work) for _ in range(3)), return_exceptions=True)
+        
+        results = asyncio.run(main())
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert work.calls == 1
+
+    def test_cancelled_caller_does_not_cancel_the_others(self):
+        flights, work = SingleFlight("test"), Counted()
+        
+        async def main():
+            first = asyncio.ensure_future(flights.do("key", work))
+            second = asyncio.ensure_future(flights.do("key", work))
+            await asyncio.sleep(0.01)
+            assert "key" in flights
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+        
+        assert asyncio.run(main()) == "answer"
+        assert work.calls == 1
+
+    def test_normalize_text(self):
+        assert normalize_text("  What is  RAG?\n") == normalize_text("what is rag?")
@@ -0,0 +1,81 @@
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from snapshot_file import FORMAT_VERSION, SnapshotFile, iter_batches, string_sections, write_snapshot
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = str(tmp_path / "index.ragsnap")
+    arrays = {
+        "vectors": np.arange(12, dtype=np.float32).reshape(3, 4),
+        "ids": np.array([7, 8, 9], dtype=np.int64),
+        **string_sections("text", ["alpha", "", "ünïcode ✓"]),
+    }
+    write_snapshot(path, "test", {"collection": "docs", "chunks": 3}, arrays)
+    return path
+
+class TestSnapshotFile:
+    def test_round_trip(self, snapshot_path):
+        snap = SnapshotFile(snapshot_path)
+        assert snap.kind == "test"
+        assert snap.meta == {"collection": "docs", "chunks": 3}
+        assert snap.array("vectors").tolist() == np.arange(12, dtype=np.float32).reshape(3, 4).tolist()
+        assert snap.array("ids").dtype == np.int64
+        assert snap.strings("text") == ["alpha", "", "ünïcode ✓"]
+        assert "ids" in snap and "missing" not in snap
+        assert not os.path.exists(snapshot_path + ".tmp")
+
+    def test_arrays_are_read_only_views(self, snapshot_path):
+        vectors = SnapshotFile(snapshot_path).array("vectors")
+        with pytest.raises(ValueError):
+            vectors[0, 0] = 1.0
+
+    def test_unmapped_outlives_file(self, snapshot_path):
+        snap = SnapshotFile(snapshot_path, mapped=False)
+        os.remove(snapshot_path)
+        assert snap.array("ids").tolist() == [7, 8, 9]
+        assert snap.strings("text")[0] == "alpha"
+        with pytest.raises(ValueError):
+            snap.array("vectors")[0, 0] = 1.0
+
+    def test_missing_section(self, snapshot_path):
+        with pytest.raises(ValueError, match="no section"):
+            SnapshotFile(snapshot_path).array("missing")
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "notes.txt"
+        path.write_bytes(b"just some text, long enough for a preamble")
+        with pytest.raises(ValueError, match="Not a snapshot file"):
+            SnapshotFile(str(path))
+
+    def test_rejects_other_format_versions(self, snapshot_path):
+        with open(snapshot_path, "r+b") as f:
+            f.seek(8)
+            f.write((FORMAT_VERSION + 1).to_bytes(4, "little"))
+        with pytest.raises(ValueError, match="format version"):
+            SnapshotFile(snapshot_path)
+
+    def test_detects_corruption(self, snapshot_path):
+        snap = SnapshotFile(snapshot_path)
+        position = snap._data_start + snap.sections["ids"]["offset"]
+        del snap
+        with open(snapshot_path, "r+b") as f:
+            f.seek(position)
+            f.write(b"\xff")
+        with pytest.raises(ValueError, match="'ids' is corrupt"):
+            SnapshotFile(snapshot_path)
+
+    def test_detects_truncation(self, snapshot_path):
+        with open(snapshot_path, "r+b") as f:
+            f.truncate(os.path.getsize(snapshot_path) - 64)
+        with pytest.raises(ValueError, match="Truncated"):
+            SnapshotFile(snapshot_path)
+
+    def test_iter_batches(self):
+        assert [(s.start, s.stop) for s in iter_batches(5, 2)] == [(0, 2), (2, 4), (4, 5)]
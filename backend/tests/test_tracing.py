@@ -0,0 +1,66 @@
+import sys
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tracing
+from tracing import bind, chrome_trace, request_trace, sample_stacks, span, traced
+
+@traced("work")
+def work(x):
+    with span("inner"):
+        return x * 2
+
+class TestTracing:
+    def setup_method(self):
+        tracing.TRACING_ENABLED = True
+        tracing._finished.clear()
+
+    def teardown_method(self):
+        tracing.TRACING_ENABLED = False
+
+    def names(self, request_id):
+        return [e["name"] for e in chrome_trace(request_id)["traceEvents"] if e["ph"] == "X"]
+
+    def test_spans_recorded_per_request(self):
+        with request_trace("GET /x", "req-1"):
+            assert work(2) == 4
+        assert self.names("req-1") == ["inner", "work", "GET /x"]
+
+    def test_bind_carries_trace_into_executor(self):
+        async def handler():
+            loop = asyncio.get_running_loop()
+            with ThreadPoolExecutor(1) as executor:
+                return await loop.run_in_executor(executor, bind(work, 3))
+
+        with request_trace("POST /chat", "req-2"):
+            assert asyncio.run(handler()) == 6
+        names = self.names("req-2")
+        assert "executor_wait" in names and "work" in names
+        threads = {e["args"]["name"] for e in chrome_trace("req-2")["traceEvents"] if e["ph"] == "M"}
+        assert len(threads) == 2
+
+    def test_disabled_records_nothing(self):
+        tracing.TRACING_ENABLED = False
+        with request_trace("GET /x", "req-3") as request_id:
+            assert tracing.current_request_id() == request_id == "req-3"
+            work(1)
+        assert chrome_trace()["traceEvents"] == []
+
+class TestProfiler:
+    def test_collapsed_stacks(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=stop.wait, name="sleeper")
+        worker.start()
+        try:
+            output = sample_stacks(0.05, interval=0.01)
+        finally:
+            stop.set()
+            worker.join()
+        lines = output.splitlines()
+        assert any(line.startswith("sleeper;") for line in lines)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
@@ -0,0 +1,215 @@
+"""
+Opt-in per-request tracing and an on-demand sampling profiler.
+
+Every request gets a request id (taken from X-Request-ID or generated) that
+is echoed back in the response. With TRACING_ENABLED=true a sampled share of
+requests (TRACE_SAMPLE_RATE) also records spans: the request itself, every
+metrics stage timer, functions decorated with @traced, and the time work
+spent queued for an executor thread. The last TRACE_BUFFER_SIZE traces are
+kept in memory and exported in Chrome trace format (chrome://tracing,
+Perfetto).
+
+Trace state lives in context variables, which do not follow work into
+run_in_executor threads on their own: submit with bind(fn, ...) to carry
+the trace across.
+
+sample_stacks() polls sys._current_frames() to build a flamegraph-compatible
+collapsed-stack profile of the live process (flamegraph.pl, speedscope).
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+
+_PID = os.getpid()
+
+
+class Trace:
+    """Spans recorded for one request, as Chrome trace 'complete' events."""
+
+    def __init__(self, request_id: str, name: str):
+        self.request_id = request_id
+        self.name = name
+        self.events: List[Dict] = []
+        self.threads: Dict[int, str] = {}
+
+    def add(self, name: str, start_ns: int, end_ns: int, args: Optional[Dict] = None):
+        tid = threading.get_ident()
+        if tid not in self.threads:
+            self.threads[tid] = threading.current_thread().name
+        # list.append is atomic, so executor threads can record concurrently
+        self.events.append({
+            "name": name, "ph": "X", "pid": _PID, "tid": tid,
+            "ts": start_ns / 1000, "dur": (end_ns - start_ns) / 1000,
+            "args": dict(args or {}, request_id=self.request_id),
+        })
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+_finished: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+
+
+def current_request_id() -> str:
+    return _request_id.get()
+
+
+@contextmanager
+def request_trace(name: str, request_id: Optional[str] = None) -> Iterator[str]:
+    """Scope one request: sets its id and, if sampled, records a trace."""
+    request_id = request_id or uuid.uuid4().hex[:16]
+    id_token = _request_id.set(request_id)
+    trace = None
+    if TRACING_ENABLED and random.random() < TRACE_SAMPLE_RATE:
+        trace = Trace(request_id, name)
+        trace_token = _current_trace.set(trace)
+    start = time.perf_counter_ns()
+    try:
+        yield request_id
+    finally:
+        if trace is not None:
+            trace.add(name, start, time.perf_counter_ns())
+            _current_trace.reset(trace_token)
+            _finished.append(trace)
+        _request_id.reset(id_token)
+
+
+@contextmanager
+def span(name: str, **args):
+    """Record a span in the current trace; a no-op when the request isn't traced."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        trace.add(name, start, time.perf_counter_ns(), args)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator: record each call of a sync or async function as a span."""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind(fn: Callable, *args, **kwargs) -> Callable[[], Any]:
+    """
+    Package a call for run_in_executor so it runs in the submitting request's
+    context; the time spent waiting for a thread is recorded as 'executor_wait'.
+    """
+    trace = _current_trace.get()
+    context = contextvars.copy_context()
+    if trace is None:
+        return functools.partial(context.run, fn, *args, **kwargs)
+    submitted = time.perf_counter_ns()
+
+    def run():
+        trace.add("executor_wait", submitted, time.perf_counter_ns())
+        return context.run(fn, *args, **kwargs)
+    return run
+
+
+def chrome_trace(request_id: Optional[str] = None) -> Dict:
+    """Finished traces (optionally one request's) as a Chrome trace document."""
+    events: List[Dict] = []
+    threads: Dict[int, str] = {}
+    for trace in list(_finished):
+        if request_id is None or trace.request_id == request_id:
+            events.extend(trace.events)
+            threads.update(trace.threads)
+    for tid, thread_name in threads.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": _PID, "tid": tid, "args": {"name": thread_name}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+# --- SAMPLING PROFILER ---
+_profile_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> str:
+    """
+    Sample every thread's stack for `seconds`; returns collapsed stacks
+    ("thread;outer;...;inner count" per line), heaviest first.
+    """
+    me = threading.get_ident()
+    counts: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for tid, frame in sys._current_frames().items():
+            if tid == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(tid, f"thread-{tid}"))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return "\n".join(f"{stack} {count}" for stack, count in counts.most_common())
+
+
+async def profile(seconds: float, interval: float = 0.005) -> Optional[str]:
+    """
+    Run sample_stacks on its own thread (executors may be the thing that's
+    saturated). Returns None if a profile is already running.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    future: Future = Future()
+
+    def run():
+        try:
+            future.set_result(sample_stacks(seconds, interval))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            _profile_lock.release()
+
+    threading.Thread(target=run, name="profiler", daemon=True).start()
+    return await asyncio.wrap_future(future)
+
+
+# --- ASGI INTEGRATION ---
+async def request_id_middleware(request, call_next):
+    """HTTP middleware: scope each request with request_trace and echo X-Request-ID."""
+    request_id = request.headers.get("X-Request-ID", "")[:64] or None
+    with request_trace(f"{request.method} {request.url.path}", request_id) as request_id:
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response